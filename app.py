@@ -3,7 +3,7 @@ import os
 import time # <-- ADD THIS
 from flask import Flask
 from config import Config
-from extensions import db
+from extensions import db, add_missing_columns
 from services.llm_service import configure_llm
 from models import User, Project, Table
 
@@ -28,6 +28,7 @@ def create_app():
     with app.app_context():
         from models import User, Project, Table
         db.create_all()
+        add_missing_columns()
 
     configure_llm()
 
@@ -1,5 +1,6 @@
 # config.py
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,7 +10,36 @@ class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", os.urandom(24))
     
     UPLOAD_FOLDER = 'uploads'
+    # Processes used to parse large uploads in parallel byte ranges
+    INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", os.cpu_count() or 1))
+    # Largest chunk accepted by the resumable upload API
+    UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_BYTES", 8 * 1024 * 1024))
+    # Uploads ingested at the same time per worker process (background jobs)
+    INGEST_JOB_THREADS = int(os.environ.get("INGEST_JOB_THREADS", 2))
+    # Memory budget of the process-wide LRU cache of loaded tables
+    TABLE_CACHE_BYTES = int(os.environ.get("TABLE_CACHE_BYTES", 512 * 1024 * 1024))
+    # Memory budget of the chat query result cache
+    RESULT_CACHE_BYTES = int(os.environ.get("RESULT_CACHE_BYTES", 64 * 1024 * 1024))
+    # Table results longer than this many rows are kept server-side as a
+    # cursor and sent a page at a time
+    RESULT_PAGE_ROWS = int(os.environ.get("RESULT_PAGE_ROWS", 500))
+    # Seconds a result cursor stays readable
+    RESULT_CURSOR_TTL = int(os.environ.get("RESULT_CURSOR_TTL", 15 * 60))
+    # Where result cursors are written; kept apart from UPLOAD_FOLDER so
+    # an upload can never be read back as a cursor file
+    RESULT_CURSOR_FOLDER = os.environ.get(
+        "RESULT_CURSOR_FOLDER", os.path.join(tempfile.gettempdir(), "aistoria-results")
+    )
     GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+    # JSON file of canned responses; when set, the fake LLM is used
+    LLM_FAKE_RESPONSES = os.environ.get("LLM_FAKE_RESPONSES")
+    # Seconds a cached question -> code translation stays valid
+    TRANSLATION_CACHE_TTL = int(os.environ.get("TRANSLATION_CACHE_TTL", 24 * 3600))
+    # Estimated token budget of a chat prompt; wide schemas are cut to the
+    # tables and columns relevant to the question to fit
+    PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", 4000))
+    # Let the AI model choose between equally plausible foreign keys
+    RELATIONSHIP_LLM_TIEBREAK = os.environ.get("RELATIONSHIP_LLM_TIEBREAK", "").lower() in ("1", "true", "yes")
     DATABASE_URL = os.environ.get("DATABASE_URL")
     if DATABASE_URL:
         SQLALCHEMY_DATABASE_URI = DATABASE_URL
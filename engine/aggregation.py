@@ -0,0 +1,215 @@
+# engine/aggregation.py
+"""
+Streaming hash aggregation.
+
+HashAggregator keeps one small accumulator record per group key instead
+of the group's rows, so grouping and aggregating is a single pass whose
+memory grows with the number of distinct keys only. When the table grows
+past its memory budget the records are hash-partitioned into spill files
+on disk; at the end each partition is reloaded and merged on its own, so
+at most one partition's groups are in memory at a time.
+
+Results match DataFrame.aggregate(DataFrame.groupby(...)):
+  - count      rows in the group
+  - sum        sum of the values that convert with float() (0 if none)
+  - avg        their mean (0 if none)
+  - min / max  their extreme as a float (None if none)
+Groups are returned in order of first appearance; null keys are skipped.
+"""
+import os
+import pickle
+import shutil
+import tempfile
+
+AGG_FUNCS = ('count', 'sum', 'avg', 'min', 'max')
+
+# Default budget for the in-memory hash table before it spills.
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+
+# Number of spill partitions; each is merged separately at the end.
+SPILL_PARTITIONS = 16
+
+# Rough footprint of one group: dict slot, key object and state list,
+# plus one slot per accumulator value.
+_GROUP_OVERHEAD = 200
+_SLOT_BYTES = 32
+
+# Slots per aggregation function in a group's state list
+_SLOTS = {'sum': 1, 'avg': 2, 'min': 1, 'max': 1}
+
+
+class HashAggregator:
+    """
+    Single-pass group-by/aggregate over streamed (key, values...) rows.
+
+    Usage:
+        agg = HashAggregator({'amount': 'sum'}, numeric={'amount': True})
+        agg.consume(keys, [amounts])   # any number of times
+        results = agg.results()        # {key: {'amount': total}}
+
+    `numeric` marks columns whose values are already int/float (or None),
+    which skips the per-value float() conversion and its error handling.
+    """
+
+    def __init__(self, agg_func_map, numeric=None, memory_limit=None, spill_dir=None):
+        self.agg_func_map = {col: func for col, func in agg_func_map.items() if func in AGG_FUNCS}
+        # Columns with a value accumulator, in the order consume() gets them
+        self.value_columns = [col for col, func in self.agg_func_map.items() if func != 'count']
+        numeric = numeric or {}
+        self._specs = []
+        offset = 2  # state = [first_row, count, accumulator slots...]
+        for col in self.value_columns:
+            func = self.agg_func_map[col]
+            self._specs.append((func, offset, bool(numeric.get(col))))
+            offset += _SLOTS[func]
+        self._width = offset
+
+        limit = memory_limit or DEFAULT_MEMORY_LIMIT
+        self.max_groups = max(1, limit // (_GROUP_OVERHEAD + _SLOT_BYTES * self._width))
+        self.spill_dir = spill_dir
+        self.table = {}
+        self.rows_seen = 0
+        self.spilled = 0
+        self._spill_path = None
+
+    # ---------- Building ----------
+
+    def _new_state(self, row):
+        state = [row, 0]
+        for func, _, _ in self._specs:
+            if func == 'avg':
+                state += [0, 0]
+            elif func == 'sum':
+                state.append(0)
+            else:
+                state.append(None)
+        return state
+
+    def consume(self, keys, columns=()):
+        """
+        Adds a batch of rows: `keys` holds the group key of each row and
+        `columns` one iterable of values per entry in value_columns.
+        """
+        table = self.table
+        specs = self._specs
+        row = self.rows_seen
+        for key, *values in zip(keys, *columns) if columns else ((k,) for k in keys):
+            if key is None:
+                row += 1
+                continue
+            state = table.get(key)
+            if state is None:
+                if len(table) >= self.max_groups:
+                    self._spill()
+                state = table[key] = self._new_state(row)
+            state[1] += 1
+            row += 1
+
+            for (func, slot, numeric), value in zip(specs, values):
+                if value is None:
+                    continue
+                if numeric:
+                    value = float(value)
+                else:
+                    try:
+                        value = float(value)
+                    except (ValueError, TypeError):
+                        continue
+                if func == 'sum':
+                    state[slot] += value
+                elif func == 'avg':
+                    state[slot] += value
+                    state[slot + 1] += 1
+                elif func == 'min':
+                    if state[slot] is None or value < state[slot]:
+                        state[slot] = value
+                elif state[slot] is None or value > state[slot]:
+                    state[slot] = value
+        self.rows_seen = row
+
+    # ---------- Spilling ----------
+
+    def _spill(self):
+        """Appends every group to its hash partition on disk and empties the table."""
+        if self._spill_path is None:
+            self._spill_path = tempfile.mkdtemp(prefix='aistoria-agg-', dir=self.spill_dir)
+        partitions = [[] for _ in range(SPILL_PARTITIONS)]
+        for key, state in self.table.items():
+            partitions[hash(key) % SPILL_PARTITIONS].append((key, state))
+        for p, items in enumerate(partitions):
+            if items:
+                with open(os.path.join(self._spill_path, f"part-{p}.pkl"), 'ab') as f:
+                    pickle.dump(items, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.spilled += len(self.table)
+        self.table.clear()  # In place: consume() holds a reference
+
+    def _merge(self, state, other):
+        state[0] = min(state[0], other[0])
+        state[1] += other[1]
+        for func, slot, _ in self._specs:
+            if func == 'sum':
+                state[slot] += other[slot]
+            elif func == 'avg':
+                state[slot] += other[slot]
+                state[slot + 1] += other[slot + 1]
+            elif other[slot] is not None:
+                if state[slot] is None:
+                    state[slot] = other[slot]
+                elif func == 'min':
+                    state[slot] = min(state[slot], other[slot])
+                else:
+                    state[slot] = max(state[slot], other[slot])
+
+    def _iter_partitions(self):
+        """Yields the merged {key: state} table of each spill partition."""
+        for p in range(SPILL_PARTITIONS):
+            path = os.path.join(self._spill_path, f"part-{p}.pkl")
+            if not os.path.exists(path):
+                continue
+            merged = {}
+            with open(path, 'rb') as f:
+                while True:
+                    try:
+                        items = pickle.load(f)
+                    except EOFError:
+                        break
+                    for key, state in items:
+                        existing = merged.get(key)
+                        if existing is None:
+                            merged[key] = state
+                        else:
+                            self._merge(existing, state)
+            os.remove(path)
+            yield merged
+
+    # ---------- Results ----------
+
+    def _finalize(self, state):
+        result = {}
+        specs = iter(self._specs)
+        for col, func in self.agg_func_map.items():
+            if func == 'count':
+                result[col] = state[1]
+                continue
+            func, slot, _ = next(specs)
+            if func == 'avg':
+                result[col] = state[slot] / state[slot + 1] if state[slot + 1] > 0 else 0
+            else:
+                result[col] = state[slot]
+        return result
+
+    def results(self):
+        """Returns {key: {col: value}} in order of first appearance."""
+        if self._spill_path is None:
+            return {key: self._finalize(state) for key, state in self.table.items()}
+
+        try:
+            self._spill()
+            finished = []
+            for merged in self._iter_partitions():
+                finished.extend((state[0], key, self._finalize(state)) for key, state in merged.items())
+            finished.sort(key=lambda item: item[0])
+            return {key: result for _, key, result in finished}
+        finally:
+            shutil.rmtree(self._spill_path, ignore_errors=True)
+            self._spill_path = None
@@ -0,0 +1,353 @@
+# engine/columnar.py
+from array import array
+from collections.abc import Sequence
+
+# Typed array codes for the numeric column kinds. Everything else is kept
+# in a plain Python list.
+ARRAY_TYPECODES = {'int': 'q', 'float': 'd'}
+
+# Python type every non-null value must have to be stored in a kind
+_KIND_PYTYPES = {'int': int, 'float': float, 'str': str}
+
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+
+
+class Column:
+    """
+    A single column: one typed array (or list) of values plus a null bitmap.
+
+    Kinds:
+      - 'int'    -> array('q'), nulls stored as 0
+      - 'float'  -> array('d'), nulls stored as 0.0
+      - 'str'    -> list of str, nulls stored as None
+      - 'object' -> list of arbitrary Python values (fallback when the
+                    values do not match the inferred type)
+
+    Bit i of `nulls` is set when row i is null.
+    """
+
+    __slots__ = ('kind', 'values', 'nulls', 'null_count')
+
+    def __init__(self, kind, values, nulls=None, null_count=0):
+        self.kind = kind
+        self.values = values
+        self.nulls = nulls if nulls is not None else bytearray((len(values) + 7) // 8)
+        self.null_count = null_count
+
+    def __len__(self):
+        return len(self.values)
+
+    def is_null(self, i):
+        return bool(self.nulls[i >> 3] & (1 << (i & 7)))
+
+    def __getitem__(self, i):
+        if self.null_count and self.nulls[i >> 3] & (1 << (i & 7)):
+            return None
+        return self.values[i]
+
+    def __iter__(self):
+        if not self.null_count:
+            return iter(self.values)
+        return self._iter_with_nulls()
+
+    def _iter_with_nulls(self):
+        nulls = self.nulls
+        for i, value in enumerate(self.values):
+            if nulls[i >> 3] & (1 << (i & 7)):
+                yield None
+            else:
+                yield value
+
+    def valid_values(self, indices=None):
+        """Iterates the non-null values, optionally restricted to `indices`."""
+        values = self.values
+        if indices is None:
+            if not self.null_count:
+                return iter(values)
+            indices = range(len(values))
+        if not self.null_count:
+            return (values[i] for i in indices)
+        nulls = self.nulls
+        return (values[i] for i in indices if not nulls[i >> 3] & (1 << (i & 7)))
+
+    def take(self, indices):
+        """Returns a new Column holding only the rows at `indices`."""
+        values = self.values
+        if self.kind in ARRAY_TYPECODES:
+            taken = array(ARRAY_TYPECODES[self.kind], map(values.__getitem__, indices))
+        else:
+            taken = [values[i] for i in indices]
+        if not self.null_count:
+            return Column(self.kind, taken)
+
+        src = self.nulls
+        nulls = bytearray((len(taken) + 7) // 8)
+        null_count = 0
+        for pos, i in enumerate(indices):
+            if src[i >> 3] & (1 << (i & 7)):
+                nulls[pos >> 3] |= 1 << (pos & 7)
+                null_count += 1
+        return Column(self.kind, taken, nulls, null_count)
+
+    @property
+    def nbytes(self):
+        """Approximate memory footprint of the column data in bytes."""
+        if isinstance(self.values, array):
+            size = self.values.itemsize * len(self.values)
+        elif hasattr(self.values, 'nbytes'):
+            # memoryview / mapped values from a sidecar file
+            size = self.values.nbytes
+        else:
+            # Pointer per slot plus a rough allowance for small objects.
+            size = 8 * len(self.values) + sum(
+                len(v) + 49 if isinstance(v, str) else 32
+                for v in self.values if v is not None
+            )
+        return size + len(self.nulls)
+
+
+class ColumnBuilder:
+    """
+    Appends values one at a time into a Column of the requested kind.
+    If a value does not fit the kind (e.g. a string in an 'int' column)
+    the column is downgraded to an 'object' list so no value is lost.
+    """
+
+    def __init__(self, kind='object'):
+        self.kind = kind if kind in ('int', 'float', 'str') else 'object'
+        if self.kind in ARRAY_TYPECODES:
+            self.values = array(ARRAY_TYPECODES[self.kind])
+        else:
+            self.values = []
+        self.nulls = bytearray()
+        self.null_count = 0
+        self._length = 0
+
+    def _fits(self, value):
+        kind = self.kind
+        if kind == 'int':
+            return type(value) is int and _INT64_MIN <= value <= _INT64_MAX
+        if kind == 'float':
+            return type(value) is float
+        if kind == 'str':
+            return type(value) is str
+        return True
+
+    def _downgrade(self):
+        values = list(self.values)
+        nulls = self.nulls
+        for i in range(len(values)):
+            if nulls[i >> 3] & (1 << (i & 7)):
+                values[i] = None
+        self.values = values
+        self.kind = 'object'
+
+    def append(self, value):
+        i = self._length
+        if i & 7 == 0:
+            self.nulls.append(0)
+        if value is None:
+            self.nulls[i >> 3] |= 1 << (i & 7)
+            self.null_count += 1
+            if self.kind in ARRAY_TYPECODES:
+                value = 0 if self.kind == 'int' else 0.0
+        elif not self._fits(value):
+            self._downgrade()
+        self.values.append(value)
+        self._length = i + 1
+
+    def extend(self, values):
+        """
+        Appends a batch of values. Batches without nulls that fit the
+        column kind are copied in bulk; anything else goes value by value.
+        """
+        values = list(values)
+        expected = _KIND_PYTYPES.get(self.kind)
+        if expected is not None and set(map(type, values)) <= {expected}:
+            try:
+                if isinstance(self.values, array):
+                    # Convert first so an overflow leaves the column untouched
+                    values = array(self.values.typecode, values)
+                self.values.extend(values)
+            except OverflowError:
+                pass  # An int beyond 64 bits; handled value by value below
+            else:
+                self._length += len(values)
+                self.nulls.extend(bytes((self._length + 7) // 8 - len(self.nulls)))
+                return
+        for value in values:
+            self.append(value)
+
+    def finish(self):
+        return Column(self.kind, self.values, self.nulls, self.null_count)
+
+
+class ColumnStore:
+    """
+    Columnar table storage: one Column per header entry.
+    Rows are only turned into dicts at the output boundary
+    (row(), iter_rows(), RowView).
+    """
+
+    def __init__(self, header, columns, column_types=None, num_rows=None):
+        self.header = list(header)
+        self.columns = columns
+        self.column_types = column_types or {col: columns[col].kind for col in self.header}
+        if num_rows is None:
+            num_rows = len(columns[self.header[0]]) if self.header else 0
+        self.num_rows = num_rows
+        # Set by engine.storage.open_sidecar for file-backed stores
+        self.meta = None
+        self.mapping = None
+
+    @classmethod
+    def from_rows(cls, rows, header=None, column_types=None):
+        """
+        Builds a store from an iterable of dicts. `header` defaults to the
+        keys of the first row; `column_types` picks the array kind per column.
+        """
+        rows = iter(rows)
+        if header is None:
+            first = next(rows, None)
+            if first is None:
+                return cls([], {}, {}, 0)
+            header = list(first.keys())
+            rows = _chain_first(first, rows)
+
+        column_types = column_types or {}
+        builders = [ColumnBuilder(column_types.get(col, 'object')) for col in header]
+        pairs = list(zip(header, builders))
+        count = 0
+        for row in rows:
+            for col, builder in pairs:
+                builder.append(row.get(col))
+            count += 1
+
+        columns = {col: builder.finish() for col, builder in pairs}
+        types = {col: column_types.get(col, columns[col].kind) for col in header}
+        return cls(header, columns, types, count)
+
+    @classmethod
+    def from_records(cls, batches, header, column_types=None):
+        """
+        Builds a store from batches of value tuples in header order, as
+        produced by CsvParser.parse_records(). No row dicts are created.
+        """
+        column_types = column_types or {}
+        builders = [ColumnBuilder(column_types.get(col, 'object')) for col in header]
+        count = 0
+        for batch in batches:
+            if not batch:
+                continue
+            for builder, values in zip(builders, zip(*batch)):
+                builder.extend(values)
+            count += len(batch)
+
+        columns = {col: builder.finish() for col, builder in zip(header, builders)}
+        types = {col: column_types.get(col, columns[col].kind) for col in header}
+        return cls(header, columns, types, count)
+
+    @classmethod
+    def from_columns(cls, batches, header, column_types=None):
+        """
+        Builds a store from batches of columns (one list of values per
+        header entry), as produced by CsvParser.parse_columns().
+        """
+        column_types = column_types or {}
+        builders = [ColumnBuilder(column_types.get(col, 'object')) for col in header]
+        count = 0
+        for batch in batches:
+            for builder, values in zip(builders, batch):
+                builder.extend(values)
+            count += len(batch[0]) if batch else 0
+
+        columns = {col: builder.finish() for col, builder in zip(header, builders)}
+        types = {col: column_types.get(col, columns[col].kind) for col in header}
+        return cls(header, columns, types, count)
+
+    def __len__(self):
+        return self.num_rows
+
+    def column(self, name):
+        return self.columns[name]
+
+    def row(self, i, columns=None):
+        names = columns or self.header
+        return {col: self.columns[col][i] for col in names}
+
+    def iter_rows(self, columns=None):
+        """Yields one dict per row, built from the selected columns."""
+        names = [col for col in (columns or self.header) if col in self.columns]
+        if not names:
+            for _ in range(self.num_rows):
+                yield {}
+            return
+        for values in zip(*(self.columns[col] for col in names)):
+            yield dict(zip(names, values))
+
+    def take(self, indices):
+        """Returns a new ColumnStore containing only the rows at `indices`."""
+        if not isinstance(indices, (list, array, range)):
+            indices = list(indices)
+        columns = {col: self.columns[col].take(indices) for col in self.header}
+        return ColumnStore(self.header, columns, dict(self.column_types), len(indices))
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+
+class RowView(Sequence):
+    """
+    A read-only sequence of row dicts over a ColumnStore, optionally
+    restricted to a subset of row indices. Dicts are built on access.
+    """
+
+    __slots__ = ('store', 'indices')
+
+    def __init__(self, store, indices=None):
+        self.store = store
+        self.indices = indices
+
+    def __len__(self):
+        if self.indices is None:
+            return self.store.num_rows
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            positions = range(len(self))[i]
+            return [self[p] for p in positions]
+        if self.indices is not None:
+            return self.store.row(self.indices[i])
+        if i < 0:
+            i += self.store.num_rows
+        if not 0 <= i < self.store.num_rows:
+            raise IndexError("row index out of range")
+        return self.store.row(i)
+
+    def __iter__(self):
+        if self.indices is None:
+            return self.store.iter_rows()
+        return (self.store.row(i) for i in self.indices)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, RowView)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"RowView({len(self)} rows)"
+
+    def values(self, column_name):
+        """Iterates the non-null values of one column for the rows in view."""
+        return self.store.column(column_name).valid_values(self.indices)
+
+    def column_kind(self, column_name):
+        return self.store.column(column_name).kind
+
+
+def _chain_first(first, rest):
+    yield first
+    yield from rest
@@ -0,0 +1,89 @@
+# engine/compression.py
+"""
+Transparent reading of compressed CSV files.
+
+gzip, bz2 and xz files are recognized by their magic bytes (not their
+name) and read through a streaming decompressor, so they can stay
+compressed on disk: the parser sees the same bytes as for the plain
+file, without a decompressed copy. Compressed files cannot be seeked
+into cheaply, so they are always parsed front to back (no parallel byte
+ranges).
+"""
+import bz2
+import gzip
+import io
+import lzma
+import os
+
+# Magic bytes at the start of each supported format
+_MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+)
+
+_OPENERS = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+_WRAPPERS = {
+    'gzip': lambda fileobj: gzip.GzipFile(fileobj=fileobj, mode='rb'),
+    'bz2': lambda fileobj: bz2.BZ2File(fileobj, 'rb'),
+    'xz': lambda fileobj: lzma.LZMAFile(fileobj, 'rb'),
+}
+
+# File name suffixes of compressed uploads
+COMPRESSED_SUFFIXES = ('.gz', '.gzip', '.bz2', '.xz')
+
+
+def compression_of(head):
+    """The compression format of data starting with `head`, or None."""
+    for magic, name in _MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def detect_compression(filepath):
+    """The compression format of a file, or None for plain text."""
+    with open(filepath, 'rb') as f:
+        return compression_of(f.read(6))
+
+
+def open_binary(filepath):
+    """Opens a CSV file for binary reading, decompressing if needed."""
+    compression = detect_compression(filepath)
+    if compression is None:
+        return open(filepath, 'rb')
+    return _OPENERS[compression](filepath, 'rb')
+
+
+def open_text(filepath, encoding='utf-8'):
+    """Opens a CSV file for text reading, decompressing if needed."""
+    return io.TextIOWrapper(open_binary(filepath), encoding=encoding)
+
+
+def decompressing(fileobj):
+    """
+    Wraps an open binary file in a decompressor if its content is
+    compressed. The file must be seekable or buffered (peek()), as a
+    request stream wrapped in io.BufferedReader is. The caller keeps
+    ownership of `fileobj` (and can read its position to follow progress
+    through the compressed bytes).
+    """
+    if hasattr(fileobj, 'peek'):
+        compression = compression_of(fileobj.peek(6)[:6])
+    else:
+        start = fileobj.tell()
+        compression = compression_of(fileobj.read(6))
+        fileobj.seek(start)
+    if compression is None:
+        return fileobj
+    return _WRAPPERS[compression](fileobj)
+
+
+def table_name(filename):
+    """Table name of an uploaded file: 'sales.csv.gz' -> 'sales'."""
+    name = filename
+    for suffix in COMPRESSED_SUFFIXES:
+        if name.lower().endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return os.path.splitext(name)[0]
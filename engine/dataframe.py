@@ -1,38 +1,130 @@
 # engine/dataframe.py
 from .parser import CsvParser
+from .columnar import ColumnStore, RowView
+from .aggregation import HashAggregator
+from .sorting import make_sort_key, sorted_positions, sorted_rows, top_positions
+from .storage import SIDECAR_SUFFIX, SidecarWriter, has_fresh_sidecar, open_shared, open_sidecar, sidecar_path
+from .stats import compute_stats, stats_match
+from .predicates import Compare, Predicate, filter_positions
+from .index import SortedIndex, build_index, open_index, write_index
+from .joins import DEFAULT_MEMORY_LIMIT, column_order, join, spill_join
+from .rows import LazyRows
+import os
+import tempfile
 import types
+from array import array
+from collections.abc import Mapping
+from itertools import chain, islice
+
+# Sorted rows kept in memory by order_by(); more go to a temporary sidecar
+SORT_ROWS_IN_MEMORY = 100_000
 
 class DataFrame:
     """
-    A custom DataFrame structure that can be sourced from a file (via CsvParser)
-    or from an in-memory list of dicts (for example, from a join).
+    A custom DataFrame structure that can be sourced from a file (via CsvParser),
+    from an in-memory list of dicts (for example, from a join) or from a
+    ColumnStore.
+
+    In-memory data is always held column-wise (see engine/columnar.py):
+    one typed array per column plus a null bitmap. Row dicts are only
+    built at the output boundary. If a CSV has a fresh binary sidecar
+    (see engine/storage.py) the columns are mapped from it and the CSV
+    text is never parsed.
+
+    `stats` are the ingest-time column statistics (engine/stats.py).
+    A file source takes them from its sidecar, which is rewritten with
+    the file; stats passed in (from the Table record) are only used
+    without a sidecar, and only while their stamp matches the CSV.
+    They answer len(), describe() and unfiltered max_by/min_by without
+    scanning the data.
+
+    `indexes` ({column: 'hash' | 'sorted'}, from the Table record) names
+    the secondary indexes built for a file source (engine/index.py).
+    filter()/where() with a declarative predicate look rows up through
+    them instead of scanning.
     """
 
-    def __init__(self, source):
-        self.source_type = 'list'
-        self.data = []
+    def __init__(self, source, columnar=False, workers=None, tokenizer='line', stats=None, indexes=None):
+        self.source_type = 'columnar'
+        self.store = None
         self.header = []
         self.parser = None
         self.filepath = None
         self.column_types = {}
+        self.stats = stats
+        self.indexes = dict(indexes or {})
+        self._open_indexes = {}
 
         if isinstance(source, str):  # Source is a filepath
-            self.source_type = 'file'
-            self.parser = CsvParser(source)
-            self.header = self.parser.get_header()
             self.filepath = source
-            # Get types from the parser
-            self.column_types = self.parser.get_column_types()
+            self.store = self._open_sidecar(source)
+            if self.store is not None:
+                # Mapped binary columns; the CSV text is never parsed
+                self.header = list(self.store.header)
+                self.column_types = dict(self.store.column_types)
+                self.stats = self.store.meta.get('stats')
+            else:
+                if not stats_match(stats, source):
+                    self.stats = None  # From another version of the file
+                self.source_type = 'file'
+                self.parser = CsvParser(source, tokenizer=tokenizer)
+                self.header = self.parser.get_header()
+                # Get types from the parser
+                self.column_types = self.parser.get_column_types()
+                if columnar and tokenizer == 'block' and not (workers and workers > 1):
+                    # Block batches arrive column-wise; no row tuples at all
+                    self.store = ColumnStore.from_columns(
+                        self.parser.parse_columns(), self.header, self.column_types
+                    )
+                    self.source_type = 'columnar'
+                elif columnar:
+                    # Parse once into columns (across `workers` processes if
+                    # given); later scans never touch the file
+                    self.store = ColumnStore.from_records(
+                        self.parser.parse_records(workers=workers),
+                        self.header, self.column_types
+                    )
+                    self.source_type = 'columnar'
 
         elif isinstance(source, list):  # Source is in-memory data
-            self.source_type = 'list'
-            self.data = source
-            if self.data:
-                self.header = list(self.data[0].keys())
+            if source:
+                self.header = list(source[0].keys())
             # Infer types from the list data
-            self.column_types = self._infer_types_from_list(self.data)
+            self.column_types = self._infer_types_from_list(source)
+            self.store = ColumnStore.from_rows(source, self.header, self.column_types)
+
+        elif isinstance(source, ColumnStore):
+            self.store = source
+            self.header = list(source.header)
+            self.column_types = dict(source.column_types)
         else:
-            raise ValueError("DataFrame source must be a filepath (str) or data (list)")
+            raise ValueError("DataFrame source must be a filepath (str), data (list) or a ColumnStore")
+
+    @staticmethod
+    def _open_sidecar(filepath):
+        """Maps the CSV's binary sidecar if one exists and is up to date."""
+        if not has_fresh_sidecar(filepath):
+            return None
+        try:
+            return open_shared(sidecar_path(filepath))
+        except Exception as e:
+            print(f"Error opening columnar sidecar for {filepath}: {e}")
+            return None
+
+    @property
+    def data(self):
+        """Row-dict view of in-memory data (empty for file-backed frames)."""
+        if self.store is None:
+            return []
+        return RowView(self.store)
+
+    def lazy(self, context=None):
+        """
+        Returns a LazyFrame over this DataFrame (see engine/plan.py).
+        Frames created with the same `context` share common subplans.
+        """
+        from .plan import LazyFrame, Scan
+        return LazyFrame(Scan(self), context)
 
     def get_header(self):
         """Returns the list of column headers."""
@@ -47,26 +139,88 @@ class DataFrame:
         """Public method to access the column types."""
         return self.column_types
 
-    def _get_data(self):
+    def _get_data(self, columns=None):
         """
         Internal helper to get a fresh iterator of all data.
+        With `columns`, file-backed frames only decode those fields.
         """
         if self.source_type == 'file':
-            return self.parser.parse()
-        else:  # 'list'
-            return iter(self.data)  # Return an iterator for consistency
+            return self.parser.parse(columns=columns)
+        else:  # 'columnar'
+            return self.store.iter_rows(columns)
+
+    def _to_store(self, columns=None):
+        """
+        Returns the data as a ColumnStore, parsing file-backed frames
+        into columns on the fly (only `columns`, if given).
+        """
+        if self.store is not None:
+            return self.store
+        header = self.header if columns is None else [col for col in columns if col in self.header]
+        return ColumnStore.from_rows(self._get_data(columns), header, self.column_types)
+
+    def index_for(self, column_name):
+        """The loaded secondary index on a column, or None."""
+        kind = self.indexes.get(column_name)
+        if kind is None or self.filepath is None:
+            return None
+        if column_name not in self._open_indexes:
+            self._open_indexes[column_name] = open_index(self.filepath, column_name, kind)
+        return self._open_indexes[column_name]
+
+    def create_index(self, column_name, kind='hash'):
+        """
+        Builds and saves a secondary index on one column of a file source.
+        Returns the index file path.
+        """
+        if self.filepath is None:
+            raise ValueError("Indexes can only be built for file-backed DataFrames")
+        index = build_index(self._to_store([column_name]), column_name, kind)
+        path = write_index(self.filepath, index)
+        self.indexes[column_name] = kind
+        self._open_indexes[column_name] = index
+        return path
+
+    def _key_order(self, column_name, store, use_index=True):
+        """
+        The key order of a column of `store` (this frame's data) for a
+        merge join, if metadata provides one: a sorted index, or ingest
+        stats flagging the column as sorted. None otherwise.
+        """
+        if column_name not in store.columns:
+            return None
+        index = self.index_for(column_name) if use_index else None
+        if isinstance(index, SortedIndex):
+            _, nulls = column_order(store.column(column_name))
+            return zip(index.keys, index.positions), nulls
+        column_stats = (self.stats or {}).get('columns', {}).get(column_name) or {}
+        if column_stats.get('sorted'):
+            return column_order(store.column(column_name))
+        return None
+
+    def _has_key_order(self, column_name, use_index=True):
+        """True if _key_order() finds a key order, checked without reading the data."""
+        if column_name not in self.header:
+            return False
+        if use_index and isinstance(self.index_for(column_name), SortedIndex):
+            return True
+        return bool(((self.stats or {}).get('columns', {}).get(column_name) or {}).get('sorted'))
 
     def __len__(self):
         """
         Allows len(df) to work.
         """
+        if self.stats is not None:
+            return self.stats['row_count']
         if self.source_type == 'file':
             count = 0
-            for _ in self.parser.parse():  # Use a fresh generator
+            # Fresh generator; no field is decoded or cast, lines are
+            # only width-checked
+            for _ in self.parser.parse(columns=[]):
                 count += 1
             return count
-        else:  # 'list'
-            return len(self.data)
+        else:  # 'columnar'
+            return self.store.num_rows
 
     def _infer_types_from_list(self, data):
         """
@@ -118,35 +272,69 @@ class DataFrame:
         """
         Implements the selection operation.
         Returns a new DataFrame with the filtered data.
+
+        `condition_func` is a row -> bool callable. A declarative
+        Predicate (engine/predicates.py) is answered from secondary
+        indexes when possible, else evaluated on the columns directly,
+        skipping blocks ruled out by the sidecar's zone maps.
+        """
+        if isinstance(condition_func, Predicate):
+            if self.store is not None:
+                keep = filter_positions(self.store, condition_func, index_for=self.index_for)
+                return DataFrame(source=self.store.take(keep))
+            candidates = condition_func.index_positions(self.index_for)
+            if candidates is not None:
+                # Only the indexed rows are read from the CSV
+                rows = (row for row in self.parser.parse_rows_at(candidates) if condition_func(row))
+                return DataFrame(source=ColumnStore.from_rows(rows, self.header, self.column_types))
+
+        if self.store is not None:
+            keep = [i for i, row in enumerate(self.store.iter_rows()) if condition_func(row)]
+            return DataFrame(source=self.store.take(keep))
+
+        filtered = (row for row in self._get_data() if condition_func(row))
+        return DataFrame(source=ColumnStore.from_rows(filtered, self.header, self.column_types))
+
+    def where(self, column_name, op, value):
+        """
+        Declarative filter: where('age', '>', 30). `op` is one of ==, !=,
+        <, <=, >, >= or 'in' (with a list of values). Unlike a lambda it
+        can use indexes and zone maps.
         """
-        filtered_data = [row for row in self._get_data() if condition_func(row)]
-        return DataFrame(source=filtered_data)
+        return self.filter(Compare(column_name, op, value))
 
     def project(self, columns):
         """
         Implements the projection (column selection) operation.
-        Returns a list of dicts (not a DataFrame).
+        Returns a LazyRows sequence of dicts (not a DataFrame): rows are
+        only read when used, so project(...)[:10] reads ten rows.
         """
-        projected_data = []
-        for row in self._get_data():
-            new_row = {col: row[col] for col in columns if col in row}
-            projected_data.append(new_row)
-        return projected_data
+        if self.store is not None:
+            names = [col for col in columns if col in self.store.columns]
+            return LazyRows(lambda: self.store.iter_rows(names))
+
+        # Only the projected fields are decoded
+        names = [col for col in columns if col in self.header]
+        return LazyRows(lambda: self._get_data(names))
 
     def groupby(self, column_name):
         """
         Implements the group-by operation.
-        Returns a dictionary where keys are group values
-        and values are lists of rows.
-        """
-        groups = {}
-        for row in self._get_data():
-            key = row.get(column_name)
-            if key is not None:
-                if key not in groups:
-                    groups[key] = []
-                groups[key].append(row)
-        return groups
+        Returns a mapping where keys are group values and values are
+        sequences of rows (RowView over the columns). The groups are only
+        built when read; aggregate() on an unread GroupBy runs
+        groupby_agg() instead and never builds them.
+        """
+        return GroupBy(self, column_name)
+
+    def _group_rows(self, column_name):
+        """Materializes groupby(): {key: RowView} in order of first appearance."""
+        store = self._to_store()
+        if column_name not in store.columns:
+            return {}
+
+        positions = _group_positions(store.column(column_name))
+        return {key: RowView(store, idx) for key, idx in positions.items()}
 
     def aggregate(self, groups, agg_func_map):
         """
@@ -155,161 +343,455 @@ class DataFrame:
         Returns a dictionary (not a DataFrame).
         Supported functions: count, sum, avg, min, max.
         """
-        results = {}
-        for key, rows in groups.items():
-            agg_result = {}
-            for col, func in agg_func_map.items():
-
-                if func == 'count':
-                    agg_result[col] = len(rows)
-
-                elif func == 'sum':
-                    total = 0
-                    for row in rows:
-                        try:
-                            total += float(row[col])
-                        except (ValueError, TypeError):
-                            continue
-                    agg_result[col] = total
-
-                elif func == 'avg':
-                    total = 0
-                    count = 0
-                    for row in rows:
-                        try:
-                            total += float(row[col])
-                            count += 1
-                        except (ValueError, TypeError):
-                            continue
-                    agg_result[col] = total / count if count > 0 else 0
-
-                elif func == 'min':
-                    min_val = None
-                    for row in rows:
-                        try:
-                            val = float(row[col])
-                            if min_val is None or val < min_val:
-                                min_val = val
-                        except (ValueError, TypeError):
-                            continue
-                    agg_result[col] = min_val
-
-                elif func == 'max':
-                    max_val = None
-                    for row in rows:
-                        try:
-                            val = float(row[col])
-                            if max_val is None or val > max_val:
-                                max_val = val
-                        except (ValueError, TypeError):
-                            continue
-                    agg_result[col] = max_val
-
-            results[key] = agg_result
-        return results
+        if isinstance(groups, GroupBy) and groups._groups is None:
+            # aggregate(groupby(...)) -> one streaming hash aggregation
+            return groups.aggregate(agg_func_map)
+        return _aggregate_groups(groups, agg_func_map)
 
-    def max_by(self, column_name):
+    def groupby_agg(self, column_name, agg_func_map, memory_limit=None):
         """
-        Returns a list containing the single row with the maximum value
-        in column_name. Fully streamed; only one pass through the data.
+        Fused group-by + aggregate in a single pass, keeping only running
+        accumulators per key (see engine/aggregation.py). Returns the same
+        dict as aggregate(groupby(column_name), agg_func_map). If the key
+        table outgrows `memory_limit` bytes it is spilled to disk in hash
+        partitions. File-backed frames stream only the needed columns.
         """
-        max_row = None
-        max_val = float("-inf")
+        if self.store is not None:
+            return _groupby_agg_store(self.store, column_name, agg_func_map, memory_limit=memory_limit)
 
-        for row in self._get_data():
-            val = row.get(column_name)
-            if val is None:
-                continue
+        if column_name not in self.header:
+            return {}
+        aggregator = HashAggregator(agg_func_map, memory_limit=memory_limit)
+        for col in aggregator.value_columns:
+            if col not in self.header:
+                raise KeyError(col)
+
+        # Cast values may still be strings if inference was wrong, so
+        # every value goes through the guarded float() conversion.
+        names = [column_name] + aggregator.value_columns
+        for batch in self.parser.parse_records(columns=names):
+            if batch:
+                keys, *columns = zip(*batch)
+                aggregator.consume(keys, columns)
+        return aggregator.results()
+
+    def order_by(self, columns, ascending=True, limit=None, spill_dir=None):
+        """
+        Implements ORDER BY (optionally with LIMIT).
+        `columns` is a column name or a list of them; `ascending` is one
+        flag or one per column. Nulls sort last; unknown columns are
+        ignored. Returns a new DataFrame with the rows in order.
+
+        With a `limit` a bounded heap keeps only the best `limit` rows.
+        Without one the (key, position) pairs are sorted, spilling sorted
+        runs to disk under `spill_dir` when they do not fit in memory
+        (engine/sorting.py). A CSV source is never loaded: its rows are
+        streamed into the external sort (see _sorted_file()).
+        """
+        if isinstance(columns, str):
+            columns = [columns]
+        columns = [col for col in columns if col in self.header]
+        if isinstance(ascending, bool):
+            ascending = [ascending] * len(columns)
+        key = make_sort_key(list(ascending) + [True] * (len(columns) - len(ascending)))
+
+        if self.store is None and limit is not None:
+            # Rank on the sort columns alone, then fetch only the winners
+            keyed = (
+                (key(tuple(row.values())), i)
+                for i, row in enumerate(self._get_data(columns))
+            )
+            rows = self.parser.parse_rows_at(top_positions(keyed, limit))
+            return DataFrame(source=ColumnStore.from_rows(rows, self.header, self.column_types))
+
+        if self.store is None:
+            return self._sorted_file(columns, key, spill_dir)
+
+        store = self.store
+        values = zip(*(store.column(col) for col in columns)) if columns else \
+            ((),) * store.num_rows
+        keyed = ((key(row_values), i) for i, row_values in enumerate(values))
+        if limit is not None:
+            return DataFrame(source=store.take(top_positions(keyed, limit)))
+        positions = sorted_positions(keyed, spill_dir=spill_dir)
+        if store.mapping is None or len(positions) <= SORT_ROWS_IN_MEMORY:
+            return DataFrame(source=store.take(positions))
+        # A large mapped sidecar: write the rows out in order instead of copying them
+        mapped = [store.column(col) for col in store.header]
+        rows = (tuple(column[i] for column in mapped) for i in positions)
+        return _spilled_frame(store.header, store.column_types, rows, spill_dir)
+
+    def _sorted_file(self, columns, key, spill_dir):
+        """
+        order_by() without a limit for a CSV source: rows are streamed from
+        the parser into the external sort, whose runs carry whole rows.
+        Up to SORT_ROWS_IN_MEMORY rows the result is kept in memory;
+        larger results are written to a temporary sidecar.
+        """
+        header = self.header
+        picks = [header.index(col) for col in columns]
+        rows = (tuple(row.get(col) for col in header) for row in self._get_data())
+        keyed = (
+            (key(tuple(values[n] for n in picks)), i, values)
+            for i, values in enumerate(rows)
+        )
+        ordered = sorted_rows(keyed, SORT_ROWS_IN_MEMORY, spill_dir)
+        head = list(islice(ordered, SORT_ROWS_IN_MEMORY + 1))
+        if len(head) <= SORT_ROWS_IN_MEMORY:
+            return DataFrame(source=ColumnStore.from_records([head], header, self.column_types))
+        return _spilled_frame(header, self.column_types, chain(head, ordered), spill_dir)
+
+    def _top_numeric(self, column_name, descending, limit):
+        """
+        The order_by() heap over one column compared as float(), which is
+        what max_by/min_by/top_k_by have always done: values that do not
+        convert are skipped, ties keep the earliest row.
+        """
+        sign = -1.0 if descending else 1.0
 
-            try:
-                v = float(val)
-            except (ValueError, TypeError):
-                continue
+        def keyed(values):
+            for i, val in enumerate(values):
+                if val is None:
+                    continue
+                try:
+                    yield sign * float(val), i
+                except (ValueError, TypeError):
+                    continue
 
-            if v > max_val:
-                max_val = v
-                max_row = row
+        if self.store is not None:
+            if column_name not in self.store.columns:
+                return []
+            positions = top_positions(keyed(self.store.column(column_name)), limit)
+            return [self.store.row(i) for i in positions]
 
-        if max_row is None:
+        if column_name not in self.header:
             return []
-        return [max_row]
+        values = (row.get(column_name) for row in self._get_data([column_name]))
+        return self.parser.parse_rows_at(top_positions(keyed(values), limit))
 
-    def min_by(self, column_name):
+    def _extreme_from_stats(self, column_name, descending):
         """
-        Returns a list containing the single row with the minimum value
-        in column_name. Fully streamed, one pass.
+        max_by/min_by from the column statistics: the extreme value is
+        known, so only the first row holding it is looked up. Returns None
+        when there are no usable statistics.
         """
-        min_row = None
-        min_val = float("inf")
-
-        for row in self._get_data():
-            val = row.get(column_name)
-            if val is None:
-                continue
-
+        col_stats = (self.stats or {}).get('columns', {}).get(column_name)
+        if not col_stats or col_stats.get('kind') not in ('int', 'float') or 'max' not in col_stats:
+            return None
+        target = col_stats['max' if descending else 'min']
+
+        if self.store is not None:
+            column = self.store.column(column_name)
+            if not column.null_count and column.kind in ('int', 'float'):
+                values = column.values
+                if not isinstance(values, array):
+                    values = array(values.format)  # Mapped column: copy once to search in C
+                    values.frombytes(column.values.cast('B'))
+                try:
+                    return [self.store.row(values.index(target))]
+                except ValueError:
+                    return None
+            for i, val in enumerate(column):
+                if val is not None and val == target:
+                    return [self.store.row(i)]
+            return None
+
+        for i, row in enumerate(self._get_data([column_name])):
             try:
-                v = float(val)
+                if float(row.get(column_name)) == target:
+                    return self.parser.parse_rows_at([i])
             except (ValueError, TypeError):
                 continue
+        return None
 
-            if v < min_val:
-                min_val = v
-                min_row = row
+    def max_by(self, column_name):
+        """
+        Returns a list containing the single row with the maximum value
+        in column_name. Fully streamed; only one pass through the data.
+        """
+        rows = self._extreme_from_stats(column_name, descending=True)
+        if rows is not None:
+            return rows
+        return self._top_numeric(column_name, descending=True, limit=1)
 
-        if min_row is None:
-            return []
-        return [min_row]
+    def min_by(self, column_name):
+        """
+        Returns a list containing the single row with the minimum value
+        in column_name. Fully streamed, one pass.
+        """
+        rows = self._extreme_from_stats(column_name, descending=False)
+        if rows is not None:
+            return rows
+        return self._top_numeric(column_name, descending=False, limit=1)
+
+    def describe(self):
+        """
+        Returns per-column statistics: kind, count, null_count, min, max,
+        sum/mean and a histogram for numeric columns, and a distinct
+        estimate. Served from ingest metadata when available, otherwise
+        computed once and kept.
+        """
+        if self.stats is None:
+            self.stats = compute_stats(self._to_store())
+        return {
+            col: {key: value for key, value in col_stats.items() if key != 'sketch'}
+            for col, col_stats in self.stats['columns'].items()
+        }
 
     def top_k_by(self, column_name, k=5):
         """
         Returns top K rows sorted by a numeric column.
-        Loads data only once.
+        Uses a bounded heap: O(n log k) time, O(k) memory.
+        """
+        return self._top_numeric(column_name, descending=True, limit=k)
+
+    def join(self, right_dataframe, left_on, right_on, memory_limit=None, spill_dir=None):
+        """
+        Implements an inner join operation.
+        Returns a new DataFrame with the joined data. If both key columns
+        are known to be in order (sorted at ingest or through a sorted
+        index) a streaming merge join runs, whatever the input sizes.
+        Otherwise the smaller side is hashed; past `memory_limit` bytes
+        the hash join spills to disk (see engine/joins.py).
+
+        File-backed inputs larger than `memory_limit` (see _footprint)
+        that cannot be merged are never loaded: their rows are streamed
+        from the parser or the mapped sidecar into spill_join(), and the
+        output is written to a temporary sidecar under `spill_dir` and
+        mapped.
         """
-        buffer = []
+        filepath_tag = right_dataframe.filepath if right_dataframe.filepath else 'joined'
+        limit = memory_limit or DEFAULT_MEMORY_LIMIT
+        mergeable = self._has_key_order(left_on) and right_dataframe._has_key_order(right_on)
+        if not mergeable and self._footprint() + right_dataframe._footprint() > limit and \
+                (self.filepath is not None or right_dataframe.filepath is not None):
+            return _spill_join(self, right_dataframe, left_on, right_on, filepath_tag, limit, spill_dir)
+
+        left = self._to_store()
+        right = right_dataframe._to_store()
+        store = join(
+            left, right, left_on, right_on, filepath_tag,
+            left_order=self._key_order(left_on, left),
+            right_order=right_dataframe._key_order(right_on, right),
+            memory_limit=memory_limit, spill_dir=spill_dir
+        )
+        return DataFrame(source=store)
+
+    def _footprint(self):
+        """
+        Rough size of the rows in bytes: the size of the columns when
+        there is a store (a mapped sidecar's binary columns included),
+        else the CSV's size.
+        """
+        if self.store is not None:
+            return sum(self.store.column(col).nbytes for col in self.store.header)
+        try:
+            return os.path.getsize(self.filepath)
+        except OSError:
+            return 0
+
+    def _keyed_tuples(self, column_name):
+        """Streams (key, row tuple in header order) pairs without loading the data."""
+        return _keyed_tuples(self.header, self._get_data(), column_name)
 
-        for row in self._get_data():
-            val = row.get(column_name)
-            if val is None:
+
+def _keyed_tuples(header, rows, column_name):
+    """Row dicts -> (key, row tuple in header order) pairs."""
+    rows = (tuple(row.get(col) for col in header) for row in rows)
+    if column_name not in header:
+        return ((None, values) for values in rows)
+    key = header.index(column_name)
+    return ((values[key], values) for values in rows)
+
+
+def _spill_join(left, right, left_on, right_on, filepath_tag, limit, spill_dir):
+    """
+    Joins two inputs without loading either: their rows are streamed
+    into spill_join() and the output is written to a temporary sidecar
+    (_spilled_frame). An input is a DataFrame, or anything with the same
+    header, column_types, _footprint() and _keyed_tuples() (the lazy
+    plan's join inputs, engine/plan.py).
+    """
+    # Output schema as in engine/joins.join_output()
+    header = list(left.header)
+    column_types = {col: left.column_types.get(col, 'str') for col in left.header}
+    keep = []
+    for n, col in enumerate(right.header):
+        if col == right_on:
+            continue
+        name = col if col not in column_types else f"{filepath_tag}.{col}"
+        header.append(name)
+        column_types[name] = right.column_types.get(col, 'str')
+        keep.append(n)
+
+    if left._footprint() < right._footprint():
+        build, probe = left._keyed_tuples(left_on), right._keyed_tuples(right_on)
+        combine = lambda left_row, right_row: left_row + tuple(right_row[n] for n in keep)
+        width = len(left.header)
+    else:
+        build, probe = right._keyed_tuples(right_on), left._keyed_tuples(left_on)
+        combine = lambda right_row, left_row: left_row + tuple(right_row[n] for n in keep)
+        width = len(right.header)
+
+    rows = spill_join(build, probe, combine, width, limit, spill_dir)
+    return _spilled_frame(header, column_types, rows, spill_dir)
+
+
+def _spilled_frame(header, column_types, rows, spill_dir=None):
+    """
+    A DataFrame over a stream of row tuples (in header order) that is
+    written to a temporary sidecar under `spill_dir` and mapped. The file
+    is unlinked right away; the mapping stays valid until the store goes
+    away.
+    """
+    fd, path = tempfile.mkstemp(prefix='aistoria-', suffix=SIDECAR_SUFFIX, dir=spill_dir)
+    os.close(fd)
+    writer = SidecarWriter(path, header, column_types, spill_dir)
+    try:
+        for row in rows:
+            writer.append(row)
+    except BaseException:
+        writer.discard()
+        os.remove(path)
+        raise
+    writer.close()
+    store = open_sidecar(path)
+    os.remove(path)
+    return DataFrame(source=store)
+
+
+def _aggregate_groups(groups, agg_func_map):
+    """Reduces each group of rows with the functions in `agg_func_map`."""
+    results = {}
+    for key, rows in groups.items():
+        agg_result = {}
+        for col, func in agg_func_map.items():
+            if func == 'count':
+                agg_result[col] = len(rows)
                 continue
-            try:
-                v = float(val)
-            except Exception:
+            if func not in ('sum', 'avg', 'min', 'max'):
                 continue
 
-            buffer.append((v, row))
+            if isinstance(rows, RowView):
+                values = rows.values(col)
+                numeric = rows.column_kind(col) in ('int', 'float')
+            else:
+                values = (row[col] for row in rows)
+                numeric = False
+            agg_result[col] = _aggregate_values(values, func, numeric)
 
-        buffer.sort(key=lambda x: x[0], reverse=True)
-        return [r for _, r in buffer[:k]]
+        results[key] = agg_result
+    return results
 
-    def join(self, right_dataframe, left_on, right_on):
-        """
-        Implements an inner join operation.
-        Returns a new DataFrame with the joined data.
-        """
-        joined_data = []
-
-        # Build the hash table (dictionary) from the right table
-        right_rows_by_key = {}
-        for right_row in right_dataframe._get_data():
-            key = right_row.get(right_on)
-            if key not in right_rows_by_key:
-                right_rows_by_key[key] = []
-            right_rows_by_key[key].append(right_row)
-
-        # Now stream the left table and perform the join
-        for left_row in self._get_data():
-            left_key = left_row.get(left_on)
-            if left_key in right_rows_by_key:
-                for right_row in right_rows_by_key[left_key]:
-                    new_row = left_row.copy()
-                    for key, value in right_row.items():
-                        if key == right_on:
-                            continue
-                        if key not in new_row:
-                            new_row[key] = value
-                        else:
-                            filepath_tag = right_dataframe.filepath if right_dataframe.filepath else 'joined'
-                            new_row[f"{filepath_tag}.{key}"] = value
-                    joined_data.append(new_row)
-
-        return DataFrame(source=joined_data)
+
+def _aggregate_values(values, func, numeric=False):
+    """
+    Reduces an iterable of values with one of sum/avg/min/max.
+    Values that cannot be converted with float() are skipped. When
+    `numeric` is True every value is already an int or float, so the
+    reduction runs without per-value error handling.
+    """
+    if numeric:
+        if func == 'sum':
+            return sum(map(float, values))
+        if func == 'min':
+            return min(map(float, values), default=None)
+        if func == 'max':
+            return max(map(float, values), default=None)
+        floats = list(map(float, values))
+        return sum(floats) / len(floats) if floats else 0
+
+    total = 0
+    count = 0
+    min_val = None
+    max_val = None
+    for value in values:
+        try:
+            val = float(value)
+        except (ValueError, TypeError):
+            continue
+        total += val
+        count += 1
+        if min_val is None or val < min_val:
+            min_val = val
+        if max_val is None or val > max_val:
+            max_val = val
+
+    if func == 'sum':
+        return total
+    if func == 'avg':
+        return total / count if count > 0 else 0
+    if func == 'min':
+        return min_val
+    return max_val
+
+
+class GroupBy(Mapping):
+    """
+    Result of DataFrame.groupby(): a read-only mapping of group key to a
+    RowView of the group's rows. The groups are built on first access,
+    so aggregate() can skip them entirely.
+    """
+
+    def __init__(self, df, column_name):
+        self.df = df
+        self.column_name = column_name
+        self._groups = None
+
+    def _compute(self):
+        if self._groups is None:
+            self._groups = self.df._group_rows(self.column_name)
+        return self._groups
+
+    def aggregate(self, agg_func_map):
+        """Aggregates without building the groups (see groupby_agg)."""
+        return self.df.groupby_agg(self.column_name, agg_func_map)
+
+    def __getitem__(self, key):
+        return self._compute()[key]
+
+    def __iter__(self):
+        return iter(self._compute())
+
+    def __len__(self):
+        return len(self._compute())
+
+    def __repr__(self):
+        return f"GroupBy({self.column_name!r})"
+
+
+def _groupby_agg_store(store, column_name, agg_func_map, indices=None, memory_limit=None):
+    """
+    groupby_agg() over a ColumnStore, optionally restricted to the rows
+    at `indices`. Numeric columns skip the per-value float() guard.
+    """
+    if column_name not in store.columns:
+        return {}
+    aggregator = HashAggregator(
+        agg_func_map,
+        numeric={col: column.kind in ('int', 'float') for col, column in store.columns.items()},
+        memory_limit=memory_limit,
+    )
+    keys = store.column(column_name)
+    columns = [store.column(col) for col in aggregator.value_columns]
+    if indices is not None:
+        keys = map(keys.__getitem__, indices)
+        columns = [map(column.__getitem__, indices) for column in columns]
+    aggregator.consume(keys, columns)
+    return aggregator.results()
+
+
+def _group_positions(column, indices=None):
+    """
+    Maps each non-null key of `column` to the list of row positions
+    holding it, optionally only over the rows at `indices`.
+    """
+    positions = {}
+    keys = column if indices is None else map(column.__getitem__, indices)
+    rows = range(len(column)) if indices is None else indices
+    for i, key in zip(rows, keys):
+        if key is not None:
+            if key not in positions:
+                positions[key] = []
+            positions[key].append(i)
+    return positions
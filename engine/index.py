@@ -0,0 +1,210 @@
+# engine/index.py
+"""
+Persistent secondary indexes on a single table column.
+
+  - HashIndex:   value -> row positions. Answers `==` and `in`.
+  - SortedIndex: the column's non-null values in sorted order, each with
+                 its row position. Answers `==`, `in`, `<`, `<=`, `>` and
+                 `>=` with a binary search.
+
+Indexes are built from the ingested columns and saved next to the CSV
+(`orders.csv` -> `orders.csv.hash-customer_id.idx`) as typed arrays in
+the sidecar layout (engine/storage.write_arrays), never pickled. Like
+the columnar sidecar, an index older than its CSV is ignored.
+
+lookup(op, value) returns the matching row positions in ascending order,
+or None when the index cannot answer the operator. Nulls are never
+indexed, and a value that cannot be compared with the column (e.g. a str
+against an int column) matches nothing, as in engine/predicates.py.
+"""
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from urllib.parse import quote
+
+from .columnar import ARRAY_TYPECODES
+from .storage import pack_strings, read_arrays, unpack_strings, write_arrays
+
+INDEX_KINDS = ('hash', 'sorted')
+INDEX_SUFFIX = '.idx'
+INDEX_MAGIC = b'AISTIDX1'
+
+# Column kinds that can be indexed
+_INDEXABLE = ('int', 'float', 'str')
+
+
+def index_path(filepath, column, kind):
+    """Returns the index file location for one column of a CSV file."""
+    return f"{filepath}.{kind}-{quote(column, safe='')}{INDEX_SUFFIX}"
+
+
+class HashIndex:
+    kind = 'hash'
+
+    def __init__(self, column, positions, value_kind):
+        self.column = column
+        self.positions = positions
+        self.value_kind = value_kind
+
+    @classmethod
+    def build(cls, column_name, column):
+        positions = {}
+        for i, value in enumerate(column):
+            if value is None:
+                continue
+            bucket = positions.get(value)
+            if bucket is None:
+                bucket = positions[value] = array('q')
+            bucket.append(i)
+        return cls(column_name, positions, column.kind)
+
+    def lookup(self, op, value):
+        if op == '==':
+            values = (value,)
+        elif op == 'in':
+            values = set(value)
+        else:
+            return None
+        found = []
+        for v in values:
+            try:
+                found.extend(self.positions.get(v, ()))
+            except TypeError:  # Unhashable lookup value
+                continue
+        return sorted(found) if len(values) > 1 else found
+
+    def _arrays(self):
+        starts = array('q', [0])
+        positions = array('q')
+        for bucket in self.positions.values():
+            positions.extend(bucket)
+            starts.append(len(positions))
+        return dict(_pack_keys(self.value_kind, self.positions), starts=starts, positions=positions)
+
+    @classmethod
+    def _load(cls, column, value_kind, arrays):
+        starts, positions = arrays['starts'], arrays['positions']
+        buckets = {
+            key: positions[starts[n]:starts[n + 1]]
+            for n, key in enumerate(_unpack_keys(value_kind, arrays))
+        }
+        return cls(column, buckets, value_kind)
+
+
+class SortedIndex:
+    kind = 'sorted'
+
+    def __init__(self, column, keys, positions, value_kind):
+        self.column = column
+        self.keys = keys
+        self.positions = positions
+        self.value_kind = value_kind
+
+    @classmethod
+    def build(cls, column_name, column):
+        pairs = sorted((value, i) for i, value in enumerate(column) if value is not None)
+        typecode = ARRAY_TYPECODES.get(column.kind)
+        keys = [value for value, _ in pairs]
+        if typecode:
+            keys = array(typecode, keys)
+        return cls(column_name, keys, array('q', [i for _, i in pairs]), column.kind)
+
+    def _range(self, op, value):
+        keys = self.keys
+        if op == '==':
+            return bisect_left(keys, value), bisect_right(keys, value)
+        if op == '<':
+            return 0, bisect_left(keys, value)
+        if op == '<=':
+            return 0, bisect_right(keys, value)
+        if op == '>':
+            return bisect_right(keys, value), len(keys)
+        return bisect_left(keys, value), len(keys)
+
+    def lookup(self, op, value):
+        if op == 'in':
+            found = set()
+            for v in set(value):
+                found.update(self.lookup('==', v))
+            return sorted(found)
+        if op not in ('==', '<', '<=', '>', '>='):
+            return None
+        try:
+            lo, hi = self._range(op, value)
+        except TypeError:
+            return []
+        return sorted(self.positions[lo:hi])
+
+    def _arrays(self):
+        return dict(_pack_keys(self.value_kind, self.keys), positions=self.positions)
+
+    @classmethod
+    def _load(cls, column, value_kind, arrays):
+        keys = arrays['keys'] if value_kind in ARRAY_TYPECODES else _unpack_keys(value_kind, arrays)
+        return cls(column, keys, arrays['positions'], value_kind)
+
+
+_INDEX_CLASSES = {'hash': HashIndex, 'sorted': SortedIndex}
+
+
+def _pack_keys(value_kind, keys):
+    """Index keys as write_arrays() arrays: typed for numbers, offsets + UTF-8 for str."""
+    if value_kind in ARRAY_TYPECODES:
+        return {'keys': array(ARRAY_TYPECODES[value_kind], keys)}
+    offsets, data = pack_strings(keys)
+    return {'keys': offsets, 'key_data': data}
+
+
+def _unpack_keys(value_kind, arrays):
+    if value_kind in ARRAY_TYPECODES:
+        return arrays['keys']
+    return unpack_strings(arrays['keys'], arrays['key_data'])
+
+
+def build_index(store, column, kind):
+    """Builds a `kind` index over one column of a ColumnStore."""
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown index kind: {kind}")
+    if column not in store.columns:
+        raise KeyError(column)
+    values = store.column(column)
+    if values.kind not in _INDEXABLE:
+        raise ValueError(f"Column '{column}' holds mixed values and cannot be indexed")
+    if kind == 'hash':
+        return HashIndex.build(column, values)
+    return SortedIndex.build(column, values)
+
+
+def write_index(filepath, index):
+    """Saves an index next to its CSV file."""
+    path = index_path(filepath, index.column, index.kind)
+    meta = {'kind': index.kind, 'column': index.column, 'value_kind': index.value_kind}
+    write_arrays(path, INDEX_MAGIC, meta, index._arrays())
+    return path
+
+
+def open_index(filepath, column, kind):
+    """Loads a column's index, or returns None if it is missing, stale or not an index."""
+    path = index_path(filepath, column, kind)
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(filepath):
+            return None
+    except OSError:
+        return None
+    try:
+        meta, arrays = read_arrays(path, INDEX_MAGIC)
+        cls = _INDEX_CLASSES[meta['kind']]
+        if meta['value_kind'] not in _INDEXABLE or meta['kind'] != kind or meta['column'] != column:
+            return None
+        return cls._load(column, meta['value_kind'], arrays)
+    except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+        print(f"Error opening index {path}: {e}")
+        return None
+
+
+def remove_indexes(filepath, indexes):
+    """Deletes the index files of a table ({column: kind})."""
+    for column, kind in (indexes or {}).items():
+        path = index_path(filepath, column, kind)
+        if os.path.exists(path):
+            os.remove(path)
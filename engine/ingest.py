@@ -0,0 +1,485 @@
+# engine/ingest.py
+"""
+Turning an uploaded CSV into its binary columnar sidecar.
+
+ingest_csv() parses the file once into columns, computes the column
+statistics and zone maps (engine/stats.py) from them and writes the
+sidecar (engine/storage.py). It runs under the sidecar's cross-process
+lock, so when several workers need the same table only one of them
+parses it and the rest map the result.
+
+ingest_stream() does the same reading the file as a stream of blocks:
+each block is tokenized and its columns are cast right away into typed
+arrays, so no column is held as raw strings. A column starts as int and
+widens to float or str when a block needs it; types are inferred over
+every value rather than a sample, and the numeric conversion made while
+inferring is the one that is stored. Only a column that turns to text
+after holding numbers is read again (the cast lost their text, '007').
+
+ingest_upload() runs ingest_stream() straight off an upload's request
+stream and writes the raw bytes to the CSV's path as they are read, so
+an upload is received, saved and parsed in a single pass.
+
+ChunkedIngest is the resumable variant for uploads that arrive in
+chunks, across requests and worker processes: each chunk is tokenized
+and typed as it lands, and finish() only joins the results.
+
+Compressed input (gzip, bz2, xz; see engine/compression.py) is read
+through a streaming decompressor and the file stays compressed on disk.
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+
+from .columnar import ColumnBuilder, ColumnStore
+from .compression import compression_of, decompressing
+from .dataframe import DataFrame
+from .parser import CsvParser, _cast_column
+from .stats import compute_stats, compute_zone_maps, stamp_stats
+from .storage import file_lock, has_fresh_sidecar, open_sidecar, sidecar_lock, sidecar_path, write_sidecar
+from .tokenizer import DEFAULT_BLOCK_SIZE, BlockTokenizer
+
+
+def _write_sidecar(filepath, store):
+    # Statistics and per-block zone maps come from the parsed columns,
+    # not a second pass over the file
+    stats = stamp_stats(compute_stats(store), filepath)
+    write_sidecar(sidecar_path(filepath), store, extra_meta={
+        'stats': stats,
+        'zone_maps': compute_zone_maps(store),
+    })
+    return stats
+
+
+def _build_sidecar(filepath, workers):
+    df = DataFrame(source=filepath, columnar=True, workers=workers, tokenizer='block')
+    return df, _write_sidecar(filepath, df.store)
+
+
+def ingest_csv(filepath, workers=None):
+    """
+    Parses `filepath` and writes its sidecar. Returns the in-memory
+    DataFrame and the column statistics.
+    """
+    with sidecar_lock(filepath):
+        return _build_sidecar(filepath, workers)
+
+
+def ensure_sidecar(filepath, workers=None):
+    """Builds the sidecar of a CSV that has none (or a stale one), once."""
+    if has_fresh_sidecar(filepath):
+        return
+    with sidecar_lock(filepath):
+        if has_fresh_sidecar(filepath):
+            return  # Another worker built it while we waited
+        _build_sidecar(filepath, workers)
+
+
+# ---------- Single-pass streaming ingest ----------
+
+def _convert(chunk, kind):
+    """The chunk cast to `kind`, or None if a non-empty value does not convert."""
+    convert = int if kind == 'int' else float
+    try:
+        if '' in chunk:
+            return [convert(v) if v != '' else None for v in chunk]
+        return list(map(convert, chunk))
+    except ValueError:
+        return None
+
+
+def infer_column(chunks):
+    """
+    Infers the type of a column from all of its raw string chunks and
+    returns (kind, cast chunks). Starts at 'int' and only steps down to
+    'float' or 'str' when a value does not convert; empty strings are
+    nulls.
+    """
+    kind = 'int'
+    cast = []
+    for i, chunk in enumerate(chunks):
+        converted = _convert(chunk, kind) if kind != 'str' else None
+        if converted is None and kind == 'int':
+            # Every int converts to float: redo the chunks cast so far
+            kind = 'float'
+            cast = [_convert(c, 'float') for c in chunks[:i]]
+            converted = _convert(chunk, 'float')
+        if converted is None:
+            kind = 'str'
+            break
+        cast.append(converted)
+    if kind == 'str':
+        return kind, [_cast_column(chunk, 'str') for chunk in chunks]
+    return kind, cast
+
+
+def _read_header(stream, separator, block_size):
+    """Reads until the first full line; returns (header, bytes read, rest)."""
+    buf = b''
+    while b'\n' not in buf:
+        block = stream.read(block_size)
+        if not block:
+            break
+        buf += block
+    line, newline, rest = buf.partition(b'\n')
+    rows, _ = BlockTokenizer(separator).feed(line + b'\n')
+    return (list(rows[0]) if rows else []), line + newline, rest
+
+
+class _StreamColumn:
+    """One column of a streamed ingest, cast block by block (see the module docstring)."""
+
+    def __init__(self):
+        self.kind = 'int'
+        self.builder = ColumnBuilder('int')
+        self.numbers = False  # A non-null value was cast to a number
+        self.reread = False
+
+    def _widen(self, kind):
+        column = self.builder.finish()
+        self.builder = ColumnBuilder(kind)
+        if kind == 'float':
+            self.builder.extend(float(v) if v is not None else None for v in column)
+        else:  # Only nulls so far
+            self.builder.extend([None] * len(column))
+        self.kind = kind
+
+    def add(self, values):
+        if self.reread:
+            return
+        if self.kind == 'str':
+            self.builder.extend(_cast_column(values, 'str'))
+            return
+        cast = _convert(values, self.kind)
+        if cast is None and self.kind == 'int':
+            cast = _convert(values, 'float')
+            if cast is not None:
+                self._widen('float')
+        if cast is None:
+            if self.numbers:
+                self.kind = 'str'
+                self.builder = None
+                self.reread = True
+                return
+            self._widen('str')
+            self.builder.extend(_cast_column(values, 'str'))
+            return
+        if not self.numbers:
+            self.numbers = any(v is not None for v in cast)
+        self.builder.extend(cast)
+
+
+def _read_text_columns(filepath, separator, names):
+    """The columns `names` of a CSV file, read again as strings."""
+    parser = CsvParser(filepath, separator=separator, infer_types=False, tokenizer='block')
+    store = ColumnStore.from_columns(parser.parse_columns(columns=names), names, dict.fromkeys(names, 'str'))
+    return store.columns
+
+
+def ingest_stream(stream, filepath, separator=',', block_size=DEFAULT_BLOCK_SIZE, progress=None):
+    """
+    Streaming ingest of the CSV at `filepath`; `stream` is the open
+    binary file, or a decompressor over it (engine/compression.py).
+    `progress(bytes_read)` is called after every block. Returns the
+    DataFrame (mapped from the new sidecar) and the column statistics.
+    """
+    with sidecar_lock(filepath):
+        header, head, rest = _read_header(stream, separator, block_size)
+        done = len(head)
+        tokenizer = BlockTokenizer(separator, width=len(header))
+        accumulators = [_StreamColumn() for _ in header]
+        num_rows = 0
+        malformed = 0
+
+        def consume(columns, bad):
+            nonlocal num_rows, malformed
+            malformed += len(bad)
+            if columns and columns[0]:
+                num_rows += len(columns[0])
+                for accumulator, values in zip(accumulators, columns):
+                    accumulator.add(values)
+
+        block = rest or stream.read(block_size)
+        while block:
+            done += len(block)
+            consume(*tokenizer.feed(block, as_columns=True))
+            if progress is not None:
+                progress(done)
+            block = stream.read(block_size)
+        consume(*tokenizer.close(as_columns=True))
+
+        if malformed:
+            print(f"Warning: Skipped {malformed} malformed lines in {filepath}")
+
+        columns = {
+            col: accumulator.builder.finish()
+            for col, accumulator in zip(header, accumulators) if not accumulator.reread
+        }
+        reread = [col for col, accumulator in zip(header, accumulators) if accumulator.reread]
+        if reread:
+            columns.update(_read_text_columns(filepath, separator, reread))
+        column_types = {col: accumulator.kind for col, accumulator in zip(header, accumulators)}
+        print(f"Inferred types for {filepath}: {column_types}")
+
+        stats = _write_sidecar(filepath, ColumnStore(header, columns, column_types, num_rows))
+    return DataFrame(source=filepath, stats=stats), stats
+
+
+class _TeeReader(io.RawIOBase):
+    """
+    Raw binary stream over `source` that also writes every block read to
+    `out`. `out` is flushed when `source` ends, so the saved file is
+    complete before anything reads it back.
+    """
+
+    def __init__(self, source, out):
+        self.source = source
+        self.out = out
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.source.read(len(buffer))
+        if not data:
+            self.out.flush()
+            return 0
+        self.out.write(data)
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+
+def ingest_upload(source, filepath, separator=',', block_size=DEFAULT_BLOCK_SIZE, progress=None):
+    """
+    Ingests the binary stream `source` (a request body or an uploaded
+    file's stream) while saving it to `filepath`: each block is read
+    once, written to the file and parsed. Compressed uploads are saved
+    as they arrive and parsed through a decompressor. `progress(bytes)`
+    follows the bytes received. Returns what ingest_stream() returns; on
+    failure the partly written file is removed.
+    """
+    try:
+        with open(filepath, 'wb') as out:
+            raw = _TeeReader(source, out)
+            stream = io.BufferedReader(raw, block_size)
+            report = None if progress is None else (lambda _: progress(raw.position))
+            return ingest_stream(decompressing(stream), filepath, separator=separator,
+                                 block_size=block_size, progress=report)
+    except BaseException:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        raise
+
+
+# ---------- Resumable chunked ingest ----------
+
+_KIND_ORDER = {'int': 0, 'float': 1, 'str': 2}
+
+
+class ChunkOffsetError(ValueError):
+    """A chunk that does not start where the upload currently ends."""
+
+    def __init__(self, expected):
+        super().__init__(f"Chunk must start at byte {expected}")
+        self.expected = expected
+
+
+class ChunkedIngest:
+    """
+    Ingest of a CSV that arrives in chunks. All state lives in
+    `directory`, so consecutive chunks may be handled by different
+    processes:
+
+      data.csv    the bytes received so far
+      state.json  offset, header, widest type of each column so far, the
+                  length of the incomplete record at the end of data.csv,
+                  and the number of segments
+      seg-N.col   the complete records of a chunk, tokenized and cast
+                  column by column, in the sidecar format (columns are
+                  named by position; column_types holds each one's kind)
+
+Nothing in the directory is pickled: it lives in the upload folder.
+
+    append() checks the chunk's SHA-256 and its offset (it must start
+    where the data ends, so a client that lost its connection asks for
+    the offset and resends from there), then tokenizes and types the
+    chunk right away. finish() widens the segments to the final column
+    types and writes the sidecar. Calls are serialized by a lock across
+    processes, and the state file is replaced atomically.
+    """
+
+    def __init__(self, directory, separator=','):
+        self.directory = directory
+        self.separator = separator
+
+    @classmethod
+    def create(cls, directory, separator=','):
+        os.makedirs(directory, exist_ok=True)
+        ingest = cls(directory, separator)
+        open(ingest._path('data.csv'), 'wb').close()
+        ingest._save_state({
+            'offset': 0, 'header': None, 'kinds': None, 'pending': 0,
+            'line_number': 0, 'segments': 0, 'rows': 0, 'malformed': 0, 'compression': None,
+        })
+        return ingest
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _load_state(self):
+        with open(self._path('state.json'), encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_state(self, state):
+        tmp = self._path('state.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp, self._path('state.json'))
+
+    def _pending_bytes(self, state):
+        """The incomplete record at the end of data.csv, not tokenized yet."""
+        with open(self._path('data.csv'), 'rb') as f:
+            f.seek(state['offset'] - state['pending'])
+            return f.read(state['pending'])
+
+    @property
+    def offset(self):
+        """Bytes received so far; the next chunk starts here."""
+        return self._load_state()['offset']
+
+    def append(self, offset, data, sha256=None):
+        """
+        Adds the chunk `data` starting at byte `offset`. Raises
+        ValueError on a checksum mismatch and ChunkOffsetError if the
+        offset is not the current one. Returns the new offset.
+        """
+        if sha256 is not None and hashlib.sha256(data).hexdigest() != sha256.lower():
+            raise ValueError("Chunk checksum mismatch")
+        with file_lock(self._path('state')):
+            state = self._load_state()
+            if offset != state['offset']:
+                raise ChunkOffsetError(state['offset'])
+            pending = self._pending_bytes(state)
+            with open(self._path('data.csv'), 'r+b') as f:
+                f.truncate(offset)  # Drops the bytes of an append that failed halfway
+                f.seek(offset)
+                f.write(data)
+            if offset == 0:
+                state['compression'] = compression_of(data)
+            if state.get('compression') is None:
+                # Compressed data is parsed on finish(): a decompressor's
+                # state cannot be carried from one request to the next
+                self._tokenize(state, pending + data, final=False)
+            state['offset'] = offset + len(data)
+            self._save_state(state)
+        return state['offset']
+
+    def _tokenize(self, state, buf, final):
+        """Turns the complete records in `buf` into a segment; keeps the rest pending."""
+        if state['header'] is None:
+            newline = buf.find(b'\n')
+            if newline < 0 and not final:
+                state['pending'] = len(buf)
+                return
+            line = buf if newline < 0 else buf[:newline]
+            rows, _ = BlockTokenizer(self.separator).feed(line + b'\n')
+            state['header'] = list(rows[0]) if rows else []
+            state['kinds'] = ['int'] * len(state['header'])
+            state['line_number'] = 1
+            buf = b'' if newline < 0 else buf[newline + 1:]
+
+        tokenizer = BlockTokenizer(self.separator, width=len(state['header']),
+                                   line_number=state['line_number'])
+        batches = [tokenizer.feed(buf, as_columns=True)]
+        if final:
+            batches.append(tokenizer.close(as_columns=True))
+        state['pending'] = len(tokenizer.pending)
+        state['line_number'] = tokenizer.line_count
+
+        for columns, malformed in batches:
+            state['malformed'] += len(malformed)
+            if not columns or not columns[0]:
+                continue
+            names = [str(i) for i in range(len(columns))]
+            segment = {}
+            kinds = {}
+            for i, values in enumerate(columns):
+                kind, cast = infer_column([values])
+                builder = ColumnBuilder(kind)
+                builder.extend(cast[0])
+                segment[names[i]] = builder.finish()
+                kinds[names[i]] = kind
+                if _KIND_ORDER[kind] > _KIND_ORDER[state['kinds'][i]] and any(v is not None for v in cast[0]):
+                    state['kinds'][i] = kind
+            write_sidecar(self._path(f"seg-{state['segments']}.col"),
+                          ColumnStore(names, segment, kinds, len(columns[0])))
+            state['segments'] += 1
+            state['rows'] += len(columns[0])
+
+    def finish(self, filepath, progress=None):
+        """
+        Completes the upload: moves the data to `filepath`, builds the
+        columns from the segments and writes the sidecar. The chunk
+        directory is removed. `progress(bytes)` reports the segments
+        joined, scaled to the file size. Returns the DataFrame and the
+        column statistics.
+        """
+        with file_lock(self._path('state')):
+            state = self._load_state()
+            if state.get('compression') is None:
+                self._tokenize(state, self._pending_bytes(state), final=True)
+                self._save_state(state)
+            os.replace(self._path('data.csv'), filepath)
+
+        if state.get('compression') is not None:
+            # Kept compressed on disk; parsed now in one streaming pass
+            with open(filepath, 'rb') as raw:
+                report = None if progress is None else (lambda _: progress(raw.tell()))
+                result = ingest_stream(decompressing(raw), filepath,
+                                       separator=self.separator, progress=report)
+            shutil.rmtree(self.directory, ignore_errors=True)
+            return result
+
+        if state['malformed']:
+            print(f"Warning: Skipped {state['malformed']} malformed lines in {filepath}")
+        header = state['header'] or []
+        kinds = state['kinds'] or []
+
+        with sidecar_lock(filepath):
+            builders = [ColumnBuilder(kind) for kind in kinds]
+            reread = []
+            for n in range(state['segments']):
+                segment = open_sidecar(self._path(f"seg-{n}.col"))
+                for i, name in enumerate(segment.header):
+                    if builders[i] is None:
+                        continue
+                    kind, values = segment.column_types[name], list(segment.column(name))
+                    if kind != kinds[i] and any(v is not None for v in values):
+                        if kinds[i] == 'float':
+                            values = [float(v) if v is not None else None for v in values]
+                        else:
+                            # Numbers cast earlier lost their text ('007');
+                            # this column is read again as strings
+                            builders[i] = None
+                            reread.append(i)
+                            continue
+                    builders[i].extend(values)
+                if progress is not None:
+                    progress(state['offset'] * (n + 1) // state['segments'])
+
+            columns = {col: builder.finish() for col, builder in zip(header, builders) if builder is not None}
+            if reread:
+                columns.update(_read_text_columns(filepath, self.separator, [header[i] for i in reread]))
+            column_types = dict(zip(header, kinds))
+            print(f"Inferred types for {filepath}: {column_types}")
+            stats = _write_sidecar(filepath, ColumnStore(header, columns, column_types, state['rows']))
+
+        shutil.rmtree(self.directory, ignore_errors=True)
+        return DataFrame(source=filepath, stats=stats), stats
@@ -0,0 +1,337 @@
+# engine/joins.py
+"""
+Join algorithms over ColumnStores.
+
+hash_join() is an inner equi-join that never materializes row dicts:
+
+  - The smaller input (by row count) is the build side; its key column
+    goes into a hash table of row positions and the other side probes it.
+  - If the build side would exceed the memory budget, both sides are
+    hash-partitioned into spill files of (key, position) pairs and each
+    partition pair is joined on its own (grace hash join), so only one
+    partition's hash table is in memory at a time. A partition still
+    over budget is split again with another hash; one that cannot be
+    split (a single hot key) is joined by block nested loops, one
+    budget-sized slice of its build side at a time.
+  - Matches are streamed into two compact position arrays (8 bytes per
+    side per output row, no row dicts or tuples); the output columns are
+    then taken from the inputs column by column.
+
+spill_join() is the same grace join for inputs that are not in memory
+at all: the spill files hold whole rows, read from a CSV parser or a
+mapped sidecar, and the joined rows are yielded as they are produced.
+DataFrame.join() writes them to a new sidecar
+(engine/storage.SidecarWriter), so neither the inputs nor the output
+are ever held in memory.
+
+merge_join_positions() is the sort-merge alternative for inputs whose
+keys are already in order (a column flagged sorted at ingest, or a
+sorted index): both sides are walked once in key order and only the
+current key group of each side is held in memory. join() picks the merge
+join when both sides come with a key order and the hash join otherwise.
+
+Row order follows the probe side (the left input when it is the larger
+one); spilled joins return rows grouped by partition and merge joins
+in key order. Rows whose keys
+are equal join, including null keys, and a missing key column acts as an
+all-null key.
+"""
+import os
+import pickle
+import shutil
+import tempfile
+from array import array
+from itertools import chain, islice, repeat
+
+from .columnar import ColumnStore
+
+# Default budget for the build side's in-memory hash table.
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+
+# Rough footprint of one build row: dict slot, key object and its
+# position in a list.
+_ENTRY_BYTES = 120
+# ... plus this much per value for rows held whole (spill_join)
+_VALUE_BYTES = 64
+
+# (key, position) pairs per pickled chunk in a partition file
+_SPILL_CHUNK = 65_536
+
+_MAX_PARTITIONS = 256
+# Times an over-budget partition is split again before nested loops
+_MAX_DEPTH = 3
+
+
+def _keys(store, column):
+    if column in store.columns:
+        return store.column(column)
+    return repeat(None, store.num_rows)
+
+
+def _build_table(keyed):
+    """Hash table of key -> row positions from (key, position) pairs."""
+    table = {}
+    for key, position in keyed:
+        matches = table.get(key)
+        if matches is None:
+            table[key] = [position]
+        else:
+            matches.append(position)
+    return table
+
+
+def _probe(table, keyed, build_is_left, left_idx, right_idx):
+    """Appends the (left, right) positions of every match to the arrays."""
+    get = table.get
+    probe_out, build_out = (right_idx, left_idx) if build_is_left else (left_idx, right_idx)
+    add_probe = probe_out.append
+    add_build = build_out.append
+    for key, position in keyed:
+        matches = get(key)
+        if matches:
+            if len(matches) == 1:
+                add_probe(position)
+                add_build(matches[0])
+            else:
+                probe_out.extend(repeat(position, len(matches)))
+                build_out.extend(matches)
+
+
+def _partition(keyed, directory, name, partitions, salt=0):
+    """
+    Spills (key, payload) pairs into `partitions` files by key hash
+    (salted, so a partition can be split again with another hash).
+    Returns (paths, pair count per partition, whether each partition
+    holds more than one distinct key).
+    """
+    paths = [os.path.join(directory, f"{name}-{p}.pkl") for p in range(partitions)]
+    files = [open(path, 'wb') for path in paths]
+    buffers = [[] for _ in range(partitions)]
+    counts = [0] * partitions
+    first_keys = [None] * partitions
+    mixed = [False] * partitions
+    try:
+        for key, payload in keyed:
+            p = hash((salt, key) if salt else key) % partitions
+            if not counts[p]:
+                first_keys[p] = key
+            elif not mixed[p] and key != first_keys[p]:
+                mixed[p] = True
+            counts[p] += 1
+            buffer = buffers[p]
+            buffer.append((key, payload))
+            if len(buffer) >= _SPILL_CHUNK:
+                pickle.dump(buffer, files[p], protocol=pickle.HIGHEST_PROTOCOL)
+                buffer.clear()
+        for buffer, f in zip(buffers, files):
+            if buffer:
+                pickle.dump(buffer, f, protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        for f in files:
+            f.close()
+    return paths, counts, mixed
+
+
+def _read_partition(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                return
+            yield from chunk
+
+
+def _slices(pairs, size):
+    """Consecutive lists of at most `size` pairs."""
+    pairs = iter(pairs)
+    while True:
+        chunk = list(islice(pairs, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _partition_count(pairs, budget):
+    return min(_MAX_PARTITIONS, 2 * (pairs // max(budget, 1) + 1))
+
+
+def _grace_pairs(build, probe, budget, directory, partitions, depth=0):
+    """
+    Yields (build payload, probe payload) for every key match between two
+    streams of (key, payload) pairs, holding at most `budget` build pairs
+    in a hash table at a time (see the module docstring).
+    """
+    build_paths, counts, mixed = _partition(build, directory, 'build', partitions, salt=depth)
+    probe_paths, _, _ = _partition(probe, directory, 'probe', partitions, salt=depth)
+    for n, (build_path, probe_path) in enumerate(zip(build_paths, probe_paths)):
+        if counts[n] > budget and mixed[n] and depth < _MAX_DEPTH:
+            # Still over budget: split this partition pair with another hash
+            sub = tempfile.mkdtemp(dir=directory)
+            yield from _grace_pairs(_read_partition(build_path), _read_partition(probe_path), budget,
+                                    sub, _partition_count(counts[n], budget), depth + 1)
+            shutil.rmtree(sub, ignore_errors=True)
+        elif counts[n]:
+            # Fits, or one key that no hash can split: block nested loops
+            # over budget-sized slices of the build side
+            for chunk in _slices(_read_partition(build_path), max(budget, 1)):
+                get = _build_table(chunk).get
+                for key, payload in _read_partition(probe_path):
+                    for match in get(key, ()):
+                        yield match, payload
+        os.remove(build_path)
+        os.remove(probe_path)
+
+
+def _grace_join(build, probe, build_is_left, budget, spill_dir, left_idx, right_idx):
+    directory = tempfile.mkdtemp(prefix='aistoria-join-', dir=spill_dir)
+    try:
+        pairs = _grace_pairs(build, probe, budget, directory, _partition_count(0, budget))
+        for build_pos, probe_pos in pairs:
+            left_idx.append(build_pos if build_is_left else probe_pos)
+            right_idx.append(probe_pos if build_is_left else build_pos)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def join_positions(left, right, left_on, right_on, memory_limit=None, spill_dir=None):
+    """
+    The matching (left positions, right positions) of the inner join of
+    two ColumnStores, as two array('q') (see the module docstring).
+    """
+    left_idx = array('q')
+    right_idx = array('q')
+    build_is_left = left.num_rows < right.num_rows
+    build, probe = (left, right) if build_is_left else (right, left)
+    build_keyed = zip(_keys(build, left_on if build_is_left else right_on), range(build.num_rows))
+    probe_keyed = zip(_keys(probe, right_on if build_is_left else left_on), range(probe.num_rows))
+
+    limit = memory_limit or DEFAULT_MEMORY_LIMIT
+    needed = build.num_rows * _ENTRY_BYTES
+    if needed <= limit:
+        _probe(_build_table(build_keyed), probe_keyed, build_is_left, left_idx, right_idx)
+    else:
+        _grace_join(build_keyed, probe_keyed, build_is_left, limit // _ENTRY_BYTES, spill_dir, left_idx, right_idx)
+    return left_idx, right_idx
+
+
+def join_output(left, right, right_on, filepath_tag, left_idx, right_idx):
+    """
+    Builds the joined ColumnStore from matching row positions: all left
+    columns, then the right columns minus the key. Right-side names that
+    clash with a left column are prefixed with `filepath_tag`.
+    """
+    header = list(left.header)
+    columns = {col: left.column(col).take(left_idx) for col in left.header}
+    column_types = {col: left.column_types.get(col, 'str') for col in left.header}
+    for col in right.header:
+        if col == right_on:
+            continue
+        name = col if col not in columns else f"{filepath_tag}.{col}"
+        header.append(name)
+        columns[name] = right.column(col).take(right_idx)
+        column_types[name] = right.column_types.get(col, 'str')
+    return ColumnStore(header, columns, column_types, len(left_idx))
+
+
+def hash_join(left, right, left_on, right_on, filepath_tag='joined', memory_limit=None, spill_dir=None):
+    """Inner hash join of two ColumnStores; returns the joined ColumnStore."""
+    left_idx, right_idx = join_positions(left, right, left_on, right_on, memory_limit, spill_dir)
+    return join_output(left, right, right_on, filepath_tag, left_idx, right_idx)
+
+
+def spill_join(build, probe, combine, width, memory_limit=None, spill_dir=None):
+    """
+    Inner join of two streams of (key, row) pairs that are not in memory
+    (see the module docstring). Yields combine(build row, probe row) for
+    every match. The build side is hashed in memory if its first rows
+    show it fits (rows of `width` values), and grace-joined through spill
+    files of whole rows otherwise.
+    """
+    budget = max((memory_limit or DEFAULT_MEMORY_LIMIT) // (_ENTRY_BYTES + _VALUE_BYTES * width), 1)
+    build = iter(build)
+    head = list(islice(build, budget + 1))
+    if len(head) <= budget:
+        get = _build_table(head).get
+        for key, row in probe:
+            for match in get(key, ()):
+                yield combine(match, row)
+        return
+
+    directory = tempfile.mkdtemp(prefix='aistoria-join-', dir=spill_dir)
+    try:
+        pairs = _grace_pairs(chain(head, build), probe, budget, directory, _partition_count(len(head), budget))
+        head = None
+        for build_row, probe_row in pairs:
+            yield combine(build_row, probe_row)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+# ---------- Sort-merge join ----------
+
+def column_order(column):
+    """
+    Key order of a column whose non-null values are already sorted:
+    ((key, position) pairs in order, positions of the null keys).
+    """
+    if not column.null_count:
+        return zip(column.values, range(len(column))), []
+    nulls = [i for i in range(len(column)) if column.is_null(i)]
+    return ((key, i) for i, key in enumerate(column) if key is not None), nulls
+
+
+def merge_join_positions(left_order, right_order):
+    """
+    Inner merge join of two key orders (see column_order()). Returns
+    (left positions, right positions) as two array('q'). Null keys join
+    each other, as in the hash join.
+    """
+    left_idx = array('q')
+    right_idx = array('q')
+    (left_keyed, left_nulls), (right_keyed, right_nulls) = left_order, right_order
+    left_it = iter(left_keyed)
+    right_it = iter(right_keyed)
+    left = next(left_it, None)
+    right = next(right_it, None)
+    while left is not None and right is not None:
+        key = left[0]
+        if key < right[0]:
+            left = next(left_it, None)
+            continue
+        if right[0] < key:
+            right = next(right_it, None)
+            continue
+        # Equal keys: collect this key group on both sides
+        left_group = []
+        while left is not None and left[0] == key:
+            left_group.append(left[1])
+            left = next(left_it, None)
+        right_group = []
+        while right is not None and right[0] == key:
+            right_group.append(right[1])
+            right = next(right_it, None)
+        for i in left_group:
+            left_idx.extend(repeat(i, len(right_group)))
+            right_idx.extend(right_group)
+
+    for i in left_nulls:
+        left_idx.extend(repeat(i, len(right_nulls)))
+        right_idx.extend(right_nulls)
+    return left_idx, right_idx
+
+
+def join(left, right, left_on, right_on, filepath_tag='joined', left_order=None, right_order=None,
+         memory_limit=None, spill_dir=None):
+    """
+    Inner join of two ColumnStores. With a key order for both sides the
+    sort-merge join runs; otherwise (or if the keys of the two sides
+    cannot be compared) the hash join does.
+    """
+    if left_order is not None and right_order is not None:
+        try:
+            left_idx, right_idx = merge_join_positions(left_order, right_order)
+            return join_output(left, right, right_on, filepath_tag, left_idx, right_idx)
+        except TypeError:
+            pass  # e.g. int keys against str keys
+    return hash_join(left, right, left_on, right_on, filepath_tag, memory_limit, spill_dir)
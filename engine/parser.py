@@ -1,5 +1,129 @@
 # engine/parser.py
+import io
+import multiprocessing
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .compression import detect_compression, open_binary, open_text
+from .tokenizer import BlockTokenizer
+
+# Target size of one byte range handed to a parse worker. Small enough
+# that a range's rows fit comfortably in memory, large enough that the
+# per-task pickling overhead stays negligible.
+DEFAULT_RANGE_SIZE = 16 * 1024 * 1024
+
+
+def _cast(value, t):
+    """
+    Casts a single string value to type `t` ('int', 'float' or 'str').
+    Empty strings become None; values that fail to cast are kept as-is.
+    """
+    if value == '':
+        return None
+
+    if t == 'int':
+        try:
+            return int(value)
+        except ValueError:
+            # Fallback if inference was wrong
+            return value
+    elif t == 'float':
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    else:
+        return value
+
+
+def _cast_column(values, t):
+    """
+    Casts a whole column of string values to type `t` in one go, falling
+    back to per-value _cast() only when a value does not convert
+    (empty strings, or a wrong inference).
+    """
+    if t == 'int' or t == 'float':
+        try:
+            return list(map(int if t == 'int' else float, values))
+        except ValueError:
+            pass
+    elif '' not in values:
+        return values
+    return [_cast(v, t) for v in values]
+
+
+def _iter_line_records(lines, separator, line_number=0, positions=None):
+    """
+    Line-based tokenizer: splits each text line on `separator` and strips
+    every value. Yields (line_number, field_count, values, raw_line) for
+    non-blank lines, the same record shape as BlockTokenizer.
+
+    With `positions`, values holds only the fields at those positions
+    (field_count still counts every field). Lines too short to have them
+    keep their raw fields; they fail the width check anyway.
+    """
+    last = max(positions) if positions else -1
+    for line in lines:
+        line_number += 1
+        cleaned_line = line.strip()
+        if not cleaned_line:
+            continue
+        fields = cleaned_line.split(separator)
+        if positions is None:
+            values = [v.strip() for v in fields]
+        elif len(fields) > last:
+            values = [fields[i].strip() for i in positions]
+        else:
+            values = fields
+        yield line_number, len(fields), values, line
+
+
+def _parse_range(filepath, start, end, header, column_types, separator, cast, tokenizer='line',
+                 positions=None):
+    """
+    Worker entry point for parallel parsing: parses the lines in the
+    byte range [start, end) of `filepath`.
+
+    Returns (records, malformed, line_count) where records is a list of
+    value tuples in header order (or in `positions` order, when only
+    those fields are wanted), malformed holds (local line number,
+    column count, raw line) for skipped lines, and line_count is the
+    number of lines (including blank ones) the range contained.
+    """
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        chunk = f.read(end - start)
+
+    width = len(header)
+    selected = header if positions is None else [header[i] for i in positions]
+    types = [column_types.get(col, 'str') for col in selected]
+    records = []
+    malformed = []
+
+    if tokenizer == 'block':
+        tok = BlockTokenizer(separator, columns=positions, width=width)
+        for columns, bad in (tok.feed(chunk, as_columns=True), tok.close(as_columns=True)):
+            malformed.extend(bad)
+            if columns and columns[0]:
+                if cast:
+                    columns = [_cast_column(c, t) for c, t in zip(columns, types)]
+                records.extend(zip(*columns))
+    else:
+        lines = io.TextIOWrapper(io.BytesIO(chunk), encoding='utf-8')
+        for line_number, count, values, raw in _iter_line_records(lines, separator, positions=positions):
+            if count != width:
+                malformed.append((line_number, count, raw))
+                continue
+            if cast:
+                values = [_cast(v, t) for v, t in zip(values, types)]
+            records.append(tuple(values))
+
+    line_count = chunk.count(b'\n')
+    if chunk and not chunk.endswith(b'\n'):
+        line_count += 1
+    return records, malformed, line_count
+
 
 class CsvParser:
     """
@@ -11,12 +135,25 @@ class CsvParser:
       - Optional type inference from a sample of rows
       - Optional casting of values to inferred types
       - Optional chunked iteration for batch processing
+      - Optional parallel parsing of newline-aligned byte ranges
+        across a process pool
+      - Two tokenizers: 'line' (text lines split on the separator) and
+        'block' (binary blocks, RFC 4180 quoting; see engine/tokenizer.py)
+      - gzip, bz2 and xz files are decompressed while streaming
+        (always serially)
     """
-    def __init__(self, filepath, separator=',', infer_types=True, sample_size=50):
+    TOKENIZERS = ('line', 'block')
+
+    def __init__(self, filepath, separator=',', infer_types=True, sample_size=50, tokenizer='line'):
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"File not found: {filepath}")
+        if tokenizer not in self.TOKENIZERS:
+            raise ValueError(f"Unknown tokenizer {tokenizer!r}; expected one of {self.TOKENIZERS}")
         self.filepath = filepath
         self.separator = separator
+        self.tokenizer = tokenizer
+        # 'gzip', 'bz2', 'xz' or None (see engine/compression.py)
+        self.compression = detect_compression(filepath)
         self.header = self._get_header()
 
         if infer_types:
@@ -34,7 +171,13 @@ class CsvParser:
     def _get_header(self):
         """Reads only the first line of the file to get the headers."""
         try:
-            with open(self.filepath, 'r', encoding='utf-8') as f:
+            if self.tokenizer == 'block':
+                with open_binary(self.filepath) as f:
+                    for rows, _ in BlockTokenizer(self.separator).tokenize_file(f):
+                        if rows:
+                            return [h.strip() for h in rows[0]]
+                return []
+            with open_text(self.filepath) as f:
                 header_line = self._clean_line(f.readline())
             return [h.strip() for h in header_line.split(self.separator)]
         except Exception as e:
@@ -66,24 +209,65 @@ class CsvParser:
         Casts a single string value into the inferred type.
         Empty strings become None.
         """
-        if value == '':
+        return _cast(value, self.column_types.get(col_name, 'str'))
+
+    def _positions(self, columns):
+        """
+        Header positions of the requested `columns` (unknown names are
+        ignored), or None for every column. An empty selection still
+        reads the first field, so rows can be counted and width-checked.
+        """
+        if columns is None:
             return None
+        positions = [self.header.index(col) for col in columns if col in self.header]
+        return positions or [0]
 
-        t = self.column_types.get(col_name, 'str')
-
-        if t == 'int':
-            try:
-                return int(value)
-            except ValueError:
-                # Fallback if inference was wrong
-                return value
-        elif t == 'float':
-            try:
-                return float(value)
-            except ValueError:
-                return value
-        else:
-            return value
+    def _selected(self, columns):
+        """The header names parse(columns=...) will actually return."""
+        if columns is None:
+            return self.header
+        return [col for col in columns if col in self.header]
+
+    def _line_records(self, positions=None):
+        """
+        Generator over the data records (header excluded) as
+        (line_number, field_count, values, raw_line) tuples, using the
+        line tokenizer.
+        """
+        with open_text(self.filepath) as f:
+            # Skip header
+            f.readline()
+            yield from _iter_line_records(f, self.separator, line_number=1, positions=positions)
+
+    def _block_batches(self, as_columns=False, positions=None):
+        """
+        Generator over (rows, malformed) batches of the data records
+        (header excluded), using the block tokenizer. With `as_columns`
+        each batch holds one list of values per column instead of rows.
+        With `positions` only those fields are decoded.
+        """
+        tokenizer = BlockTokenizer(self.separator, columns=positions, width=len(self.header))
+        header_seen = False
+        with open_binary(self.filepath) as f:
+            for rows, malformed in tokenizer.tokenize_file(f, as_columns=as_columns):
+                if not header_seen and rows and rows[0]:
+                    if as_columns:
+                        rows = [column[1:] for column in rows]
+                    else:
+                        rows = rows[1:]
+                    header_seen = True
+                yield rows, malformed
+
+    def _sample_rows(self):
+        """Well-formed data rows as lists of raw strings, for type inference."""
+        if self.tokenizer == 'block':
+            for rows, _ in self._block_batches():
+                yield from rows
+            return
+        width = len(self.header)
+        for _, count, values, _ in self._line_records():
+            if count == width:
+                yield values
 
     # ---------- Type inference ----------
 
@@ -95,49 +279,37 @@ class CsvParser:
         types = {col: 'int' for col in self.header}  # optimistic start
 
         try:
-            with open(self.filepath, 'r', encoding='utf-8') as f:
-                # Skip header
-                f.readline()
-
-                sample_count = 0
-                for line in f:
-                    if sample_count >= sample_size:
-                        break
+            sample_count = 0
+            # Malformed lines are skipped from inference
+            for values in self._sample_rows():
+                if sample_count >= sample_size:
+                    break
 
-                    cleaned_line = self._clean_line(line)
-                    if not cleaned_line:
-                        continue
+                row = dict(zip(self.header, values))
 
-                    values = [v.strip() for v in cleaned_line.split(self.separator)]
-                    if len(values) != len(self.header):
-                        # Skip malformed lines from inference
+                for col_name, value in row.items():
+                    if value == '':
                         continue
 
-                    row = dict(zip(self.header, values))
-
-                    for col_name, value in row.items():
-                        if value == '':
-                            continue
-
-                        current_type = types[col_name]
+                    current_type = types[col_name]
 
-                        if current_type == 'str':
-                            continue
+                    if current_type == 'str':
+                        continue
 
-                        # Check for int
-                        if current_type == 'int':
-                            if not self._is_int(value):
-                                # downgrade to float candidate
-                                types[col_name] = 'float'
-                                current_type = 'float'
+                    # Check for int
+                    if current_type == 'int':
+                        if not self._is_int(value):
+                            # downgrade to float candidate
+                            types[col_name] = 'float'
+                            current_type = 'float'
 
-                        # Check for float
-                        if current_type == 'float':
-                            if not self._is_float(value):
-                                # downgrade to string
-                                types[col_name] = 'str'
+                    # Check for float
+                    if current_type == 'float':
+                        if not self._is_float(value):
+                            # downgrade to string
+                            types[col_name] = 'str'
 
-                    sample_count += 1
+                sample_count += 1
 
         except Exception as e:
             print(f"Error during type inference: {e}")
@@ -148,7 +320,7 @@ class CsvParser:
 
     # ---------- Streaming parsers ----------
 
-    def parse(self, cast=True):
+    def parse(self, cast=True, columns=None):
         """
         Generator that yields one row at a time as a dict.
 
@@ -157,47 +329,238 @@ class CsvParser:
         cast : bool
             If True, cast values to the inferred types.
             If False, leave everything as raw strings.
+        columns : list[str] or None
+            If given, only these fields are sliced, decoded and cast, and
+            the dicts hold only these keys. Lines with the wrong number of
+            fields are still skipped as malformed.
         """
+        if self.tokenizer == 'block':
+            yield from self._parse_blocks(cast, columns)
+            return
+
+        names = self._selected(columns)
         try:
-            with open(self.filepath, 'r', encoding='utf-8') as f:
-                # Skip header
-                f.readline()
-                line_number = 1
-
-                for line in f:
-                    line_number += 1
-                    cleaned_line = self._clean_line(line)
-                    if not cleaned_line:
-                        continue
+            for line_number, count, values, line in self._line_records(self._positions(columns)):
+                if count != len(self.header):
+                    print(
+                        f"Warning: Skipping malformed line {line_number}. "
+                        f"Expected {len(self.header)} columns, got {count}: {line!r}"
+                    )
+                    continue
 
-                    values = [v.strip() for v in cleaned_line.split(self.separator)]
+                row_dict = dict(zip(names, values))
 
-                    if len(values) != len(self.header):
-                        print(
-                            f"Warning: Skipping malformed line {line_number}. "
-                            f"Expected {len(self.header)} columns, got {len(values)}: {line!r}"
-                        )
-                        continue
+                if cast:
+                    for col in row_dict:
+                        row_dict[col] = self._cast_value(col, row_dict[col])
 
-                    row_dict = dict(zip(self.header, values))
+                yield row_dict
+        except Exception as e:
+            print(f"Error during parsing: {e}")
+            return
 
-                    if cast:
-                        for col in row_dict:
-                            row_dict[col] = self._cast_value(col, row_dict[col])
+    def parse_rows_at(self, positions, cast=True):
+        """
+        Returns the full rows (as dicts) at the given positions among the
+        well-formed records, in the order given. Records in between are
+        only tokenized and width-checked, never cast or turned into dicts,
+        and the scan stops after the last wanted position.
+        """
+        wanted = set(positions)
+        last = max(wanted, default=-1)
+        width = len(self.header)
+        found = {}
+
+        if self.tokenizer == 'block':
+            records = (values for rows, _ in self._block_batches() for values in rows)
+        else:
+            records = (
+                line for _, count, _, line in self._line_records(positions=[0]) if count == width
+            )
+
+        for i, record in enumerate(records):
+            if i > last:
+                break
+            if i not in wanted:
+                continue
+            if self.tokenizer != 'block':
+                record = [v.strip() for v in record.strip().split(self.separator)]
+            row = dict(zip(self.header, record))
+            if cast:
+                for col in row:
+                    row[col] = self._cast_value(col, row[col])
+            found[i] = row
+        return [found[i] for i in positions if i in found]
+
+    def _block_records(self, cast, columns=None):
+        """Block-tokenizer batches of value tuples, in header order."""
+        # An empty selection reads one field only to count the rows
+        empty = columns is not None and not self._selected(columns)
+        for batch in self.parse_columns(cast, columns):
+            yield [()] * len(batch[0]) if empty else list(zip(*batch))
+
+    def parse_columns(self, cast=True, columns=None):
+        """
+        Generator that yields batches of columns: one list of values per
+        header entry (or per requested column), all of the same length.
+        Uses the block tokenizer regardless of the configured one, and
+        casts a column at a time.
+        """
+        width = len(self.header)
+        positions = self._positions(columns)
+        selected = self.header if positions is None else [self.header[i] for i in positions]
+        types = [self.column_types.get(col, 'str') for col in selected]
 
-                    yield row_dict
+        try:
+            for columns, malformed in self._block_batches(as_columns=True, positions=positions):
+                for line_number, count, line in malformed:
+                    print(
+                        f"Warning: Skipping malformed line {line_number}. "
+                        f"Expected {width} columns, got {count}: {line!r}"
+                    )
+                if not columns or not columns[0]:
+                    continue
+                if cast:
+                    columns = [_cast_column(c, t) for c, t in zip(columns, types)]
+                yield columns
         except Exception as e:
             print(f"Error during parsing: {e}")
             return
 
-    def parse_chunks(self, chunk_size=1000, cast=True):
+    def _parse_blocks(self, cast, columns=None):
+        """parse() for the block tokenizer: value tuples back into row dicts."""
+        names = self._selected(columns)
+        for rows in self._block_records(cast, columns):
+            for values in rows:
+                yield dict(zip(names, values))
+
+    def _byte_ranges(self, range_size=DEFAULT_RANGE_SIZE):
+        """
+        Splits the data section of the file (everything after the header
+        line) into byte ranges of roughly `range_size` bytes. Every range
+        boundary sits just after a newline, so no line is split.
+        """
+        ranges = []
+        with open(self.filepath, 'rb') as f:
+            f.readline()  # Skip header
+            start = f.tell()
+            file_size = os.fstat(f.fileno()).st_size
+
+            while start < file_size:
+                target = start + range_size
+                if target >= file_size:
+                    end = file_size
+                else:
+                    f.seek(target)
+                    f.readline()  # Move to the end of the current line
+                    end = f.tell()
+                ranges.append((start, end))
+                start = end
+        return ranges
+
+    def _contains_quotes(self, quotechar=b'"'):
+        """Cheap binary scan for any quote character in the file."""
+        with open(self.filepath, 'rb') as f:
+            while True:
+                block = f.read(DEFAULT_RANGE_SIZE)
+                if not block:
+                    return False
+                if quotechar in block:
+                    return True
+
+    def parse_records(self, cast=True, workers=None, range_size=DEFAULT_RANGE_SIZE, columns=None):
+        """
+        Generator that yields batches of rows as value tuples (in header
+        order, or in the order of `columns` if given), one batch per byte
+        range.
+
+        With `workers` > 1 and more than one range, the ranges are
+        tokenized and cast in a process pool and merged back in file
+        order. Otherwise this falls back to the streaming parse(). With
+        the block tokenizer, files containing quote characters are parsed
+        serially, since a quoted newline could straddle a range boundary;
+        so are compressed files, which cannot be split into byte ranges.
+        """
+        ranges = []
+        if (workers and workers > 1 and self.compression is None
+                and not (self.tokenizer == 'block' and self._contains_quotes())):
+            ranges = self._byte_ranges(range_size)
+        if len(ranges) <= 1:
+            if self.tokenizer == 'block':
+                yield from self._block_records(cast, columns)
+                return
+            for chunk in self.parse_chunks(chunk_size=10000, cast=cast, columns=columns):
+                yield [tuple(row.values()) for row in chunk]
+            return
+
+        # 'spawn' keeps workers independent of the (possibly threaded) parent
+        pool = ProcessPoolExecutor(
+            max_workers=min(workers, len(ranges)),
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+        pending = deque()
+        remaining = iter(ranges)
+
+        def submit_next():
+            byte_range = next(remaining, None)
+            if byte_range is not None:
+                pending.append(pool.submit(
+                    _parse_range, self.filepath, byte_range[0], byte_range[1],
+                    self.header, self.column_types, self.separator, cast,
+                    self.tokenizer, self._positions(columns),
+                ))
+
+        try:
+            # Keep a bounded window of ranges in flight so memory stays flat
+            for _ in range(workers * 2):
+                submit_next()
+
+            line_number = 1  # The header line
+            while pending:
+                try:
+                    records, malformed, line_count = pending.popleft().result()
+                except Exception as e:
+                    print(f"Error during parsing: {e}")
+                    return
+                submit_next()
+
+                for local_line, got, line in malformed:
+                    print(
+                        f"Warning: Skipping malformed line {line_number + local_line}. "
+                        f"Expected {len(self.header)} columns, got {got}: {line!r}"
+                    )
+                line_number += line_count
+                yield records
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def parse_parallel(self, cast=True, workers=None, range_size=DEFAULT_RANGE_SIZE, columns=None):
+        """
+        Like parse(), but tokenizes newline-aligned byte ranges in a
+        process pool of `workers` processes (default: one per CPU).
+        Rows are yielded as dicts in file order.
+        """
+        workers = workers or os.cpu_count() or 1
+        names = self._selected(columns)
+        for records in self.parse_records(cast=cast, workers=workers, range_size=range_size,
+                                          columns=columns):
+            for values in records:
+                yield dict(zip(names, values))
+
+    def parse_chunks(self, chunk_size=1000, cast=True, workers=None, columns=None):
         """
         Generator that yields lists of rows (chunks) of size `chunk_size`.
 
         Useful for massive datasets where you want to operate on batches.
+        Pass `workers` to parse the file in parallel (see parse_parallel)
+        and `columns` to parse only those fields (see parse).
         """
+        if workers:
+            rows = self.parse_parallel(cast=cast, workers=workers, columns=columns)
+        else:
+            rows = self.parse(cast=cast, columns=columns)
         batch = []
-        for row in self.parse(cast=cast):
+        for row in rows:
             batch.append(row)
             if len(batch) >= chunk_size:
                 yield batch
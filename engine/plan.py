@@ -0,0 +1,628 @@
+# engine/plan.py
+"""
+Lazy logical query plans for DataFrame.
+
+`df.lazy()` returns a LazyFrame. Calling filter() or join() on it only
+adds a node to a logical plan; nothing runs until a result is needed:
+project() (a LazyRows sequence), aggregate() (a dict), len(), the
+top/min/max helpers or collect().
+
+Two optimizations are applied when a plan runs:
+
+  - Fusion: a chain of filters is evaluated as one pass over the base
+    rows that only collects row positions. project() and
+    aggregate(groupby()) then read the base columns at those positions,
+    so no intermediate DataFrame is built between the steps.
+  - Common-subexpression elimination: every node is interned in a
+    PlanContext under a structural key. Equal subtrees (the same table,
+    the same join keys, filters with the same lambda code) become the
+    same node, and each node keeps its result, so it runs at most once
+    per context.
+
+Reading only a prefix of project()'s rows skips both: the rows are
+pulled through scans, filters and joins one at a time (LIMIT pushdown),
+so a preview of a filtered or joined table stops early.
+
+Joins follow DataFrame.join's memory rules: when the inputs of a join
+over file-backed tables are larger than its memory_limit, their rows are
+streamed through the spilling join and never materialized.
+"""
+from .columnar import RowView
+from .predicates import Compare, Predicate, filter_positions
+from .dataframe import (
+    DataFrame, GroupBy, _aggregate_groups, _group_positions, _groupby_agg_store,
+    _keyed_tuples, _spill_join,
+)
+from .joins import DEFAULT_MEMORY_LIMIT, column_order, join
+from .rows import LazyRows
+
+
+class PlanContext:
+    """
+    Interning table for plan nodes. Use one context per query so equal
+    subtrees are shared and computed once.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+
+    def intern(self, node):
+        """Returns the existing node with the same key, or registers `node`."""
+        existing = self.nodes.get(node.key)
+        if existing is not None:
+            return existing
+        for attr in node.child_attrs:
+            setattr(node, attr, self.intern(getattr(node, attr)))
+        self.nodes[node.key] = node
+        return node
+
+
+def _code_key(code):
+    """Structural identity of a code object (ignores line and column info)."""
+    consts = tuple(
+        _code_key(c) if hasattr(c, 'co_code') else (type(c).__name__, c)
+        for c in code.co_consts
+    )
+    return (code.co_code, consts, code.co_names, code.co_varnames, code.co_freevars)
+
+
+def _func_key(func):
+    """
+    Key for a filter predicate: two lambdas written the same way compare
+    equal. Closures and defaults are compared by identity, declarative
+    Predicates by their structure, and anything else by identity.
+    """
+    if isinstance(func, Predicate):
+        try:
+            key = ('pred', func.key())
+            hash(key)
+            return key
+        except TypeError:
+            return ('id', id(func))
+    code = getattr(func, '__code__', None)
+    if code is None:
+        return ('id', id(func))
+    try:
+        key = (
+            _code_key(code),
+            tuple(id(cell.cell_contents) for cell in func.__closure__ or ()),
+            tuple(id(value) for value in func.__defaults__ or ()),
+            id(func.__globals__),
+        )
+        hash(key)
+        return key
+    except (TypeError, ValueError):
+        return ('id', id(func))
+
+
+# ---------- Plan nodes ----------
+
+class _Node:
+    """
+    A logical plan node. `result` caches (store, indices) once the node
+    has run: the ColumnStore holding its rows and the row positions that
+    belong to it (None for every row).
+    """
+
+    key = None
+    result = None
+    child_attrs = ()
+
+    @property
+    def header(self):
+        raise NotImplementedError
+
+    @property
+    def column_types(self):
+        raise NotImplementedError
+
+
+class Scan(_Node):
+    """Leaf node: an existing DataFrame."""
+
+    def __init__(self, df):
+        self.df = df
+        self.key = ('scan', df.filepath or id(df))
+
+    @property
+    def header(self):
+        return self.df.header
+
+    @property
+    def column_types(self):
+        return self.df.column_types
+
+
+class Filter(_Node):
+    child_attrs = ('child',)
+
+    def __init__(self, child, predicate):
+        self.child = child
+        self.predicate = predicate
+        self.key = ('filter', child.key, _func_key(predicate))
+
+    @property
+    def header(self):
+        return self.child.header
+
+    @property
+    def column_types(self):
+        return self.child.column_types
+
+
+class Join(_Node):
+    child_attrs = ('left', 'right')
+
+    def __init__(self, left, right, left_on, right_on, filepath_tag, memory_limit=None, spill_dir=None):
+        self.left = left
+        self.right = right
+        self.left_on = left_on
+        self.right_on = right_on
+        self.filepath_tag = filepath_tag
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self.key = ('join', left.key, right.key, left_on, right_on)
+
+    @property
+    def header(self):
+        return list(self._schema())
+
+    @property
+    def column_types(self):
+        return self._schema()
+
+    def _schema(self):
+        """Output columns and types, known without running the join."""
+        schema = {col: self.left.column_types.get(col, 'str') for col in self.left.header}
+        for col in self.right.header:
+            if col == self.right_on:
+                continue
+            name = col if col not in schema else f"{self.filepath_tag}.{col}"
+            schema[name] = self.right.column_types.get(col, 'str')
+        return schema
+
+
+class Sort(_Node):
+    child_attrs = ('child',)
+
+    def __init__(self, child, columns, ascending, limit):
+        self.child = child
+        self.columns = columns
+        self.ascending = ascending
+        self.limit = limit
+        self.key = ('sort', child.key, tuple(columns), tuple(ascending), limit)
+
+    @property
+    def header(self):
+        return self.child.header
+
+    @property
+    def column_types(self):
+        return self.child.column_types
+
+
+# ---------- Execution ----------
+
+def _resolve(node):
+    """Runs `node` (once) and returns its (store, indices)."""
+    if node.result is not None:
+        return node.result
+
+    if isinstance(node, Scan):
+        # File-backed frames without a sidecar are parsed into columns once
+        node.result = (node.df._to_store(), None)
+
+    elif isinstance(node, Filter):
+        node.result = _run_filters(node)
+
+    elif isinstance(node, Join):
+        mergeable = _has_key_order(node.left, node.left_on) and _has_key_order(node.right, node.right_on)
+        if not mergeable and _spills(node, node.left, node.right):
+            joined = _spill_join(
+                _JoinInput(node.left), _JoinInput(node.right), node.left_on, node.right_on,
+                node.filepath_tag, node.memory_limit or DEFAULT_MEMORY_LIMIT, node.spill_dir,
+            )
+            node.result = (joined.store, None)
+        else:
+            left = _materialize(node.left)
+            right = _materialize(node.right)
+            store = join(
+                left, right, node.left_on, node.right_on, node.filepath_tag,
+                left_order=_key_order(node.left, node.left_on, left),
+                right_order=_key_order(node.right, node.right_on, right),
+                memory_limit=node.memory_limit, spill_dir=node.spill_dir,
+            )
+            node.result = (store, None)
+
+    elif isinstance(node, Sort):
+        child = node.child
+        if isinstance(child, Scan) and child.result is None:
+            df = child.df  # Lets an unparsed CSV use the heap-only fetch
+        else:
+            df = DataFrame(source=_materialize(child))
+        ordered = df.order_by(node.columns, node.ascending, node.limit)
+        node.result = (ordered.store, None)
+
+    else:
+        raise TypeError(f"Unknown plan node: {node!r}")
+    return node.result
+
+
+def _run_filters(node):
+    """
+    Fused filter chain: collects the predicates down to the nearest node
+    that is not a filter (or already has a result) and evaluates all of
+    them in a single pass, producing only row positions. Declarative
+    Predicates run first, on the columns and with zone-map skipping;
+    lambdas then only see the rows that survived them.
+    """
+    predicates = []
+    declarative = None
+    while isinstance(node, Filter) and node.result is None:
+        if isinstance(node.predicate, Predicate):
+            declarative = node.predicate if declarative is None else node.predicate & declarative
+        else:
+            predicates.append(node.predicate)
+        node = node.child
+    predicates.reverse()
+
+    if (declarative is not None and not predicates and isinstance(node, Scan)
+            and node.result is None and node.df.store is None):
+        # A CSV without a sidecar: indexed rows are read without parsing it all
+        return node.df.filter(declarative).store, None
+
+    store, indices = _resolve(node)
+    if declarative is not None:
+        index_for = node.df.index_for if isinstance(node, Scan) else None
+        indices = filter_positions(store, declarative, indices, index_for)
+        if not predicates:
+            return store, indices
+    if indices is None:
+        rows = enumerate(store.iter_rows())
+    else:
+        rows = ((i, store.row(i)) for i in indices)
+    keep = [i for i, row in rows if all(p(row) for p in predicates)]
+    return store, keep
+
+
+def _key_order(node, column, store):
+    """
+    Key order of `column` in a node's materialized `store` for a merge
+    join, or None. Filters keep their input's row order, so a column
+    sorted in the scanned table is still sorted after them; a Sort node
+    orders its first sort column.
+    """
+    if column not in store.columns:
+        return None
+    if isinstance(node, Sort):
+        if node.columns[0] == column and node.ascending[0]:
+            return column_order(store.column(column))
+        return None
+    base = node
+    while isinstance(base, Filter):
+        base = base.child
+    if not isinstance(base, Scan):
+        return None
+    # Index positions only describe the unfiltered table
+    return base.df._key_order(column, store, use_index=base is node)
+
+
+def _has_key_order(node, column):
+    """True if _key_order() finds a key order, checked before the node runs."""
+    if column not in node.header:
+        return False
+    if isinstance(node, Sort):
+        return node.columns[0] == column and node.ascending[0]
+    base = node
+    while isinstance(base, Filter):
+        base = base.child
+    return isinstance(base, Scan) and base.df._has_key_order(column, use_index=base is node)
+
+
+def _materialize(node):
+    """The node's rows as a standalone ColumnStore."""
+    store, indices = _resolve(node)
+    if indices is None:
+        return store
+    return store.take(indices)
+
+
+# ---------- Join memory ----------
+
+def _footprint(node):
+    """
+    Rough size of a node's rows in bytes, as DataFrame._footprint()
+    measures a table. Before a node runs its inputs' size is the bound:
+    a filter keeps at most its input, a join is taken as both inputs.
+    """
+    if node.result is not None:
+        store, indices = node.result
+        size = sum(store.column(col).nbytes for col in store.header)
+        if indices is not None and store.num_rows:
+            size = size * len(indices) // store.num_rows
+        return size
+    if isinstance(node, Scan):
+        return node.df._footprint()
+    if isinstance(node, Join):
+        return _footprint(node.left) + _footprint(node.right)
+    return _footprint(node.child)
+
+
+def _file_backed(node):
+    """True if any table a node reads is file-backed."""
+    if isinstance(node, Scan):
+        return node.df.filepath is not None
+    return any(_file_backed(getattr(node, attr)) for attr in node.child_attrs)
+
+
+def _spills(join_node, *inputs):
+    """True if `inputs` of a join are too large to materialize (see DataFrame.join)."""
+    limit = join_node.memory_limit or DEFAULT_MEMORY_LIMIT
+    return sum(map(_footprint, inputs)) > limit and any(map(_file_backed, inputs))
+
+
+class _JoinInput:
+    """A plan node as an input of _spill_join(): its rows are streamed, not materialized."""
+
+    def __init__(self, node):
+        self.node = node
+        self.header = node.header
+        self.column_types = node.column_types
+
+    def _footprint(self):
+        return _footprint(self.node)
+
+    def _keyed_tuples(self, column_name):
+        return _keyed_tuples(self.header, _stream_rows(self.node), column_name)
+
+
+# ---------- Streaming ----------
+#
+# A prefix of project()'s rows (e.g. project(...)[:10]) is produced by
+# pulling rows through the plan one at a time instead of running it, so
+# reading it stops as soon as enough rows have come out.
+
+def _rows_of(store, indices):
+    if indices is None:
+        return store.iter_rows()
+    return (store.row(i) for i in indices)
+
+
+def _stream_rows(node):
+    """Yields the full rows of a plan node without running it to completion."""
+    if node.result is not None:
+        yield from _rows_of(*node.result)
+
+    elif isinstance(node, Scan):
+        df = node.df
+        yield from (df.store.iter_rows() if df.store is not None else df._get_data())
+
+    elif isinstance(node, Filter):
+        predicates = []
+        while isinstance(node, Filter) and node.result is None:
+            predicates.append(node.predicate)
+            node = node.child
+        predicates.reverse()
+        rows = None
+        if isinstance(node, Scan) and node.result is None:
+            rows = _indexed_rows(node.df, predicates)
+        if rows is None:
+            rows = _stream_rows(node)
+        for row in rows:
+            if all(p(row) for p in predicates):
+                yield row
+
+    elif isinstance(node, Join):
+        yield from _stream_join(node)
+
+    else:  # A sort needs all of its input first
+        yield from _rows_of(*_resolve(node))
+
+
+def _indexed_rows(df, predicates):
+    """The candidate rows of a scan from its secondary indexes, or None."""
+    declarative = None
+    for p in predicates:
+        if isinstance(p, Predicate):
+            declarative = p if declarative is None else declarative & p
+    if declarative is None:
+        return None
+    candidates = declarative.index_positions(df.index_for)
+    if candidates is None:
+        return None
+    if df.store is not None:
+        return (df.store.row(i) for i in candidates)
+    return df.parser.parse_rows_at(candidates)
+
+
+def _stream_join(node):
+    """
+    Hash join that streams the left input: the right input is
+    materialized and hashed, and each left row yields its matches as
+    soon as it is read. Same rows and columns as the planned join; the
+    order is the left input's. A right input too large to hold (see
+    _spills) runs the planned, spilling join instead.
+    """
+    if _spills(node, node.right):
+        yield from _rows_of(*_resolve(node))
+        return
+    right = _materialize(node.right)
+    keys = right.column(node.right_on) if node.right_on in right.columns else [None] * right.num_rows
+    table = {}
+    for position, key in enumerate(keys):
+        table.setdefault(key, []).append(position)
+
+    # (output name, right column) pairs, named as in Join._schema
+    names = set(node.left.header)
+    right_columns = []
+    for col in right.header:
+        if col == node.right_on:
+            continue
+        name = col if col not in names else f"{node.filepath_tag}.{col}"
+        names.add(name)
+        right_columns.append((name, right.column(col)))
+
+    for row in _stream_rows(node.left):
+        for position in table.get(row.get(node.left_on), ()):
+            joined = dict(row)
+            for name, column in right_columns:
+                joined[name] = column[position]
+            yield joined
+
+
+# ---------- User-facing lazy objects ----------
+
+class LazyFrame:
+    """
+    DataFrame-like front end that builds a logical plan. filter() and
+    join() return new LazyFrames; groupby() returns a LazyGroups mapping;
+    project() returns rows read on demand; aggregate(), len() and the
+    top/min/max helpers run the plan and return plain results.
+    """
+
+    def __init__(self, node, context=None):
+        self.context = context if context is not None else PlanContext()
+        self.node = self.context.intern(node)
+
+    def _derive(self, node):
+        return LazyFrame(node, self.context)
+
+    # ---------- Schema ----------
+
+    @property
+    def header(self):
+        return list(self.node.header)
+
+    @property
+    def columns(self):
+        """Alias for get_header() to support AI generated code like df.columns."""
+        return self.header
+
+    def get_header(self):
+        return self.header
+
+    def get_column_types(self):
+        return self.node.column_types
+
+    @property
+    def filepath(self):
+        return self.node.df.filepath if isinstance(self.node, Scan) else None
+
+    # ---------- Plan building ----------
+
+    def filter(self, condition_func):
+        return self._derive(Filter(self.node, condition_func))
+
+    def where(self, column_name, op, value):
+        return self.filter(Compare(column_name, op, value))
+
+    def join(self, right_dataframe, left_on, right_on, memory_limit=None, spill_dir=None):
+        if isinstance(right_dataframe, LazyFrame):
+            right = self.context.intern(right_dataframe.node)
+        else:
+            right = self.context.intern(Scan(right_dataframe))
+        filepath_tag = right_dataframe.filepath if right_dataframe.filepath else 'joined'
+        return self._derive(Join(self.node, right, left_on, right_on, filepath_tag, memory_limit, spill_dir))
+
+    def groupby(self, column_name):
+        return LazyGroups(self, column_name)
+
+    def order_by(self, columns, ascending=True, limit=None):
+        columns = [columns] if isinstance(columns, str) else list(columns)
+        if isinstance(ascending, bool):
+            ascending = [ascending] * len(columns)
+        return self._derive(Sort(self.node, columns, list(ascending), limit))
+
+    # ---------- Results ----------
+
+    def collect(self):
+        """Runs the plan and returns a regular DataFrame."""
+        if isinstance(self.node, Scan):
+            return self.node.df
+        return DataFrame(source=_materialize(self.node))
+
+    def __len__(self):
+        if isinstance(self.node, Scan) and self.node.result is None:
+            return len(self.node.df)  # Counts CSV lines without decoding fields
+        store, indices = _resolve(self.node)
+        return store.num_rows if indices is None else len(indices)
+
+    def project(self, columns):
+        """
+        Returns the plan's rows with only `columns`, as a LazyRows
+        sequence. A prefix (project(...)[:10]) streams through the plan
+        and stops after those rows; reading all rows runs the plan.
+        """
+        node = self.node
+        if isinstance(node, Scan) and node.result is None:
+            return node.df.project(columns)  # Decodes only `columns`
+
+        def stream():
+            names = [col for col in columns if col in node.header]
+            return ({col: row.get(col) for col in names} for row in _stream_rows(node))
+
+        def run():
+            store, indices = _resolve(node)
+            names = [col for col in columns if col in store.columns]
+            if indices is None:
+                return list(store.iter_rows(names))
+            if not names:
+                return [{} for _ in indices]
+            return [store.row(i, names) for i in indices]
+
+        return LazyRows(stream, run)
+
+    def aggregate(self, groups, agg_func_map):
+        """
+        Same contract as DataFrame.aggregate. An unread LazyGroups is
+        aggregated with one streaming hash aggregation over the plan's
+        row positions (see DataFrame.groupby_agg).
+        """
+        if isinstance(groups, GroupBy) and groups._groups is None:
+            return groups.aggregate(agg_func_map)
+        return _aggregate_groups(groups, agg_func_map)
+
+    def describe(self):
+        return self.collect().describe()
+
+    def max_by(self, column_name):
+        return self.collect().max_by(column_name)
+
+    def min_by(self, column_name):
+        return self.collect().min_by(column_name)
+
+    def top_k_by(self, column_name, k=5):
+        return self.collect().top_k_by(column_name, k)
+
+    def __repr__(self):
+        return f"LazyFrame({self.node.key[0]})"
+
+
+class LazyGroups(GroupBy):
+    """
+    The result of LazyFrame.groupby(): a mapping of group key to rows
+    that is only computed when read. Each group is a RowView over the
+    plan's base store, so no per-group copy is made.
+    """
+
+    def __init__(self, frame, column_name):
+        super().__init__(None, column_name)
+        self.frame = frame
+
+    def _compute(self):
+        if self._groups is None:
+            store, indices = _resolve(self.frame.node)
+            if self.column_name not in store.columns:
+                self._groups = {}
+            else:
+                positions = _group_positions(store.column(self.column_name), indices)
+                self._groups = {key: RowView(store, idx) for key, idx in positions.items()}
+        return self._groups
+
+    def aggregate(self, agg_func_map):
+        node = self.frame.node
+        if isinstance(node, Scan) and node.result is None:
+            # Unparsed CSVs stream only the key and aggregated columns
+            return node.df.groupby_agg(self.column_name, agg_func_map)
+        store, indices = _resolve(node)
+        return _groupby_agg_store(store, self.column_name, agg_func_map, indices)
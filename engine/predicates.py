@@ -0,0 +1,287 @@
+# engine/predicates.py
+"""
+Declarative filter predicates.
+
+A predicate built from column comparisons, e.g.
+
+    (col('order_date') >= '2024-01-01') & (col('status') == 'paid')
+
+is callable on a row dict exactly like a filter lambda, so it can be
+passed to DataFrame.filter() anywhere a lambda can. Unlike a lambda its
+structure is visible to the engine, which lets filter():
+
+  - skip whole row blocks whose zone map (per-block min/max, see
+    engine/stats.py) proves that no row can match, and
+  - evaluate the comparison straight on the column arrays of the blocks
+    it does read, without building row dicts.
+
+Comparisons against a null value are false, and so are comparisons
+between values that cannot be ordered (e.g. a str and an int).
+
+When the table has secondary indexes (engine/index.py), equality, `in`
+and range comparisons are answered from the index first and only the
+candidate rows are checked.
+"""
+import operator
+
+OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    'in': lambda value, values: value in values,
+}
+
+
+class Predicate:
+    """Base class: callable on a row dict, combinable with & and |."""
+
+    def __call__(self, row):
+        raise NotImplementedError
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def key(self):
+        """Hashable structural identity (used by the lazy planner)."""
+        raise NotImplementedError
+
+    def columns(self):
+        raise NotImplementedError
+
+    def may_match(self, zone):
+        """
+        False only if no row in a block can match. `zone` maps a column
+        to its block's [min, max] (None if the block is all null); columns
+        without a zone map are absent.
+        """
+        raise NotImplementedError
+
+    def select(self, store, positions):
+        """The subset of `positions` (in order) whose rows match."""
+        raise NotImplementedError
+
+    def index_positions(self, index_for):
+        """
+        Sorted candidate row positions from secondary indexes (a superset
+        of the matches), or None if the indexes cannot narrow the rows.
+        `index_for(column)` returns a column's index or None.
+        """
+        return None
+
+
+class Compare(Predicate):
+    """column <op> constant."""
+
+    def __init__(self, column, op, value):
+        if op not in OPERATORS:
+            raise ValueError(f"Unsupported comparison operator: {op}")
+        if op == 'in':
+            # A string is iterable too, but 'in' against its characters is never meant
+            if isinstance(value, (str, bytes)):
+                raise ValueError(f"'in' takes a list of values, not a string: {value!r}")
+            try:
+                value = tuple(value)
+            except TypeError:
+                raise ValueError(f"'in' takes a list of values, got {type(value).__name__}") from None
+        self.column = column
+        self.op = op
+        self.value = value
+        self._func = OPERATORS[op]
+
+    def _test(self, v):
+        if v is None:
+            return False
+        try:
+            return self._func(v, self.value)
+        except TypeError:
+            return False
+
+    def __call__(self, row):
+        return self._test(row.get(self.column))
+
+    def key(self):
+        return ('cmp', self.column, self.op, type(self.value).__name__, self.value)
+
+    def columns(self):
+        return {self.column}
+
+    def may_match(self, zone):
+        if self.column not in zone:
+            return True
+        bounds = zone[self.column]
+        if bounds is None:
+            return False  # All-null block: no comparison is true
+        lo, hi = bounds
+        v = self.value
+        if self.op == 'in':
+            return any(Compare(self.column, '==', item).may_match(zone) for item in v)
+        try:
+            if self.op == '==':
+                return lo <= v <= hi
+            if self.op == '!=':
+                return not (lo == hi == v)
+            if self.op == '<':
+                return lo < v
+            if self.op == '<=':
+                return lo <= v
+            if self.op == '>':
+                return hi > v
+            return hi >= v
+        except TypeError:
+            return True  # Cannot reason about mixed types; read the block
+
+    def select(self, store, positions):
+        if self.column not in store.columns:
+            return []
+        column = store.column(self.column)
+        test = self._test
+        return [i for i in positions if test(column[i])]
+
+    def index_positions(self, index_for):
+        index = index_for(self.column)
+        if index is None:
+            return None
+        return index.lookup(self.op, self.value)
+
+    def __repr__(self):
+        return f"col({self.column!r}) {self.op} {self.value!r}"
+
+
+class And(Predicate):
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+
+    def __call__(self, row):
+        return self.left(row) and self.right(row)
+
+    def key(self):
+        return ('and', self.left.key(), self.right.key())
+
+    def columns(self):
+        return self.left.columns() | self.right.columns()
+
+    def may_match(self, zone):
+        return self.left.may_match(zone) and self.right.may_match(zone)
+
+    def select(self, store, positions):
+        return self.right.select(store, self.left.select(store, positions))
+
+    def index_positions(self, index_for):
+        left = self.left.index_positions(index_for)
+        right = self.right.index_positions(index_for)
+        if left is None or right is None:
+            return right if left is None else left
+        right = set(right)
+        return [i for i in left if i in right]
+
+    def __repr__(self):
+        return f"({self.left!r}) & ({self.right!r})"
+
+
+class Or(Predicate):
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+
+    def __call__(self, row):
+        return self.left(row) or self.right(row)
+
+    def key(self):
+        return ('or', self.left.key(), self.right.key())
+
+    def columns(self):
+        return self.left.columns() | self.right.columns()
+
+    def may_match(self, zone):
+        return self.left.may_match(zone) or self.right.may_match(zone)
+
+    def select(self, store, positions):
+        positions = list(positions)
+        matched = set(self.left.select(store, positions))
+        matched.update(self.right.select(store, positions))
+        return [i for i in positions if i in matched]
+
+    def index_positions(self, index_for):
+        left = self.left.index_positions(index_for)
+        if left is None:
+            return None
+        right = self.right.index_positions(index_for)
+        if right is None:
+            return None
+        return sorted(set(left).union(right))
+
+    def __repr__(self):
+        return f"({self.left!r}) | ({self.right!r})"
+
+
+class ColumnRef:
+    """col('name'): comparison operators build Compare predicates."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __eq__(self, value):
+        return Compare(self.name, '==', value)
+
+    def __ne__(self, value):
+        return Compare(self.name, '!=', value)
+
+    def __lt__(self, value):
+        return Compare(self.name, '<', value)
+
+    def __le__(self, value):
+        return Compare(self.name, '<=', value)
+
+    def __gt__(self, value):
+        return Compare(self.name, '>', value)
+
+    def __ge__(self, value):
+        return Compare(self.name, '>=', value)
+
+    def isin(self, values):
+        return Compare(self.name, 'in', values)
+
+    __hash__ = None
+
+
+def col(name):
+    """Starts a column comparison: col('age') > 30."""
+    return ColumnRef(name)
+
+
+def filter_positions(store, predicate, indices=None, index_for=None):
+    """
+    Row positions of `store` (restricted to `indices` if given) matching
+    `predicate`. Secondary indexes (via `index_for`) narrow the rows to
+    check first; otherwise, when the store carries zone maps, blocks that
+    cannot match are skipped without touching their data.
+    """
+    if indices is None and index_for is not None:
+        candidates = predicate.index_positions(index_for)
+        if candidates is not None:
+            return predicate.select(store, candidates)
+
+    zone_maps = (store.meta or {}).get('zone_maps') if indices is None else None
+    if not zone_maps:
+        positions = range(store.num_rows) if indices is None else indices
+        return predicate.select(store, positions)
+
+    block_rows = zone_maps['block_rows']
+    relevant = {
+        col: blocks for col, blocks in zone_maps['columns'].items()
+        if col in predicate.columns()
+    }
+    keep = []
+    for b, start in enumerate(range(0, store.num_rows, block_rows)):
+        zone = {col: blocks[b] for col, blocks in relevant.items()}
+        if predicate.may_match(zone):
+            block = range(start, min(start + block_rows, store.num_rows))
+            keep.extend(predicate.select(store, block))
+    return keep
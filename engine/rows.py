@@ -0,0 +1,84 @@
+# engine/rows.py
+"""
+Row sequences produced on demand.
+
+project() returns a LazyRows instead of a list. Reading a prefix of it
+(rows[:10], rows[20:30], rows[0]) pulls only that many rows from the
+underlying generator, a CsvParser.parse() or a streamed plan, and then
+closes it, so a preview costs the same on a table of any size.
+Everything that needs all rows (len(), negative indices, iteration,
+comparison) builds the full list once and keeps it.
+"""
+from collections.abc import Sequence
+from itertools import islice
+
+from .columnar import RowView
+
+
+class LazyRows(Sequence):
+    """
+    A read-only sequence of row dicts. `iterate()` returns a fresh
+    iterator over the rows; `materialize()` (default: list(iterate()))
+    returns all of them, and may take a faster path than iterating.
+    """
+
+    __slots__ = ('_iterate', '_materialize', '_rows')
+
+    def __init__(self, iterate, materialize=None):
+        self._iterate = iterate
+        self._materialize = materialize
+        self._rows = None
+
+    def _all(self):
+        if self._rows is None:
+            self._rows = list(self._materialize() if self._materialize else self._iterate())
+        return self._rows
+
+    def _take(self, start, stop, step):
+        """Rows start..stop (by step) from a fresh iterator, which is then closed."""
+        rows = self._iterate()
+        try:
+            return list(islice(rows, start, stop, step))
+        finally:
+            close = getattr(rows, 'close', None)
+            if close is not None:
+                close()
+
+    def stream(self):
+        """Iterates the rows one at a time, without building the full list."""
+        if self._rows is not None:
+            return iter(self._rows)
+        return self._iterate()
+
+    def __len__(self):
+        return len(self._all())
+
+    def __getitem__(self, i):
+        if self._rows is not None:
+            return self._rows[i]
+        if isinstance(i, slice):
+            start, stop, step = i.start or 0, i.stop, 1 if i.step is None else i.step
+            if step == 0:
+                raise ValueError("slice step cannot be zero")
+            if stop is None or start < 0 or stop < 0 or step < 0:
+                return self._all()[i]
+            return self._take(start, stop, step)
+        if i < 0:
+            return self._all()[i]
+        taken = self._take(i, i + 1, 1)
+        if not taken:
+            raise IndexError("row index out of range")
+        return taken[0]
+
+    def __iter__(self):
+        return iter(self._all())
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, RowView, LazyRows)):
+            return self._all() == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        if self._rows is None:
+            return "LazyRows(not read)"
+        return f"LazyRows({len(self._rows)} rows)"
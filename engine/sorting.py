@@ -0,0 +1,158 @@
+# engine/sorting.py
+"""
+Sorting helpers for DataFrame.order_by().
+
+Rows are sorted as (key, position) pairs, so only the sort columns and a
+row number are ever handled here; the caller takes the rows afterwards.
+
+  - top_positions(): bounded heap for ORDER BY ... LIMIT k,
+    O(n log k) time and O(k) memory.
+  - sorted_positions(): full sort. Up to `run_size` pairs are sorted in
+    memory; beyond that, sorted runs are spilled to temporary files and
+    merged back with a k-way heap merge (external merge sort).
+  - sorted_rows(): the same external sort over whole rows, for tables
+    that are streamed from a file rather than held in memory.
+
+Both are stable: rows with equal keys keep their original order.
+"""
+import heapq
+import os
+import pickle
+import shutil
+import tempfile
+from array import array
+from itertools import islice
+
+# Pairs sorted in memory per run before the external merge sort spills.
+DEFAULT_RUN_SIZE = 1_000_000
+# ... and whole rows per run for sorted_rows()
+DEFAULT_ROW_RUN_SIZE = 100_000
+
+# Pairs per pickled chunk in a run file; the merge reads one chunk of
+# each run at a time.
+_RUN_CHUNK = 8192
+
+
+class _Desc:
+    """Wraps a key so that it sorts in descending order."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __reduce__(self):
+        return (_Desc, (self.value,))
+
+
+def _value_key(value):
+    """
+    Orders values of mixed types without TypeErrors: numbers first, then
+    strings, then anything else by its text.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value)
+    if isinstance(value, str):
+        return (1, value)
+    return (2, str(value))
+
+
+def make_sort_key(ascending):
+    """
+    Returns a function mapping a tuple of column values to a sort key.
+    `ascending` holds one flag per column. Nulls sort last in both
+    directions.
+    """
+    def key(values):
+        parts = []
+        for value, asc in zip(values, ascending):
+            if value is None:
+                parts.append((1,))
+            elif asc:
+                parts.append((0, _value_key(value)))
+            else:
+                parts.append((0, _Desc(_value_key(value))))
+        return tuple(parts)
+    return key
+
+
+def top_positions(keyed, limit):
+    """The positions of the `limit` smallest (key, position) pairs, in order."""
+    return [position for _, position in heapq.nsmallest(limit, keyed)]
+
+
+def _spill_runs(first_run, items, run_size, run_dir):
+    """Writes `first_run` and the sorted runs of the rest of `items` to files; returns their paths."""
+    paths = []
+    run = first_run
+    while run:
+        path = os.path.join(run_dir, f"run-{len(paths)}.pkl")
+        with open(path, 'wb') as f:
+            for start in range(0, len(run), _RUN_CHUNK):
+                pickle.dump(run[start:start + _RUN_CHUNK], f, protocol=pickle.HIGHEST_PROTOCOL)
+        paths.append(path)
+        run = None  # Release the run before sorting the next one
+        run = sorted(islice(items, run_size))
+    return paths
+
+
+def sorted_positions(keyed, run_size=DEFAULT_RUN_SIZE, spill_dir=None):
+    """
+    Sorts (key, position) pairs and returns the positions in order, as an
+    array('q'). Input larger than `run_size` pairs is sorted externally
+    through runs on disk.
+    """
+    keyed = iter(keyed)
+    first_run = sorted(islice(keyed, run_size))
+    if len(first_run) < run_size:
+        return array('q', [position for _, position in first_run])
+
+    run_dir = tempfile.mkdtemp(prefix='aistoria-sort-', dir=spill_dir)
+    try:
+        paths = _spill_runs(first_run, keyed, run_size, run_dir)
+        # Pairs are unique by position, so the merge is stable as well
+        merged = heapq.merge(*(_read_run(path) for path in paths))
+        return array('q', (position for _, position in merged))
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+
+def sorted_rows(keyed, run_size=DEFAULT_ROW_RUN_SIZE, spill_dir=None):
+    """
+    Sorts (key, position, row) triples, e.g. streamed from a CSV parser,
+    and yields the rows in order. Like sorted_positions(), but the runs
+    carry whole rows, so the rows never have to be fetched by position.
+    """
+    keyed = iter(keyed)
+    first_run = sorted(islice(keyed, run_size))
+    if len(first_run) < run_size:
+        for _, _, row in first_run:
+            yield row
+        return
+
+    run_dir = tempfile.mkdtemp(prefix='aistoria-sort-', dir=spill_dir)
+    try:
+        paths = _spill_runs(first_run, keyed, run_size, run_dir)
+        first_run = None
+        # Positions are unique, so rows are never compared
+        for _, _, row in heapq.merge(*(_read_run(path) for path in paths)):
+            yield row
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+
+def _read_run(path):
+    """Streams a run file back one pickled chunk at a time."""
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                return
+            yield from chunk
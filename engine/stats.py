@@ -0,0 +1,240 @@
+# engine/stats.py
+"""
+Per-column statistics computed once at ingest.
+
+compute_stats(store) walks the in-memory columns of a freshly parsed
+table (the file is not read again) and returns a JSON-serializable dict:
+
+    {
+      "row_count": 1000,
+      "columns": {
+        "amount": {
+          "kind": "float", "count": 990, "null_count": 10,
+          "min": 0.5, "max": 99.0, "sum": 48210.5, "mean": 48.7,
+          "distinct": 870, "sorted": false,
+          "histogram": {"edges": [0.5, 10.35, ...], "counts": [101, 97, ...]}
+        },
+        "city": {"kind": "str", "count": 1000, "null_count": 0,
+                 "min": "Bern", "max": "Zug", "distinct": 41, "sorted": false,
+                 "sketch": [48213, 90211, ...]}
+      }
+    }
+
+Numeric aggregates run over the typed arrays in C. The distinct count is
+exact up to EXACT_DISTINCT_LIMIT values and a KMV (k minimum values)
+estimate beyond that; the histogram is built from an evenly spaced
+sample and scaled to the column's size.
+
+compute_zone_maps(store) splits the table into blocks of ZONE_BLOCK_ROWS
+rows and records each int/float/str column's [min, max] per block (None
+for an all-null block). Filters built from engine/predicates.py use them
+to skip blocks that cannot match:
+
+    {"block_rows": 65536, "columns": {"ts": [[1, 65536], [65537, 131072]]}}
+
+Statistics saved outside the sidecar (the Table record) are stamped
+with the CSV's size and modification time (stamp_stats()); a DataFrame
+only trusts them while stats_match() says they still describe the file,
+since a re-upload can replace the file under the same path.
+
+int and str columns also get a "sketch": a bottom-k sample of their
+distinct values' hashes (value_sketch()), from which foreign keys
+between tables are found without reading the data again (see
+services/relationship_detector.py).
+"""
+import heapq
+import os
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from functools import partial
+from itertools import repeat
+from operator import is_not, le
+
+HISTOGRAM_BUCKETS = 10
+HISTOGRAM_SAMPLE = 20_000
+
+# Columns with at most this many values get an exact distinct count
+EXACT_DISTINCT_LIMIT = 200_000
+# Rows per zone-map block
+ZONE_BLOCK_ROWS = 65_536
+
+# Sketch size of the KMV distinct estimator (standard error ~ 1/sqrt(k))
+KMV_SIZE = 1024
+
+# Hashes kept in a column's bottom-k value sketch
+SKETCH_SIZE = 128
+
+_HASH_MASK = (1 << 64) - 1
+_HASH_SALT = 0x5BD1E995
+
+
+def _non_null(column):
+    """The column's non-null values, as cheaply as its storage allows."""
+    if not column.null_count:
+        return column.values
+    if column.kind in ('int', 'float'):
+        return list(column.valid_values())
+    return list(filter(partial(is_not, None), column.values))
+
+
+def is_sorted(values):
+    """True if `values` (no nulls) is in non-decreasing order."""
+    following = iter(values)
+    next(following, None)
+    return all(map(le, values, following))
+
+
+def estimate_distinct(values):
+    """
+    Number of distinct values: exact for small inputs, otherwise a KMV
+    estimate. Hashing (v, salt) tuples mixes even sequential integers,
+    whose plain hash() is the integer itself.
+    """
+    if len(values) <= EXACT_DISTINCT_LIMIT:
+        try:
+            return len(set(values))
+        except TypeError:  # Unhashable object values
+            return None
+    try:
+        hashes = set(map(hash, zip(values, repeat(_HASH_SALT))))
+    except TypeError:
+        return None
+    if len(hashes) <= KMV_SIZE:
+        return len(hashes)
+    smallest = heapq.nsmallest(KMV_SIZE, map(_HASH_MASK.__and__, hashes))
+    return int((KMV_SIZE - 1) * (_HASH_MASK + 1) / (smallest[-1] + 1))
+
+
+def value_sketch(values):
+    """
+    Bottom-k sketch of the distinct values: the SKETCH_SIZE smallest
+    CRC-32 hashes of their text form, sorted. Unlike hash() of a str,
+    CRC-32 is the same in every process, so sketches stored at ingest can
+    be compared later; the int 5 and the string '5' hash alike.
+    """
+    distinct = values if isinstance(values, set) else set(values)
+    texts = map(str.encode, map(str.strip, map(str, distinct)))
+    return sorted(heapq.nsmallest(SKETCH_SIZE, set(map(zlib.crc32, texts))))
+
+
+def _histogram(values, lo, hi, total):
+    """Equi-width histogram of a numeric column from an evenly spaced sample."""
+    if lo == hi:
+        return {'edges': [lo, hi], 'counts': [total]}
+    step = max(1, len(values) // HISTOGRAM_SAMPLE)
+    sample = values[::step]
+    width = (hi - lo) / HISTOGRAM_BUCKETS
+    edges = [lo + width * i for i in range(HISTOGRAM_BUCKETS)] + [hi]
+    # bisect over the inner edges gives each value's bucket, in C
+    buckets = Counter(map(bisect_right, repeat(edges[1:-1]), sample))
+    scale = total / len(sample)
+    counts = [round(buckets.get(i, 0) * scale) for i in range(HISTOGRAM_BUCKETS)]
+    return {'edges': edges, 'counts': counts}
+
+
+def column_stats(column):
+    """Statistics for one Column (see the module docstring)."""
+    values = _non_null(column)
+    count = len(values)
+    stats = {
+        'kind': column.kind,
+        'count': count,
+        'null_count': column.null_count,
+    }
+    if not count:
+        return stats
+
+    if column.kind in ('int', 'float'):
+        if not isinstance(values, (array, list)):
+            values = array('q' if column.kind == 'int' else 'd', values)  # mapped memoryview
+        lo = min(values)
+        hi = max(values)
+        total = sum(values)
+        stats.update({
+            'min': lo,
+            'max': hi,
+            'sum': total,
+            'mean': total / count,
+            'histogram': _histogram(values, lo, hi, count),
+        })
+    elif column.kind == 'str':
+        if not isinstance(values, list):
+            values = list(values)
+        stats['min'] = min(values)
+        stats['max'] = max(values)
+    else:
+        values = list(values)
+
+    if column.kind != 'object':
+        # Lets joins on this column use a merge join (engine/joins.py)
+        stats['sorted'] = is_sorted(values)
+    stats['distinct'] = estimate_distinct(values)
+    if column.kind in ('int', 'str'):
+        # Candidate join key: keep a sketch for foreign-key discovery
+        stats['sketch'] = value_sketch(values)
+    return stats
+
+
+def sketch_columns(store):
+    """Value sketches of the int and str columns of a ColumnStore."""
+    return {
+        col: value_sketch(_non_null(store.column(col)))
+        for col in store.header
+        if store.column(col).kind in ('int', 'str')
+    }
+
+
+def file_signature(filepath):
+    """(size, modification time in ns) of a file, or None if it is missing."""
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def stamp_stats(stats, filepath):
+    """The statistics, recording which version of `filepath` they describe."""
+    return dict(stats, source=file_signature(filepath))
+
+
+def stats_match(stats, filepath):
+    """True if stamped statistics still describe the file at `filepath`."""
+    if not stats or not stats.get('source'):
+        return False
+    return list(stats['source']) == file_signature(filepath)
+
+
+def compute_stats(store):
+    """Statistics for every column of a ColumnStore."""
+    return {
+        'row_count': store.num_rows,
+        'columns': {col: column_stats(store.column(col)) for col in store.header},
+    }
+
+
+def _block_bounds(column, start, end):
+    """[min, max] of the non-null values in rows start..end-1, or None."""
+    if not column.null_count and isinstance(column.values, (array, list)):
+        values = column.values[start:end]
+    else:
+        values = list(column.valid_values(range(start, end)))
+    if not len(values):
+        return None
+    return [min(values), max(values)]
+
+
+def compute_zone_maps(store, block_rows=ZONE_BLOCK_ROWS):
+    """Per-block min/max of every int, float and str column (see above)."""
+    columns = {}
+    for col in store.header:
+        column = store.column(col)
+        if column.kind not in ('int', 'float', 'str'):
+            continue
+        columns[col] = [
+            _block_bounds(column, start, min(start + block_rows, store.num_rows))
+            for start in range(0, store.num_rows, block_rows)
+        ]
+    return {'block_rows': block_rows, 'columns': columns}
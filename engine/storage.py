@@ -0,0 +1,536 @@
+# engine/storage.py
+"""
+Binary columnar sidecar files.
+
+A sidecar lives next to the uploaded CSV (`orders.csv` -> `orders.csv.col`)
+and holds the same table already split into typed columns, so queries can
+mmap it instead of re-tokenizing the CSV text.
+
+Layout (all integers little-endian, every segment 8-byte aligned):
+
+    [ header: MAGIC (8 bytes) | meta offset (u64) | meta length (u64) ]
+    [ column segments ... ]
+    [ meta: UTF-8 JSON with schema, row count and segment offsets ]
+
+Sidecars are mapped read-only, so every worker process on the host
+reads the same physical pages from the OS page cache instead of holding
+a private copy of the table. Within a process open_shared() hands out
+one mapping per sidecar; the kernel keeps a deleted sidecar's pages alive
+until the last process unmaps it.
+
+Column segments per kind:
+    int / float  -> null bitmap, fixed-width int64 / float64 values
+    str / object -> null bitmap, int64 offsets (n + 1), UTF-8 data
+                    (object values are stored JSON-encoded)
+"""
+import json
+import mmap
+import os
+import pickle
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from array import array
+from collections.abc import Sequence
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sidecar builds are not coordinated
+    fcntl = None
+
+from .columnar import ARRAY_TYPECODES, Column, ColumnBuilder, ColumnStore
+
+
+MAGIC = b'AISTCOL1'
+SIDECAR_SUFFIX = '.col'
+LOCK_SUFFIX = '.lock'
+STAMP_SUFFIX = '.stamp'
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<8sQQ')
+_ALIGN = 8
+
+
+def sidecar_path(filepath):
+    """Returns the sidecar location for a CSV file."""
+    return filepath + SIDECAR_SUFFIX
+
+
+def has_fresh_sidecar(filepath):
+    """True if a sidecar exists and is at least as new as the CSV."""
+    path = sidecar_path(filepath)
+    try:
+        return os.path.getmtime(path) >= os.path.getmtime(filepath)
+    except OSError:
+        return False
+
+
+class _SegmentWriter:
+    def __init__(self, f):
+        self.f = f
+        self.offset = f.tell()
+
+    def write(self, data):
+        """Writes one aligned segment and returns its [offset, length]."""
+        pad = (-self.offset) % _ALIGN
+        if pad:
+            self.f.write(b'\0' * pad)
+            self.offset += pad
+        start = self.offset
+        self.f.write(data)
+        self.offset += len(data)
+        return [start, len(data)]
+
+    def write_parts(self, parts):
+        """Writes one aligned segment from a stream of byte strings."""
+        start = self.write(b'')[0]
+        for data in parts:
+            self.f.write(data)
+            self.offset += len(data)
+        return [start, self.offset - start]
+
+
+def _as_little_endian(values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _write_column(writer, column, num_rows):
+    nulls = bytes(column.nulls[:(num_rows + 7) // 8])
+    meta = {
+        'kind': column.kind,
+        'null_count': column.null_count,
+        'nulls': writer.write(nulls),
+    }
+
+    if column.kind in ARRAY_TYPECODES:
+        values = column.values
+        if not isinstance(values, array):
+            values = array(ARRAY_TYPECODES[column.kind], values)
+        meta['values'] = writer.write(_as_little_endian(values))
+        return meta
+
+    if column.kind == 'str':
+        encode = lambda v: b'' if v is None else v.encode('utf-8')
+    else:
+        # JSON keeps the original Python type; nulls encode as `null`
+        encode = lambda v: json.dumps(v).encode('utf-8')
+    offsets = array('q', [0])
+    chunks = []
+    position = 0
+    for value in column:
+        data = encode(value)
+        chunks.append(data)
+        position += len(data)
+        offsets.append(position)
+    meta['offsets'] = writer.write(_as_little_endian(offsets))
+    meta['data'] = writer.write(b''.join(chunks))
+    return meta
+
+
+def write_sidecar(path, store, extra_meta=None):
+    """
+    Writes a ColumnStore to `path` in the sidecar format.
+    The file is written to a temporary name and renamed into place, so
+    readers that already mapped an older version keep a consistent view.
+    """
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, 0, 0))
+        writer = _SegmentWriter(f)
+
+        columns_meta = {
+            col: _write_column(writer, store.column(col), store.num_rows)
+            for col in store.header
+        }
+        meta = {
+            'version': FORMAT_VERSION,
+            'row_count': store.num_rows,
+            'header': store.header,
+            'column_types': store.column_types,
+            'columns': columns_meta,
+        }
+        if extra_meta:
+            meta.update(extra_meta)
+
+        meta_bytes = json.dumps(meta).encode('utf-8')
+        meta_offset, meta_len = writer.write(meta_bytes)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, meta_offset, meta_len))
+
+    os.replace(tmp_path, path)
+
+
+# Rows per spooled chunk in a SidecarWriter (a multiple of 8, so the
+# chunks' null bitmaps concatenate)
+_WRITER_CHUNK = 65_536
+
+
+class SidecarWriter:
+    """
+    Writes rows to a sidecar as they arrive, for tables that are never
+    held in memory (e.g. an out-of-core join). Each column is spooled in
+    chunks to a temporary file and copied into its segments on close(),
+    so at most one chunk of rows is in memory. A column whose values do
+    not all fit its kind is stored as 'object', as ColumnBuilder does.
+    """
+
+    def __init__(self, path, header, column_types, spill_dir=None):
+        self.path = path
+        self.header = list(header)
+        self.column_types = dict(column_types)
+        self.num_rows = 0
+        self._directory = tempfile.mkdtemp(prefix='aistoria-sidecar-', dir=spill_dir)
+        self._spools = [open(os.path.join(self._directory, f"{n}.pkl"), 'wb') for n in range(len(self.header))]
+        self._kinds = [ColumnBuilder(self.column_types.get(col, 'str')).kind for col in self.header]
+        self._null_counts = [0] * len(self.header)
+        self._rows = []
+
+    def append(self, row):
+        """Adds one row: a sequence of values in header order."""
+        self._rows.append(row)
+        if len(self._rows) >= _WRITER_CHUNK:
+            self._flush()
+
+    def _flush(self):
+        if not self._rows:
+            return
+        for n, values in enumerate(zip(*self._rows)):
+            builder = ColumnBuilder(self._kinds[n])
+            builder.extend(values)
+            column = builder.finish()
+            if column.kind != self._kinds[n]:
+                self._kinds[n] = 'object'  # Earlier chunks are converted on close()
+            self._null_counts[n] += column.null_count
+            pickle.dump(column, self._spools[n], protocol=pickle.HIGHEST_PROTOCOL)
+        self.num_rows += len(self._rows)
+        self._rows = []
+
+    def _chunks(self, n):
+        with open(os.path.join(self._directory, f"{n}.pkl"), 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def _write_column(self, writer, n):
+        kind = self._kinds[n]
+        meta = {
+            'kind': kind,
+            'null_count': self._null_counts[n],
+            'nulls': writer.write_parts(bytes(column.nulls) for column in self._chunks(n)),
+        }
+        if kind in ARRAY_TYPECODES:
+            meta['values'] = writer.write_parts(_as_little_endian(column.values) for column in self._chunks(n))
+            return meta
+
+        if kind == 'str':
+            encode = lambda v: b'' if v is None else v.encode('utf-8')
+        else:
+            encode = lambda v: json.dumps(v).encode('utf-8')
+
+        def offsets():
+            position = 0
+            yield _as_little_endian(array('q', [0]))
+            for column in self._chunks(n):
+                ends = array('q')
+                for value in column:
+                    position += len(encode(value))
+                    ends.append(position)
+                yield _as_little_endian(ends)
+
+        meta['offsets'] = writer.write_parts(offsets())
+        meta['data'] = writer.write_parts(
+            b''.join(encode(value) for value in column) for column in self._chunks(n)
+        )
+        return meta
+
+    def close(self, extra_meta=None):
+        """Writes the sidecar (renamed into place like write_sidecar()) and removes the spool."""
+        try:
+            self._flush()
+            for spool in self._spools:
+                spool.close()
+            tmp_path = f"{self.path}.tmp{os.getpid()}"
+            with open(tmp_path, 'wb') as f:
+                f.write(_HEADER.pack(MAGIC, 0, 0))
+                writer = _SegmentWriter(f)
+                columns_meta = {col: self._write_column(writer, n) for n, col in enumerate(self.header)}
+                meta = {
+                    'version': FORMAT_VERSION,
+                    'row_count': self.num_rows,
+                    'header': self.header,
+                    'column_types': self.column_types,
+                    'columns': columns_meta,
+                }
+                if extra_meta:
+                    meta.update(extra_meta)
+                meta_offset, meta_len = writer.write(json.dumps(meta).encode('utf-8'))
+                f.seek(0)
+                f.write(_HEADER.pack(MAGIC, meta_offset, meta_len))
+            os.replace(tmp_path, self.path)
+        finally:
+            self.discard()
+
+    def discard(self):
+        """Removes the spool without writing a sidecar."""
+        for spool in self._spools:
+            spool.close()
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+
+# ---------- Small array files ----------
+#
+# Indexes and upload state use the sidecar layout too (header, aligned
+# segments, JSON meta) with their own magic, so nothing read back from
+# the upload folder is ever unpickled.
+
+def write_arrays(path, magic, meta, arrays):
+    """
+    Writes `arrays` ({name: array}) and the JSON-serializable `meta` to
+    `path` in the sidecar layout, renamed into place.
+    """
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(magic, 0, 0))
+        writer = _SegmentWriter(f)
+        segments = {
+            name: {'typecode': values.typecode, 'span': writer.write(_as_little_endian(values))}
+            for name, values in arrays.items()
+        }
+        meta_offset, meta_len = writer.write(json.dumps({'meta': meta, 'arrays': segments}).encode('utf-8'))
+        f.seek(0)
+        f.write(_HEADER.pack(magic, meta_offset, meta_len))
+    os.replace(tmp_path, path)
+
+
+def read_arrays(path, magic):
+    """
+    Reads a file written by write_arrays(): returns (meta, {name: array}).
+    Raises ValueError if it is not a `magic` file.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        raise ValueError(f"Truncated array file: {path}")
+    found, meta_offset, meta_len = _HEADER.unpack_from(data)
+    if found != magic:
+        raise ValueError(f"Not a {magic.decode('ascii', 'replace')} file: {path}")
+    info = json.loads(data[meta_offset:meta_offset + meta_len].decode('utf-8'))
+    arrays = {}
+    for name, segment in info['arrays'].items():
+        start, length = segment['span']
+        values = array(segment['typecode'])
+        values.frombytes(data[start:start + length])
+        if sys.byteorder != 'little':
+            values.byteswap()
+        arrays[name] = values
+    return info['meta'], arrays
+
+
+def pack_strings(values):
+    """str values -> (offsets array('q'), UTF-8 data array('B')) for write_arrays()."""
+    offsets = array('q', [0])
+    data = bytearray()
+    for value in values:
+        data += value.encode('utf-8')
+        offsets.append(len(data))
+    packed = array('B')
+    packed.frombytes(bytes(data))
+    return offsets, packed
+
+
+def unpack_strings(offsets, data):
+    """The str values packed by pack_strings()."""
+    raw = data.tobytes()
+    return [raw[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+
+class MappedStrings(Sequence):
+    """
+    Read-only string values backed by an offsets array and a UTF-8 blob
+    inside a mapped sidecar. Values are decoded on access.
+    """
+
+    __slots__ = ('offsets', 'data', 'decode')
+
+    def __init__(self, offsets, data, decode=None):
+        self.offsets = offsets
+        self.data = data
+        self.decode = decode or (lambda raw: str(raw, 'utf-8'))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[p] for p in range(len(self))[i]]
+        if i < 0:
+            i += len(self)
+        return self.decode(self.data[self.offsets[i]:self.offsets[i + 1]])
+
+    def __iter__(self):
+        data = self.data
+        decode = self.decode
+        offsets = iter(self.offsets)
+        start = next(offsets, 0)
+        for end in offsets:
+            yield decode(data[start:end])
+            start = end
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.data.nbytes
+
+
+def _decode_json(raw):
+    return json.loads(str(raw, 'utf-8'))
+
+
+def read_meta(path):
+    """Reads only the schema/metadata block of a sidecar."""
+    with open(path, 'rb') as f:
+        magic, meta_offset, meta_len = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not a columnar sidecar: {path}")
+        f.seek(meta_offset)
+        return json.loads(f.read(meta_len).decode('utf-8'))
+
+
+def open_sidecar(path):
+    """
+    Maps a sidecar into memory and returns a ColumnStore whose columns are
+    zero-copy views over the mapping. Only the metadata JSON is parsed.
+    """
+    if sys.byteorder != 'little':
+        raise ValueError("Columnar sidecars can only be mapped on little-endian hosts")
+
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    buf = memoryview(mm)
+    magic, meta_offset, meta_len = _HEADER.unpack(buf[:_HEADER.size])
+    if magic != MAGIC:
+        raise ValueError(f"Not a columnar sidecar: {path}")
+    meta = json.loads(str(buf[meta_offset:meta_offset + meta_len], 'utf-8'))
+
+    def segment(span):
+        start, length = span
+        return buf[start:start + length]
+
+    columns = {}
+    for col in meta['header']:
+        info = meta['columns'][col]
+        kind = info['kind']
+        if kind in ARRAY_TYPECODES:
+            values = segment(info['values']).cast(ARRAY_TYPECODES[kind])
+        else:
+            decode = _decode_json if kind == 'object' else None
+            values = MappedStrings(segment(info['offsets']).cast('q'), segment(info['data']), decode)
+        columns[col] = Column(kind, values, segment(info['nulls']), info['null_count'])
+
+    store = ColumnStore(meta['header'], columns, meta['column_types'], meta['row_count'])
+    store.meta = meta
+    store.mapping = mm  # keeps the mapping alive as long as the store
+    return store
+
+
+# ---------- Sharing across DataFrames and workers ----------
+
+# sidecar path -> ((mtime_ns, size), weakref to the mapped ColumnStore)
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def _file_version(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def open_shared(path):
+    """
+    Like open_sidecar(), but all callers in this process share one
+    mapping per sidecar version. The mapping lives as long as any
+    DataFrame references its store and is unmapped after the last one
+    goes away.
+    """
+    version = _file_version(path)
+    with _shared_lock:
+        entry = _shared.get(path)
+        store = entry[1]() if entry is not None and entry[0] == version else None
+        if store is None:
+            store = open_sidecar(path)
+            _shared[path] = (version, weakref.ref(store))
+        return store
+
+
+def shared_count():
+    """Number of sidecars currently mapped through open_shared()."""
+    with _shared_lock:
+        return sum(1 for _, ref in _shared.values() if ref() is not None)
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock across processes on `path` + LOCK_SUFFIX."""
+    if fcntl is None:
+        yield
+        return
+    with open(path + LOCK_SUFFIX, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def sidecar_lock(filepath):
+    """
+    Exclusive lock across processes for building a CSV's sidecar, so
+    concurrent workers build it once and the others wait and map it.
+    """
+    return file_lock(sidecar_path(filepath))
+
+
+def stamp_path(filepath):
+    """Returns the location of a CSV's change stamp."""
+    return filepath + STAMP_SUFFIX
+
+
+def touch_stamp(filepath):
+    """
+    Moves a CSV's change stamp (an empty file) forward in time, so every
+    worker that checks its mtime sees the table as changed, e.g. after
+    a rename or a new index that leave the CSV itself untouched.
+    """
+    path = stamp_path(filepath)
+    try:
+        previous = os.stat(path).st_mtime_ns
+    except OSError:
+        open(path, 'a').close()
+        previous = 0
+    # Strictly later, even for two touches within one clock tick
+    mtime = max(time.time_ns(), previous + 1)
+    os.utime(path, ns=(mtime, mtime))
+
+
+def remove_sidecar(filepath):
+    """
+    Deletes a CSV's sidecar, lock file and change stamp and forgets its
+    shared mapping. Workers still reading it keep a valid view until they
+    let go.
+    """
+    path = sidecar_path(filepath)
+    with _shared_lock:
+        _shared.pop(path, None)
+    for name in (path, path + LOCK_SUFFIX, stamp_path(filepath)):
+        if os.path.exists(name):
+            os.remove(name)
@@ -0,0 +1,341 @@
+# engine/tokenizer.py
+import re
+from itertools import repeat
+
+# Size of the binary blocks read from disk by the block tokenizer.
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+# Field states of the quoted-record state machine
+_UNQUOTED = 0
+_IN_QUOTES = 1
+_CLOSED = 2  # after the closing quote of a quoted field
+
+
+class BlockTokenizer:
+    """
+    Incremental, quote-aware CSV tokenizer (RFC 4180) over binary blocks.
+
+    Feed it raw bytes with feed() and finish with close(). Both return a
+    (rows, malformed) pair for the records completed so far:
+
+      - rows       list of value sequences, one per record whose field
+                   count equals `width` (every record if width is None).
+                   Values are the decoded field strings; all of them, or
+                   only those at the positions given in `columns` (the
+                   other fields are never decoded).
+      - malformed  list of (line_number, field_count, raw_bytes) for
+                   records with the wrong number of fields
+
+    Quote-free blocks whose lines all have exactly `width` fields are
+    split with a single call and regrouped into rows without a per-line
+    Python loop. Other quote-free lines take one bytes.split each. Quoted
+    fields may contain separators, doubled quotes and newlines.
+
+    Unquoted fields are stripped of surrounding whitespace, like the
+    line-based parser; quoted fields are kept verbatim. Blank lines are
+    skipped. The separator must be a single character.
+    """
+
+    def __init__(self, separator=',', quotechar='"', columns=None, encoding='utf-8', width=None,
+                 line_number=0):
+        self.sep = separator.encode(encoding)
+        self.quote = quotechar.encode(encoding)
+        self.columns = list(columns) if columns is not None else None
+        self.encoding = encoding
+        self.width = width
+        self._sep_str = separator
+        self._special = re.compile(
+            b'[' + re.escape(self.sep) + re.escape(self.quote) + b'\n]'
+        )
+        self._pending = b''
+        self._line_number = line_number
+        self._rows = []
+        self._pieces = []  # row lists and _FlatFields, in record order
+        self._malformed = []
+
+    # ---------- Public API ----------
+
+    @property
+    def line_count(self):
+        """Physical lines consumed so far (blank lines included)."""
+        return self._line_number
+
+    @property
+    def pending(self):
+        """Bytes of an incomplete last record, held until more input arrives."""
+        return self._pending
+
+    def feed(self, block, as_columns=False):
+        """
+        Tokenizes a block of bytes; returns (rows, malformed). With
+        `as_columns` the first item is instead a list of columns (one
+        list of values per selected field).
+        """
+        buf = self._pending + block if self._pending else block
+        consumed = self._tokenize(buf, final=False)
+        self._pending = buf[consumed:]
+        return self._take(as_columns)
+
+    def close(self, as_columns=False):
+        """Flushes the final record (a last line without a newline)."""
+        buf = self._pending
+        self._pending = b''
+        if buf:
+            self._tokenize(buf, final=True)
+        return self._take(as_columns)
+
+    def tokenize_file(self, fileobj, block_size=DEFAULT_BLOCK_SIZE, as_columns=False):
+        """Generator of (rows, malformed) batches over a binary file object."""
+        while True:
+            block = fileobj.read(block_size)
+            if not block:
+                break
+            yield self.feed(block, as_columns)
+        yield self.close(as_columns)
+
+    # ---------- Internals ----------
+
+    def _flush_rows(self):
+        if self._rows:
+            self._pieces.append(self._rows)
+            self._rows = []
+
+    def _take(self, as_columns):
+        self._flush_rows()
+        pieces = self._pieces
+        malformed = self._malformed
+        self._pieces = []
+        self._malformed = []
+
+        if as_columns:
+            width = len(self.columns) if self.columns is not None else self.width
+            columns = None
+            for piece in pieces:
+                if isinstance(piece, _FlatFields):
+                    part = piece.columns(self.columns, self.encoding)
+                else:
+                    part = [list(c) for c in zip(*piece)]
+                if columns is None:
+                    columns = part
+                else:
+                    for column, values in zip(columns, part):
+                        column.extend(values)
+            if columns is None:
+                columns = [[] for _ in range(width or 0)]
+            return columns, malformed
+
+        rows = []
+        for piece in pieces:
+            if isinstance(piece, _FlatFields):
+                rows.extend(zip(*piece.columns(self.columns, self.encoding)))
+            else:
+                rows.extend(piece)
+        return rows, malformed
+
+    def _emit(self, line_number, fields, raw):
+        """Routes one tokenized record to rows or malformed."""
+        count = len(fields)
+        if self.width is not None and count != self.width:
+            self._malformed.append((line_number, count, raw))
+            return
+        encoding = self.encoding
+        if self.columns is None:
+            self._rows.append([f.decode(encoding) for f in fields])
+        else:
+            self._rows.append([fields[i].decode(encoding) for i in self.columns])
+
+    def _split_line(self, line):
+        """Fast path for a single line that contains no quote character."""
+        stripped = line.strip()
+        fields = stripped.split(self.sep)
+        if self.width is not None and len(fields) != self.width:
+            self._malformed.append((self._line_number, len(fields), line))
+            return
+
+        if self.columns is None:
+            values = stripped.decode(self.encoding).split(self._sep_str)
+            if b' ' in stripped or b'\t' in stripped or b'\r' in stripped:
+                values = [v.strip() for v in values]
+        else:
+            values = [fields[i].strip().decode(self.encoding) for i in self.columns]
+        self._rows.append(values)
+
+    def _split_uniform(self, region):
+        """
+        Vectorized split of a quote-free region whose lines all have
+        exactly `width` fields: one split call for the whole region,
+        kept as a flat field list until rows or columns are requested.
+        Returns the number of lines handled, or None if the region does
+        not qualify (unknown width, blank or malformed lines).
+        """
+        width = self.width
+        if not width or width < 2:
+            return None
+        sep = self.sep
+        lines = region.split(b'\n')
+        if set(map(bytes.count, lines, repeat(sep))) != {width - 1}:
+            return None
+
+        needs_strip = b' ' in region or b'\t' in region or b'\r' in region
+        if self.columns is None:
+            # Every field is used: decoding the region once is cheapest
+            flat = region.decode(self.encoding).replace('\n', self._sep_str).split(self._sep_str)
+        else:
+            flat = region.replace(b'\n', sep).split(sep)
+        self._flush_rows()
+        self._pieces.append(_FlatFields(flat, width, needs_strip))
+        return len(lines)
+
+    def _tokenize(self, buf, final):
+        """Tokenizes the complete records in `buf`; returns bytes consumed."""
+        quote = self.quote
+        if final and not buf.endswith(b'\n'):
+            buf += b'\n'
+        end = len(buf)
+        last_newline = buf.rfind(b'\n')
+        if last_newline < 0:
+            return 0
+
+        # Whole region without quotes: split all lines at once
+        if quote not in buf:
+            region = buf[:last_newline]
+            handled = self._split_uniform(region)
+            if handled is not None:
+                self._line_number += handled
+                return last_newline + 1
+
+            for line in region.split(b'\n'):
+                self._line_number += 1
+                if line.strip():
+                    self._split_line(line)
+            return last_newline + 1
+
+        pos = 0
+        while pos < end:
+            newline = buf.find(b'\n', pos)
+            if newline < 0:
+                break
+            line = buf[pos:newline]
+            if quote not in line:
+                self._line_number += 1
+                pos = newline + 1
+                if line.strip():
+                    self._split_line(line)
+                continue
+
+            parsed = self._parse_quoted(buf, pos, final)
+            if parsed is None:
+                break  # Record continues in the next block
+            fields, next_pos = parsed
+            raw = buf[pos:next_pos - 1]
+            start_line = self._line_number + 1
+            self._line_number += raw.count(b'\n') + 1
+            pos = next_pos
+            self._emit(start_line, fields, raw)
+
+        return pos
+
+    def _parse_quoted(self, buf, start, final):
+        """
+        Parses one record starting at `start` with a full RFC 4180 state
+        machine. Returns (fields, position after the record's newline),
+        or None if the record is not complete within `buf`.
+        """
+        sep = self.sep[0]
+        quote = self.quote[0]
+        quote_byte = self.quote
+        special = self._special
+        n = len(buf)
+
+        fields = []
+        field = bytearray()
+        state = _UNQUOTED
+        i = start
+
+        while i < n:
+            if state == _IN_QUOTES:
+                # Inside quotes: copy everything up to the next quote
+                j = buf.find(quote_byte, i)
+                if j < 0:
+                    return None if not final else self._finish(fields, field, state, n)
+                field += buf[i:j]
+                if j + 1 < n and buf[j + 1] == quote:
+                    field.append(quote)  # Escaped "" inside a quoted field
+                    i = j + 2
+                    continue
+                if j + 1 >= n and not final:
+                    return None  # Cannot tell "" from " yet
+                state = _CLOSED
+                i = j + 1
+                continue
+
+            m = special.search(buf, i)
+            if m is None:
+                return None if not final else self._finish(fields, field, state, n)
+            j = m.start()
+            c = buf[j]
+            chunk = buf[i:j]
+
+            if state == _CLOSED:
+                # After a closing quote only whitespace is expected
+                chunk = chunk.strip()
+            field += chunk
+
+            if c == quote:
+                if state == _UNQUOTED and not field.strip():
+                    field = bytearray()
+                    state = _IN_QUOTES
+                else:
+                    field.append(quote)  # Stray quote in an unquoted field
+                i = j + 1
+            elif c == sep:
+                fields.append(self._field_bytes(field, state))
+                field = bytearray()
+                state = _UNQUOTED
+                i = j + 1
+            else:  # Newline ends the record
+                fields.append(self._field_bytes(field, state))
+                return fields, j + 1
+
+        if not final:
+            return None
+        return self._finish(fields, field, state, n)
+
+    def _finish(self, fields, field, state, end):
+        fields.append(self._field_bytes(field, state))
+        return fields, end + 1
+
+    @staticmethod
+    def _field_bytes(field, state):
+        """Quoted fields keep their content verbatim; others are stripped."""
+        return bytes(field) if state != _UNQUOTED else bytes(field).strip()
+
+
+class _FlatFields:
+    """
+    The fields of a uniform block as one flat list (row-major). Column i
+    is the slice flat[i::width], so rows or columns are produced with C
+    level slicing instead of per-line work. `flat` holds str when every
+    field is used and bytes when only some columns will be decoded.
+    """
+
+    __slots__ = ('flat', 'width', 'needs_strip')
+
+    def __init__(self, flat, width, needs_strip):
+        self.flat = flat
+        self.width = width
+        self.needs_strip = needs_strip
+
+    def columns(self, selected, encoding):
+        flat = self.flat
+        width = self.width
+        positions = selected if selected is not None else range(width)
+        result = []
+        for i in positions:
+            column = flat[i::width]
+            if self.needs_strip:
+                column = list(map(str.strip if selected is None else bytes.strip, column))
+            if selected is not None:
+                column = [value.decode(encoding) for value in column]
+            result.append(column)
+        return result
@@ -1,3 +1,26 @@
 # extensions.py
 from flask_sqlalchemy import SQLAlchemy
-db = SQLAlchemy()
\ No newline at end of file
+from sqlalchemy import inspect, text
+
+db = SQLAlchemy()
+
+
+def add_missing_columns():
+    """
+    db.create_all() creates missing tables but never alters existing ones.
+    Adds any model column that an older database does not have yet (all
+    such columns are nullable).
+    """
+    inspector = inspect(db.engine)
+    quote = db.engine.dialect.identifier_preparer.quote
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                db.session.execute(text(
+                    f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"
+                ))
+    db.session.commit()
\ No newline at end of file
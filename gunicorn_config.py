@@ -1,5 +1,6 @@
 # gunicorn_config.py
 import multiprocessing
+import os
 
 # Bind to all interfaces on port 5000
 bind = "0.0.0.0:5000"
@@ -8,7 +9,15 @@ bind = "0.0.0.0:5000"
 # Formula: (2 x CPUs) + 1. Good standard starting point.
 workers = multiprocessing.cpu_count() * 2 + 1
 
-# Threads per worker (good for handling I/O like AI requests)
+# Async workers: each worker serves many connections at once, so open
+# /api/chat/stream connections waiting on the AI do not tie up a worker.
+# Set GUNICORN_WORKER_CLASS=gthread to fall back to threaded workers.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gevent")
+
+# Concurrent connections per async worker
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "100"))
+
+# Threads per worker (only used by the gthread worker class)
 threads = 2
 
 # Timeout for requests (120s gives the AI time to "think" if needed)
@@ -17,4 +26,4 @@ timeout = 120
 # Logging
 accesslog = "-"  # Log to stdout
 errorlog = "-"   # Log to stderr
-loglevel = "info"
\ No newline at end of file
+loglevel = "info"
@@ -22,6 +22,9 @@ class Project(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     tables = db.relationship('Table', backref='project', lazy=True, cascade="all, delete-orphan")
+    # Foreign keys found between the tables (see services/relationship_detector.py);
+    # None until detected, reset when the tables change
+    relationships = db.Column(db.JSON, nullable=True)
 
 class Table(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -29,5 +32,50 @@ class Table(db.Model):
     filename = db.Column(db.String(200), nullable=False)
     filepath = db.Column(db.String(500), nullable=False)
     columns_schema = db.Column(db.JSON, nullable=True) 
+    # Ingest-time column statistics (see engine/stats.py)
+    column_stats = db.Column(db.JSON, nullable=True)
+    # Secondary indexes built on this table: {column: 'hash' | 'sorted'}
+    indexes = db.Column(db.JSON, nullable=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
-    row_count = db.Column(db.Integer)
\ No newline at end of file
+    row_count = db.Column(db.Integer)
+
+class TranslationCacheEntry(db.Model):
+    """A cached LLM translation (see services/translation_cache.py)."""
+    __tablename__ = "translation_cache"
+    cache_key = db.Column(db.String(64), primary_key=True)
+    question = db.Column(db.Text, nullable=False)
+    response_text = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+class IngestJob(db.Model):
+    """A background CSV ingest started by an upload (see services/ingest_jobs.py)."""
+    __tablename__ = "ingest_job"
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    filename = db.Column(db.String(200), nullable=False)
+    filepath = db.Column(db.String(500), nullable=False)
+    # 'queued' -> 'running' -> 'done' | 'failed'
+    status = db.Column(db.String(16), nullable=False, default='queued')
+    # What a running job is doing: 'parsing', then 'indexing'
+    stage = db.Column(db.String(32), nullable=True)
+    bytes_done = db.Column(db.BigInteger, default=0)
+    bytes_total = db.Column(db.BigInteger, nullable=True)
+    table_id = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ChunkedUpload(db.Model):
+    """A resumable upload in progress (see engine/ingest.ChunkedIngest)."""
+    __tablename__ = "chunked_upload"
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    filename = db.Column(db.String(200), nullable=False)
+    # Size announced by the client, checked when the upload is finalized
+    size = db.Column(db.BigInteger, nullable=True)
+    # 'uploading' -> 'finalized' (then see the ingest job)
+    status = db.Column(db.String(16), nullable=False, default='uploading')
+    job_id = db.Column(db.String(32), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
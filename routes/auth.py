@@ -49,6 +49,6 @@ def login():
 
 @auth_bp.route('/api/logout', methods=['POST'])
 def logout():
+    clear_cache_for_user(session.get('user_id'))
     session.clear()
-    clear_cache_for_user() # Though now stateless, good to clear just in case
     return jsonify({'success': True})
\ No newline at end of file
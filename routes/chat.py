@@ -1,186 +1,470 @@
 # routes/chat.py
 import json
 import re
-from flask import Blueprint, request, jsonify, session
+from itertools import chain, islice
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from flask import Blueprint, Response, current_app, request, jsonify, session, stream_with_context
+from extensions import db
+from models import Project
 from services.llm_service import get_model
-from services.state_manager import get_dataframe
+from services.state_manager import get_dataframe, get_result_cache, get_result_cursors, table_version
+from services.ingest_jobs import spawn
+from services.result_cache import ResultCache, referenced_tables
+from services.translation_cache import translation_key
+from services.prompt_builder import get_prompt_builder
+from services.translation_store import get_translation_cache
+from engine.plan import PlanContext
+from engine.rows import LazyRows
+from engine.stats import compute_stats, sketch_columns, stamp_stats
 from services.chart_builder import build_chart_url
 from services.security import secure_eval, SecurityViolation
 from services.logger import get_logger
+from services.relationship_detector import detect_relationships as find_relationships, resolve_ambiguous
+from services.sse import SSE_HEADERS, row_batches, sse_comment, sse_event
+from services.result_cursors import column_names, gzip_body, iter_result, row_values
 
 chat_bp = Blueprint('chat', __name__)
 logger = get_logger(__name__)
 
+# Model calls of streamed chats run here; the request greenlet/thread only
+# relays progress events. Sized for I/O-bound calls, not CPU.
+_llm_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='llm')
+
+# Seconds between keep-alive comments while the model is thinking
+KEEPALIVE_SECONDS = 10
+
+# Rows per 'rows' event of a streamed table result
+STREAM_ROW_BATCH = 500
+
+def _sketch_stats(table):
+    """
+    Column statistics of a table with value sketches. Tables ingested
+    before sketches existed get them from their sidecar once; the updated
+    statistics are saved with the caller's commit.
+    """
+    stats = table.column_stats or {}
+    columns = stats.get('columns') or {}
+    if columns and all('sketch' in c for c in columns.values() if c.get('kind') in ('int', 'str')):
+        return columns
+
+    df = get_dataframe(table.name)
+    if df is None or df.store is None:
+        return columns
+    if not columns:
+        table.column_stats = stamp_stats(compute_stats(df.store), table.filepath)
+        return table.column_stats['columns']
+    sketches = sketch_columns(df.store)
+    columns = {
+        col: dict(col_stats, sketch=sketches[col]) if col in sketches else col_stats
+        for col, col_stats in columns.items()
+    }
+    # A new dict, so SQLAlchemy sees the JSON column change
+    table.column_stats = dict(stats, columns=columns)
+    return columns
+
+def _llm_tiebreak(model, tables, ambiguous):
+    """Asks the model to pick one reference for each ambiguous column."""
+    prompt_schema = {name: list(columns) for name, columns in tables.items()}
+    options = [
+        {'column': f"{from_table}.{from_column}",
+         'candidates': [f"{c['to_table']}.{c['to_column']}" for c in candidates]}
+        for (from_table, from_column), candidates in ambiguous.items()
+    ]
+    prompt = f"""
+    You are an expert database administrator. Given this schema:
+    {json.dumps(prompt_schema)}
+    Each column below holds values found in every one of its candidate key columns.
+    Pick the key each column most likely references:
+    {json.dumps(options)}
+    Return ONLY a JSON object:
+    {{ "choices": [ {{ "column": "t1.c1", "references": "t2.c2" }} ] }}
+    """
+    result = _parse_ai_response(model.generate_content(prompt).text)
+    choices = {}
+    for choice in result.get('choices', []):
+        from_table, _, from_column = choice.get('column', '').partition('.')
+        for candidate in ambiguous.get((from_table, from_column), []):
+            if f"{candidate['to_table']}.{candidate['to_column']}" == choice.get('references'):
+                choices[(from_table, from_column)] = candidate
+    return choices
+
+def _discover_relationships(project):
+    tables = {table.name: _sketch_stats(table) for table in project.tables}
+    relationships, ambiguous = find_relationships(tables)
+    model = get_model()
+    if ambiguous and model and current_app.config.get('RELATIONSHIP_LLM_TIEBREAK'):
+        try:
+            relationships = resolve_ambiguous(relationships, _llm_tiebreak(model, tables, ambiguous))
+        except Exception as e:
+            logger.warning(f"Relationship tiebreak failed, keeping the best guesses: {e}")
+    return relationships
+
 @chat_bp.route('/api/detect-relationships', methods=['POST'])
 def detect_relationships():
+    """
+    Foreign keys between the active project's tables, found locally from
+    the value sketches taken at ingest and stored on the project, so new
+    sessions get them without recomputing. {"refresh": true} recomputes.
+    The AI model is only asked to break ties between equally plausible
+    keys, and only with RELATIONSHIP_LLM_TIEBREAK on.
+    """
     if 'user_id' not in session:
         return jsonify({'success': False, 'error': 'Unauthorized'}), 401
-        
-    model = get_model()
-    if not model:
-        return jsonify({'success': False, 'error': 'AI model not configured'}), 500
-        
-    schema = session.get('db_schema', {})
-    if len(schema) < 2:
+
+    project = Project.query.filter_by(id=session.get('active_project_id'), user_id=session['user_id']).first()
+    if not project:
+        return jsonify({'success': False, 'error': 'No database selected'}), 400
+    if len(project.tables) < 2:
         return jsonify({'success': False, 'error': 'At least two tables are required.'}), 400
 
+    data = request.get_json(silent=True) or {}
+    source = 'stored'
+    if project.relationships is None or data.get('refresh'):
+        try:
+            project.relationships = _discover_relationships(project)
+            db.session.commit()
+            source = 'detected'
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error in relationship detection: {e}")
+            return jsonify({'success': False, 'error': f'Relationship detection failed: {str(e)}'}), 500
+
+    session['db_relationships'] = project.relationships
+    logger.info(f"Relationships ({source}): {len(project.relationships)}")
+    return jsonify({'success': True, 'relationships': project.relationships, 'source': source})
+
+# Part of the translation cache key; bump it when the chat prompt changes
+# so answers generated from the old prompt are not reused.
+TRANSLATION_PROMPT_VERSION = 3
+
+
+def _parse_ai_response(response_text):
+    """Parses the model's JSON answer, stripping Markdown code fences."""
+    response_text = response_text.strip()
+    if response_text.startswith("```json"):
+        response_text = response_text[7:]
+    elif response_text.startswith("```"):
+        response_text = response_text[3:]
+    if response_text.endswith("```"):
+        response_text = response_text[:-3]
+    return json.loads(response_text.strip())
+
+def _result_cache_key(code, frames):
+    """
+    Result cache key for an expression over the loaded tables, or None
+    if the result cannot be cached (unparsable code, or tables looked up
+    by name at run time).
+    """
+    try:
+        tables = referenced_tables(code, frames.keys())
+        if 'get_dataframe' in referenced_tables(code, ['get_dataframe']):
+            return None
+        versions = {
+            name: table_version(frames[name]) if frames[name] is not None else None
+            for name in tables
+        }
+        return ResultCache.key(code, session.get('active_project_id'), versions)
+    except SyntaxError:
+        return None
+
+def _build_prompt(schema, relationships, user_query):
+    """
+    Returns (prompt_schema, relationships, prompt): the schema subset and
+    relationships sent for the question, within PROMPT_TOKEN_BUDGET.
+    """
     prompt_schema = {name: details['types'] for name, details in schema.items()}
-    
-    prompt = f"""
-    You are an expert database administrator. Given this schema:
-    {json.dumps(prompt_schema)}
-    Analyze and infer foreign key relationships. Return ONLY a JSON object:
-    {{ "success": true, "relationships": [ {{ "from_table": "t1", "from_column": "c1", "to_table": "t2", "to_column": "c2" }} ] }}
+    builder = get_prompt_builder(prompt_schema, relationships)
+    return builder.build(user_query, current_app.config.get('PROMPT_TOKEN_BUDGET'))
+
+def _translate(model, user_query, prompt_schema, relationships, prompt):
     """
+    Returns (ai_response, translation_cached). Identical questions against
+    the same schema reuse the stored translation; concurrent ones share a
+    single model call.
+    """
+    key = translation_key(user_query, prompt_schema, relationships, TRANSLATION_PROMPT_VERSION)
+    return get_translation_cache().translate(model, key, user_query, prompt, _parse_ai_response)
 
-    try:
-        response = model.generate_content(prompt)
-        # Clean logic for JSON response
-        json_str = response.text.strip()
-        if json_str.startswith("```json"):
-            json_str = json_str[7:]
-        elif json_str.startswith("```"):
-            json_str = json_str[3:]
-        if json_str.endswith("```"):
-            json_str = json_str[:-3]
-        
-        result = json.loads(json_str.strip())
-        session['db_relationships'] = result.get('relationships', [])
-        
-        logger.info(f"Relationships detected: {len(result.get('relationships', []))}")
-        return jsonify(result)
-    except Exception as e:
-        logger.error(f"Error in Gemini relationship detection: {e}")
-        return jsonify({'success': False, 'error': f'AI API Error: {str(e)}'}), 500
+def _translate_in_app(app, *args):
+    """_translate() on an executor thread, which has no app context of its own."""
+    with app.app_context():
+        return _translate(*args)
 
-@chat_bp.route('/api/chat', methods=['POST'])
-def chat():
+def _table_batches(rows, code_to_run, batch_size):
+    """
+    Reads a table result once (from LazyRows.stream() for lazy results)
+    and yields the rows of its first page in lists of up to `batch_size`
+    row dicts as they are produced. Returns the table payload in columnar
+    form: 'columns' once, 'data' as one list of values per row. A result
+    longer than RESULT_PAGE_ROWS is kept server-side as a cursor
+    (services/result_cursors.py): the payload holds its first page, and
+    /api/results/<cursor> serves the rest. The rest is read in the
+    background, so the payload's row_count is None (not known yet).
+    """
+    page_rows = current_app.config['RESULT_PAGE_ROWS']
+    rows = iter_result(rows)
+    head = []
+    while len(head) < page_rows:
+        batch = list(islice(rows, min(batch_size, page_rows - len(head))))
+        if not batch:
+            break
+        head.extend(batch)
+        yield batch
+    extra = list(islice(rows, 1))  # Reads no further than one row past the page
+    columns = column_names(head + extra)
+    payload = {'type': 'table', 'columns': columns, 'query': code_to_run, 'cursor': None}
+    if not extra:
+        return dict(payload, data=row_values(head, columns), row_count=len(head), next_offset=None)
+
+    # The rest of the same iterator follows the head, so the query runs
+    # once; only the first page is written before the response
+    cursors = get_result_cursors()
+    app = current_app._get_current_object()
+    cursor_id, row_count = cursors.create(session['user_id'], columns, chain(head, extra, rows),
+                                          spawn=lambda func, *args: spawn(app, func, *args))
+    page = cursors.page(cursor_id, session['user_id'])
+    return dict(payload, data=page['data'], row_count=row_count,
+                next_offset=page['next_offset'], cursor=cursor_id)
+
+def _table_payload(rows, code_to_run):
+    """The payload of _table_batches(), read in one go."""
+    batches = _table_batches(rows, code_to_run, current_app.config['RESULT_PAGE_ROWS'])
+    while True:
+        try:
+            next(batches)
+        except StopIteration as done:
+            return done.value
+
+def _table_rows(result, code_to_run):
+    """The rows of an evaluated expression shown as a table, or None."""
+    if isinstance(result, (list, LazyRows)):
+        return result
+    if isinstance(result, dict):
+        table_result = []
+        group_key_match = re.search(r".groupby\('([^']+)'\)", code_to_run)
+        g_key = group_key_match.group(1) if group_key_match else "group"
+        if not group_key_match and '.describe()' in code_to_run:
+            g_key = "column"
+        for k, v in result.items():
+            row = {g_key: k}
+            row.update(v)
+            table_result.append(row)
+        return table_result
+    return None
+
+def _format_result(result, code_to_run):
+    """Turns an evaluated expression into the JSON response payload."""
+    if isinstance(result, str) and result.startswith("https://quickchart.io"):
+        return {'type': 'chart', 'data': result, 'query': code_to_run}
+    rows = _table_rows(result, code_to_run)
+    if rows is not None:
+        return _table_payload(rows, code_to_run)
+    elif isinstance(result, (int, float)):
+        return {'type': 'count', 'data': result, 'query': code_to_run}
+    else:
+        return {'type': 'text', 'data': str(result), 'query': code_to_run}
+
+def _prepare_code(code_to_run, schema):
+    """
+    Returns (eval context, result cache key or None) for generated code
+    over the project's tables.
+    """
+    safe_context = {
+        "get_dataframe": get_dataframe,
+        "len": len,
+        "int": int, "float": float, "str": str,
+        "build_chart_url": build_chart_url
+    }
+    # Tables are lazy: the expression builds one plan, and repeated
+    # subexpressions (e.g. the same join twice) run only once.
+    plan_context = PlanContext()
+    frames = {}
+    for table_name in schema.keys():
+        df = frames[table_name] = get_dataframe(table_name)
+        safe_context[table_name] = df.lazy(plan_context) if df is not None else None
+
+    # Results are cached per normalized expression and the versions
+    # of the tables it reads
+    return safe_context, _result_cache_key(code_to_run, frames)
+
+def _cache_result(cache_key, payload):
+    if cache_key is not None and payload.get('cursor') is None:
+        # Cursor results expire, so only single-page results are cached
+        versions = ResultCache.table_versions(cache_key).values()
+        filepaths = [version.filepath for version in versions if version is not None]
+        get_result_cache().put(cache_key, payload, filepaths)
+
+def _run_code(code_to_run, schema):
+    """Evaluates generated code over the project's tables. Returns (payload, cached)."""
+    safe_context, cache_key = _prepare_code(code_to_run, schema)
+    if cache_key is not None:
+        cached = get_result_cache().get(cache_key)
+        if cached is not None:
+            return cached, True
+
+    payload = _format_result(secure_eval(code_to_run, safe_context), code_to_run)
+    _cache_result(cache_key, payload)
+    return payload, False
+
+def _stream_code(code_to_run, schema):
+    """
+    _run_code() for chat_stream(): yields the rows of a table result's
+    first page in batches of STREAM_ROW_BATCH row dicts while they are
+    produced, then returns (payload, cached).
+    """
+    safe_context, cache_key = _prepare_code(code_to_run, schema)
+    if cache_key is not None:
+        cached = get_result_cache().get(cache_key)
+        if cached is not None:
+            if cached['type'] == 'table':
+                for batch in row_batches(cached['data'], STREAM_ROW_BATCH):
+                    yield [dict(zip(cached['columns'], values)) for values in batch]
+            return cached, True
+
+    result = secure_eval(code_to_run, safe_context)
+    rows = None
+    if not (isinstance(result, str) and result.startswith("https://quickchart.io")):
+        rows = _table_rows(result, code_to_run)
+    if rows is not None:
+        payload = yield from _table_batches(rows, code_to_run, STREAM_ROW_BATCH)
+    else:
+        payload = _format_result(result, code_to_run)
+    _cache_result(cache_key, payload)
+    return payload, False
+
+def _json_response(payload, status=200):
+    """A JSON response, gzip-compressed when the client accepts it."""
+    body = json.dumps(payload, default=str).encode('utf-8')
+    body, encoding = gzip_body(body, request.headers.get('Accept-Encoding'))
+    response = Response(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+def _check_chat_request():
+    """Returns ((model, user_query, schema, relationships), None) or (None, error response)."""
     if 'user_id' not in session:
-        return jsonify({'type': 'error', 'data': 'Unauthorized.'}), 401
-        
+        return None, (jsonify({'type': 'error', 'data': 'Unauthorized.'}), 401)
+
     model = get_model()
     if not model:
-        return jsonify({'type': 'error', 'data': 'AI model not configured'}), 500
+        return None, (jsonify({'type': 'error', 'data': 'AI model not configured'}), 500)
 
     data = request.get_json()
-    user_query = data.get('query')
     schema = session.get('db_schema', {})
-    relationships = session.get('db_relationships', [])
-    
     if not schema:
-        return jsonify({'type': 'error', 'data': 'No database schema found.'}), 400
+        return None, (jsonify({'type': 'error', 'data': 'No database schema found.'}), 400)
+    return (model, data.get('query'), schema, session.get('db_relationships', [])), None
 
-    # 1. Prepare Schema & Tables
-    prompt_schema = {name: details['types'] for name, details in schema.items()}
-    table_definitions = "\n".join([f"{name} = get_dataframe('{name}')" for name in schema.keys()])
-    
-    relationship_info = "No known relationships."
-    if relationships:
-        relationship_info = '\n'.join([f"{r['from_table']}.{r['from_column']} -> {r['to_table']}.{r['to_column']}" for r in relationships])
-
-    # 2. Robust Prompt with all fixes
-    prompt = f"""
-    You are a data analysis bot. You have access to a custom Python DataFrame library.
-
-    --- DATABASE SCHEMA ---
-    {json.dumps(prompt_schema, indent=2)}
-
-    --- AVAILABLE PYTHON OBJECTS ---
-    {table_definitions}
-    
-    --- METHODS & PROPERTIES ---
-    - len(df) -> int
-    - .filter(lambda row: condition) -> DataFrame
-    - .project(list_of_cols) -> list[dict]
-    - .join(other_df, left_col, right_col) -> DataFrame
-    - .groupby(col_name) -> dict
-    - .aggregate(groups, {{col: func}}) -> dict
-        - Supported funcs: 'count', 'sum', 'avg', 'min', 'max'
-    - .columns -> list[str] (This is a property, NOT a function)
-    - build_chart_url(title, type, data) -> str
-        - `data` MUST be the RAW dictionary returned by .aggregate().
-    
-    --- CRITICAL RULES ---
-    1.  **OUTPUT FORMAT:** Return JSON: {{ "isCode": boolean, "content": string }}.
-    2.  **TABLE OUTPUT:** To show a table, you MUST use `.project()`. To show ALL columns, use `df.columns` (e.g., `customers.project(customers.columns)[:10]`). You MUST slice the result (e.g., `[:10]`).
-    3.  **CHARTING:** When using `build_chart_url`, pass the result of `.aggregate()` DIRECTLY as the 3rd argument.
-    4.  **DATA TYPES:** Cast numbers when filtering (e.g., `int(row['age']) > 30`).
-    5.  **TABLE NAMES:** Use exact variable names.
-    6.  **FORBIDDEN:** Do NOT use `list()` or `.keys()`. Use `.columns`.
-    
-    --- EXAMPLES ---
-    User: "Hello"
-    Response: {{ "isCode": false, "content": "Hello! I am ready to analyze your data." }}
-
-    User: "How many students?" 
-    Response: {{ "isCode": true, "content": "len(students)" }}
-    
-    User: "show me the first 10 customers"
-    Response: {{ "isCode": true, "content": "customers.project(customers.columns)[:10]" }}
-
-    User: "Show me 3 orders"
-    Response: {{ "isCode": true, "content": "orders.project(orders.columns)[:3]" }}
-
-    User: "Plot a bar chart of sales by country"
-    Response: {{ "isCode": true, "content": "build_chart_url('Sales by Country', 'bar', customers.join(orders, 'customer_id', 'customer_id').aggregate(customers.join(orders, 'customer_id', 'customer_id').groupby('country'), {{'total_amount': 'sum'}}))" }}
-
-    NOW, generate the JSON for: "{user_query}"
-    """
+@chat_bp.route('/api/chat', methods=['POST'])
+def chat():
+    checked, error = _check_chat_request()
+    if error:
+        return error
+    model, user_query, schema, relationships = checked
+    prompt_schema, relationships, prompt = _build_prompt(schema, relationships, user_query)
 
+    code_to_run = None
     try:
-        response = model.generate_content(prompt)
-        
-        # Clean Markdown
-        response_text = response.text.strip()
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        elif response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        
-        ai_response = json.loads(response_text.strip())
+        ai_response, translation_cached = _translate(model, user_query, prompt_schema, relationships, prompt)
         
         if not ai_response.get('isCode'):
-            return jsonify({'type': 'text', 'data': ai_response['content']})
+            return jsonify({'type': 'text', 'data': ai_response['content'], 'translation_cached': translation_cached})
         
         code_to_run = ai_response['content']
         logger.info(f"--- AI-Generated Code ---\n{code_to_run}") # Log the code *before* execution
 
-        # 3. Context
-        safe_context = {
-            "get_dataframe": get_dataframe,
-            "len": len,
-            "int": int, "float": float, "str": str,
-            "build_chart_url": build_chart_url
-        }
-        for table_name in schema.keys():
-            safe_context[table_name] = get_dataframe(table_name)
-        
-        result = secure_eval(code_to_run, safe_context)
-
-        # 4. Response Formatting
-        if isinstance(result, str) and result.startswith("https://quickchart.io"):
-            return jsonify({'type': 'chart', 'data': result, 'query': code_to_run})
-        elif isinstance(result, list):
-            return jsonify({'type': 'table', 'data': result, 'query': code_to_run})
-        elif isinstance(result, dict):
-            table_result = []
-            group_key_match = re.search(r".groupby\('([^']+)'\)", code_to_run)
-            g_key = group_key_match.group(1) if group_key_match else "group"
-            for k, v in result.items():
-                row = {g_key: k}
-                row.update(v)
-                table_result.append(row)
-            return jsonify({'type': 'table', 'data': table_result, 'query': code_to_run})
-        elif isinstance(result, (int, float)):
-            return jsonify({'type': 'count', 'data': result, 'query': code_to_run})
-        else:
-            return jsonify({'type': 'text', 'data': str(result), 'query': code_to_run})
+        payload, cached = _run_code(code_to_run, schema)
+        return _json_response(dict(payload, cached=cached, translation_cached=translation_cached))
 
     except SecurityViolation as se:
         logger.warning(f"Security Violation Attempt: {str(se)}")
         return jsonify({'type': 'error', 'data': f"Security Block: {str(se)}", 'query': code_to_run})
     except Exception as e:
         logger.error(f"Chat processing error: {e}")
-        return jsonify({'type': 'error', 'data': f"Error: {str(e)}", 'query': 'N/A'})
\ No newline at end of file
+        return jsonify({'type': 'error', 'data': f"Error: {str(e)}", 'query': 'N/A'})
+
+@chat_bp.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Same as /api/chat, streamed as Server-Sent Events: 'translating',
+    'code', 'executing', 'rows' (the first page of a table result in
+    batches of {'columns', 'rows'}, sent while the query produces them),
+    then 'done' with the result metadata, or 'error'. The model call runs on a
+    background thread, so the connection gets keep-alive comments while
+    it waits instead of holding a silent request open.
+    """
+    checked, error = _check_chat_request()
+    if error:
+        return error
+    model, user_query, schema, relationships = checked
+    prompt_schema, relationships, prompt = _build_prompt(schema, relationships, user_query)
+    app = current_app._get_current_object()
+
+    def events():
+        code_to_run = None
+        try:
+            yield sse_event('translating', {'query': user_query})
+            future = _llm_executor.submit(
+                _translate_in_app, app, model, user_query, prompt_schema, relationships, prompt
+            )
+            while True:
+                try:
+                    ai_response, translation_cached = future.result(timeout=KEEPALIVE_SECONDS)
+                    break
+                except FutureTimeout:
+                    yield sse_comment('keep-alive')
+
+            if not ai_response.get('isCode'):
+                yield sse_event('done', {'type': 'text', 'data': ai_response['content'],
+                                         'translation_cached': translation_cached})
+                return
+
+            code_to_run = ai_response['content']
+            logger.info(f"--- AI-Generated Code ---\n{code_to_run}")
+            yield sse_event('code', {'query': code_to_run, 'translation_cached': translation_cached})
+
+            yield sse_event('executing', {})
+            # The first page of a table goes out in batches as its rows
+            # are produced; 'done' then carries the columns, row count and
+            # cursor instead of the data
+            batches = _stream_code(code_to_run, schema)
+            while True:
+                try:
+                    batch = next(batches)
+                except StopIteration as finished:
+                    payload, cached = finished.value
+                    break
+                columns = column_names(batch)
+                yield sse_event('rows', {'columns': columns, 'rows': row_values(batch, columns)})
+            done = dict(payload, cached=cached, translation_cached=translation_cached)
+            if payload['type'] == 'table':
+                done['data'] = None
+            yield sse_event('done', done)
+
+        except SecurityViolation as se:
+            logger.warning(f"Security Violation Attempt: {str(se)}")
+            yield sse_event('error', {'type': 'error', 'data': f"Security Block: {str(se)}", 'query': code_to_run})
+        except Exception as e:
+            logger.error(f"Chat processing error: {e}")
+            yield sse_event('error', {'type': 'error', 'data': f"Error: {str(e)}", 'query': 'N/A'})
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+@chat_bp.route('/api/results/<cursor_id>', methods=['GET'])
+def result_page(cursor_id):
+    """
+    Rows of a table result kept as a cursor: ?offset=N&limit=M (at most
+    RESULT_PAGE_ROWS rows), in the same columnar layout.
+    """
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+
+    page = get_result_cursors().page(
+        cursor_id, session['user_id'],
+        request.args.get('offset', 0, type=int), request.args.get('limit', type=int)
+    )
+    if page is None:
+        return jsonify({'success': False, 'error': 'Result not found or expired'}), 404
+    return _json_response(dict(page, success=True, cursor=cursor_id))
@@ -1,14 +1,40 @@
 # routes/data.py
 import os
+import uuid
 from flask import Blueprint, request, jsonify, session, current_app
+from werkzeug.utils import secure_filename
 from extensions import db
-from models import Table, Project
-from engine.dataframe import DataFrame
+from models import Table, IngestJob, ChunkedUpload
+from engine.index import INDEX_SUFFIX
+from engine.ingest import ChunkedIngest, ChunkOffsetError
+from engine.storage import LOCK_SUFFIX, SIDECAR_SUFFIX, STAMP_SUFFIX
+from services.ingest_jobs import ingest_upload_job, job_status, start_ingest_job
 
 data_bp = Blueprint('data', __name__)
 
+# Suffixes of the files the engine keeps next to each CSV (sidecar, its
+# lock, change stamp, indexes); an upload must not be able to pose as one
+_RESERVED_SUFFIXES = (SIDECAR_SUFFIX, LOCK_SUFFIX, STAMP_SUFFIX, INDEX_SUFFIX)
+
+def _upload_name(filename):
+    """A safe file name for an upload, or None if it is empty or reserved."""
+    name = secure_filename(filename or '')
+    lowered = name.lower()
+    for suffix in _RESERVED_SUFFIXES:
+        # Also refuses the temporary names those files are written under
+        if lowered.endswith(suffix) or f"{suffix}." in lowered:
+            return None
+    return name or None
+
 @data_bp.route('/api/upload', methods=['POST'])
 def upload_files():
+    """
+    Ingests uploaded CSVs: multipart `files`, or one file as the raw
+    request body with its name in ?filename=. Each file's stream is
+    saved and parsed in the same pass (services/ingest_jobs.py), and the
+    response lists the finished jobs. Large files are better sent
+    through the resumable chunked API below.
+    """
     if 'user_id' not in session:
         return jsonify({'success': False, 'error': 'Unauthorized. Please log in.'}), 401
         
@@ -16,44 +42,221 @@ def upload_files():
     if not active_project_id:
         return jsonify({'success': False, 'error': 'No database selected'}), 400
 
-    if 'files' not in request.files:
-        return jsonify({'success': False, 'error': 'No files part'}), 400
-
-    files = request.files.getlist('files')
-    schema_cache = session.get('db_schema', {})
+    if request.mimetype == 'multipart/form-data':
+        if 'files' not in request.files:
+            return jsonify({'success': False, 'error': 'No files part'}), 400
+        # Werkzeug has already spooled each part; it is read once more
+        uploads = [(file.filename, file.stream, _stream_size(file.stream))
+                   for file in request.files.getlist('files')]
+    else:
+        # The body is read straight off the connection
+        uploads = [(request.args.get('filename'), request.stream, request.content_length)]
 
-    for file in files:
+    jobs = []
+    for original_name, stream, size in uploads:
+        filename = _upload_name(original_name)
+        if filename is None:
+            return jsonify({'success': False, 'error': f'Invalid file name: {original_name}'}), 400
         try:
-            filename = file.filename
             filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            
-            df = DataFrame(source=filepath)
-            column_types = df.get_column_types()
-            row_count = len(df)
-            
-            table_name = os.path.splitext(filename)[0]
-            
-            new_table = Table(
-                name=table_name,
-                filename=filename,
-                filepath=filepath,
-                columns_schema=column_types,
-                row_count=row_count,
-                project_id=active_project_id
-            )
-            db.session.add(new_table)
-            db.session.commit()
-            
-            schema_cache[table_name] = {
-                'id': new_table.id,
-                'filename': filename,
-                'types': column_types,
-                'row_count': row_count
-            }
+            job = ingest_upload_job(session['user_id'], active_project_id, filename, filepath, stream, size)
+            jobs.append(job_status(job))
 
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
 
-    session['db_schema'] = schema_cache
-    return jsonify({'success': True, 'schema': schema_cache})
\ No newline at end of file
+    return jsonify({'success': True, 'jobs': jobs}), 201
+
+def _stream_size(stream):
+    """Length of a seekable upload stream; it is left at the start."""
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+def _add_to_schema(table):
+    """Adds an ingested table to the session schema (jobs have no session)."""
+    schema_cache = session.get('db_schema', {})
+    if table.name not in schema_cache:
+        schema_cache[table.name] = {
+            'id': table.id,
+            'filename': table.filename,
+            'types': table.columns_schema,
+            'row_count': table.row_count
+        }
+        session['db_schema'] = schema_cache
+        session['db_relationships'] = []
+
+@data_bp.route('/api/upload/jobs/<job_id>', methods=['GET'])
+def upload_job_status(job_id):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+
+    job = IngestJob.query.filter_by(id=job_id, user_id=session['user_id']).first()
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+
+    if job.status == 'done' and job.project_id == session.get('active_project_id'):
+        table = Table.query.get(job.table_id)
+        if table:
+            _add_to_schema(table)
+
+    return jsonify({'success': True, 'job': job_status(job), 'schema': session.get('db_schema', {})})
+
+@data_bp.route('/api/upload/jobs', methods=['GET'])
+def upload_jobs():
+    """Recent ingest jobs of the active project."""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+
+    jobs = IngestJob.query.filter_by(
+        user_id=session['user_id'], project_id=session.get('active_project_id')
+    ).order_by(IngestJob.created_at.desc()).limit(20).all()
+    return jsonify({'success': True, 'jobs': [job_status(job) for job in jobs]})
+
+# ---------- Resumable chunked uploads ----------
+#
+# POST   /api/uploads                      {filename, size} -> upload id
+# GET    /api/uploads/<id>                 current offset (where to resume)
+# PUT    /api/uploads/<id>/chunks?offset=N raw bytes, X-Chunk-SHA256 header
+# POST   /api/uploads/<id>/finalize        starts the ingest job
+#
+# Chunks are tokenized and typed as they arrive (engine/ingest.py), so
+# finalizing only joins them and computes the statistics.
+
+def _chunks_dir(upload_id):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], '.chunks', upload_id)
+
+def _get_upload(upload_id):
+    """The caller's upload, or None."""
+    return ChunkedUpload.query.filter_by(id=upload_id, user_id=session.get('user_id')).first()
+
+@data_bp.route('/api/uploads', methods=['POST'])
+def create_upload():
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Unauthorized. Please log in.'}), 401
+
+    active_project_id = session.get('active_project_id')
+    if not active_project_id:
+        return jsonify({'success': False, 'error': 'No database selected'}), 400
+
+    data = request.get_json() or {}
+    filename = _upload_name(data.get('filename'))
+    if not filename:
+        return jsonify({'success': False, 'error': 'A valid filename is required'}), 400
+
+    upload = ChunkedUpload(
+        id=uuid.uuid4().hex,
+        user_id=session['user_id'],
+        project_id=active_project_id,
+        filename=filename,
+        size=data.get('size'),
+    )
+    ChunkedIngest.create(_chunks_dir(upload.id))
+    db.session.add(upload)
+    db.session.commit()
+    return jsonify({
+        'success': True,
+        'upload_id': upload.id,
+        'offset': 0,
+        'chunk_size': current_app.config['UPLOAD_CHUNK_BYTES'],
+    }), 201
+
+@data_bp.route('/api/uploads/<upload_id>', methods=['GET'])
+def upload_offset(upload_id):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+
+    upload = _get_upload(upload_id)
+    if not upload:
+        return jsonify({'success': False, 'error': 'Upload not found'}), 404
+
+    offset = upload.size if upload.status != 'uploading' else ChunkedIngest(_chunks_dir(upload.id)).offset
+    return jsonify({
+        'success': True,
+        'offset': offset,
+        'size': upload.size,
+        'status': upload.status,
+        'job_id': upload.job_id,
+    })
+
+def _read_capped(stream, cap):
+    """Reads a request body of at most `cap` bytes; None if it is longer."""
+    data = bytearray()
+    while len(data) <= cap:
+        block = stream.read(cap + 1 - len(data))
+        if not block:
+            break
+        data += block
+    return None if len(data) > cap else bytes(data)
+
+@data_bp.route('/api/uploads/<upload_id>/chunks', methods=['PUT'])
+def upload_chunk(upload_id):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+
+    upload = _get_upload(upload_id)
+    if not upload:
+        return jsonify({'success': False, 'error': 'Upload not found'}), 404
+    if upload.status != 'uploading':
+        return jsonify({'success': False, 'error': 'Upload already finalized'}), 409
+
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify({'success': False, 'error': 'offset is required'}), 400
+    cap = current_app.config['UPLOAD_CHUNK_BYTES']
+    if request.content_length and request.content_length > cap:
+        return jsonify({'success': False, 'error': 'Chunk too large'}), 413
+
+    # Chunked transfer encoding has no Content-Length: the cap holds while reading
+    chunk = _read_capped(request.stream, cap)
+    if chunk is None:
+        return jsonify({'success': False, 'error': 'Chunk too large'}), 413
+
+    try:
+        new_offset = ChunkedIngest(_chunks_dir(upload.id)).append(
+            offset, chunk, request.headers.get('X-Chunk-SHA256')
+        )
+    except ChunkOffsetError as e:
+        # The client resumes from the offset the server has
+        return jsonify({'success': False, 'error': str(e), 'offset': e.expected}), 409
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    return jsonify({'success': True, 'offset': new_offset})
+
+@data_bp.route('/api/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_upload(upload_id):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+
+    upload = _get_upload(upload_id)
+    if not upload:
+        return jsonify({'success': False, 'error': 'Upload not found'}), 404
+    if upload.status != 'uploading':
+        job = IngestJob.query.get(upload.job_id)
+        return jsonify({'success': True, 'job': job_status(job) if job else None})
+
+    chunks_dir = _chunks_dir(upload.id)
+    offset = ChunkedIngest(chunks_dir).offset
+    if upload.size is not None and offset != upload.size:
+        return jsonify({'success': False, 'error': f'Upload incomplete: {offset} of {upload.size} bytes',
+                        'offset': offset}), 409
+
+    # Claim the upload first, so a repeated finalize cannot start a second job
+    claimed = ChunkedUpload.query.filter_by(id=upload.id, status='uploading').update(
+        {'status': 'finalized', 'size': offset}
+    )
+    db.session.commit()
+    if not claimed:
+        return jsonify({'success': False, 'error': 'Upload already finalized'}), 409
+
+    filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], upload.filename)
+    job = start_ingest_job(
+        current_app._get_current_object(), upload.user_id, upload.project_id,
+        upload.filename, filepath, chunks_dir=chunks_dir, size=offset
+    )
+    upload = _get_upload(upload_id)
+    upload.job_id = job.id
+    db.session.commit()
+    return jsonify({'success': True, 'job': job_status(job)}), 202
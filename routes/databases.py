@@ -87,4 +87,5 @@ def select_database():
         }
     
     session['db_schema'] = schema # For chat/upload routes
+    session['db_relationships'] = project.relationships or []
     return jsonify({'success': True, 'schema': schema, 'name': project.name})
\ No newline at end of file
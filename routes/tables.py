@@ -3,6 +3,10 @@ import os
 from flask import Blueprint, request, jsonify, session
 from extensions import db
 from models import Table, Project
+from engine.dataframe import DataFrame
+from engine.index import INDEX_KINDS, remove_indexes
+from engine.storage import remove_sidecar
+from services.state_manager import get_cache_stats, invalidate_table
 
 tables_bp = Blueprint('tables', __name__)
 
@@ -37,7 +41,10 @@ def rename_table(id):
         return jsonify({'success': False, 'error': 'A table with this name already exists'}), 409
     
     table.name = new_name
+    table.project.relationships = None  # They name the old table
     db.session.commit()
+    session['db_relationships'] = []
+    invalidate_table(table.id, table.filepath)
     
     return jsonify({'success': True, 'message': 'Table renamed'})
 
@@ -52,15 +59,85 @@ def delete_table(id):
         return jsonify({'success': False, 'error': 'Table not found'}), 404
 
     try:
-        # 1. Delete the physical file
+        # 1. Delete the physical file, its columnar sidecar and indexes.
+        # Other workers still mapping the sidecar keep a valid view until
+        # their cached table is dropped.
+        invalidate_table(table.id, table.filepath)
+        remove_indexes(table.filepath, table.indexes)
+        remove_sidecar(table.filepath)
         if os.path.exists(table.filepath):
             os.remove(table.filepath)
         
         # 2. Delete the DB record
+        table.project.relationships = None
         db.session.delete(table)
         db.session.commit()
+        session['db_relationships'] = []
         
         return jsonify({'success': True, 'message': 'Table deleted'})
     except Exception as e:
         db.session.rollback()
-        return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@tables_bp.route('/api/tables/<int:id>/indexes', methods=['POST'])
+def create_index(id):
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+
+    table = get_table_if_owner(id, user_id)
+    if not table:
+        return jsonify({'success': False, 'error': 'Table not found'}), 404
+
+    data = request.get_json()
+    column = data.get('column')
+    kind = data.get('kind', 'hash')
+    if column not in (table.columns_schema or {}):
+        return jsonify({'success': False, 'error': 'Unknown column'}), 400
+    if kind not in INDEX_KINDS:
+        return jsonify({'success': False, 'error': f"Index kind must be one of {', '.join(INDEX_KINDS)}"}), 400
+
+    try:
+        DataFrame(source=table.filepath).create_index(column, kind)
+
+        # Replace any index of the other kind on the same column
+        indexes = dict(table.indexes or {})
+        previous = indexes.get(column)
+        if previous and previous != kind:
+            remove_indexes(table.filepath, {column: previous})
+        indexes[column] = kind
+        table.indexes = indexes  # New dict so the JSON column is marked dirty
+        db.session.commit()
+        invalidate_table(table.id, table.filepath)
+
+        return jsonify({'success': True, 'indexes': indexes})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@tables_bp.route('/api/tables/<int:id>/indexes/<column>', methods=['DELETE'])
+def drop_index(id, column):
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+
+    table = get_table_if_owner(id, user_id)
+    if not table:
+        return jsonify({'success': False, 'error': 'Table not found'}), 404
+
+    indexes = dict(table.indexes or {})
+    if column not in indexes:
+        return jsonify({'success': False, 'error': 'Index not found'}), 404
+
+    remove_indexes(table.filepath, {column: indexes.pop(column)})
+    table.indexes = indexes
+    db.session.commit()
+    invalidate_table(table.id, table.filepath)
+    return jsonify({'success': True, 'indexes': indexes})
+
+
+@tables_bp.route('/api/tables/cache-stats', methods=['GET'])
+def table_cache_stats():
+    if not session.get('user_id'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    return jsonify({'success': True, 'cache': get_cache_stats()})
@@ -0,0 +1,35 @@
+# services/fake_llm.py
+import json
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """
+    Stand-in for the Gemini model, for running and testing the app
+    offline. `responses` maps a substring of the prompt (usually the
+    question) to the text to return; the first match wins. Without a
+    match `default` is returned. Every prompt is recorded in `calls`.
+    """
+
+    def __init__(self, responses=None, default='{"isCode": false, "content": "(fake model)"}'):
+        self.responses = dict(responses or {})
+        self.default = default
+        self.calls = []
+
+    def generate_content(self, prompt):
+        self.calls.append(prompt)
+        for needle, text in self.responses.items():
+            if needle in prompt:
+                return FakeResponse(text)
+        return FakeResponse(self.default)
+
+    @classmethod
+    def from_file(cls, path):
+        """Loads {"responses": {...}, "default": "..."} from a JSON file."""
+        with open(path, encoding='utf-8') as f:
+            spec = json.load(f)
+        return cls(spec.get('responses'), spec.get('default', cls().default))
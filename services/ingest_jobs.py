@@ -0,0 +1,222 @@
+# services/ingest_jobs.py
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from extensions import db
+from models import IngestJob, Project, Table
+from engine.compression import decompressing, table_name
+from engine.ingest import ChunkedIngest, ensure_sidecar, ingest_stream, ingest_upload
+from engine.storage import has_fresh_sidecar
+from services.logger import get_logger
+
+try:
+    from gevent import monkey as gevent_monkey
+except ImportError:  # Sync / gthread workers
+    gevent_monkey = None
+
+logger = get_logger(__name__)
+
+# Seconds between progress writes to the database
+PROGRESS_INTERVAL = 1.0
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Sidecars being built in the background by this process
+_sidecar_builds = set()
+_sidecar_builds_lock = threading.Lock()
+
+
+def spawn(app, func, *args):
+    """
+    Runs func(*args) on a real OS thread. Under gevent workers the
+    threading module is patched to run greenlets, and a parse on one would
+    hold the worker's event loop until it finished; gevent's own thread
+    pool uses real threads.
+    """
+    if gevent_monkey is not None and gevent_monkey.is_module_patched('threading'):
+        import gevent
+        gevent.get_hub().threadpool.spawn(func, *args)
+        return
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=app.config.get('INGEST_JOB_THREADS', 2), thread_name_prefix='ingest'
+                )
+    _executor.submit(func, *args)
+
+
+class _ProgressReporter:
+    """Ingest progress callback (bytes processed); saves the job's progress at most once per interval."""
+
+    def __init__(self, job):
+        self.job = job
+        self.last = 0.0
+
+    def __call__(self, bytes_done):
+        finished = self.job.bytes_total is not None and bytes_done >= self.job.bytes_total
+        now = time.monotonic()
+        if now - self.last < PROGRESS_INTERVAL and not finished:
+            return
+        self.last = now
+        self.job.bytes_done = bytes_done
+        if finished:
+            self.job.stage = 'indexing'  # Types, statistics and the sidecar
+        db.session.commit()
+
+
+def job_status(job):
+    """JSON view of a job."""
+    progress = None
+    if job.bytes_total:
+        progress = min(1.0, (job.bytes_done or 0) / job.bytes_total)
+    if job.status == 'done':
+        progress = 1.0
+    return {
+        'id': job.id,
+        'filename': job.filename,
+        'status': job.status,
+        'stage': job.stage,
+        'progress': progress,
+        'bytes_done': job.bytes_done,
+        'bytes_total': job.bytes_total,
+        'table_id': job.table_id,
+        'error': job.error,
+    }
+
+
+def _record_job(user_id, project_id, filename, filepath, size):
+    job = IngestJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        project_id=project_id,
+        filename=filename,
+        filepath=filepath,
+        status='queued',
+        bytes_done=0,
+        bytes_total=size,
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def start_ingest_job(app, user_id, project_id, filename, filepath, chunks_dir=None, size=None):
+    """
+    Records an ingest job for a saved upload (or, with `chunks_dir`, a
+    finalized chunked upload) and starts it in the background. Returns
+    the job; its status is kept in the database, so any worker process
+    can report it.
+    """
+    job = _record_job(user_id, project_id, filename, filepath,
+                      size if chunks_dir else os.path.getsize(filepath))
+    spawn(app, _run_job, app, job.id, chunks_dir)
+    return job
+
+
+def ingest_upload_job(user_id, project_id, filename, filepath, stream, size=None):
+    """
+    Records an ingest job for an upload whose bytes are still arriving
+    and runs it in this request: `stream` (the request body, or an
+    uploaded file's stream) is saved to `filepath` and parsed in the same
+    pass (engine.ingest.ingest_upload), so it cannot outlive the request.
+    `size` is the upload's length if known. Returns the finished or
+    failed job.
+    """
+    job = _record_job(user_id, project_id, filename, filepath, size)
+    _ingest(job.id, stream=stream)
+    return IngestJob.query.get(job.id)
+
+
+def _run_job(app, job_id, chunks_dir=None):
+    with app.app_context():
+        try:
+            _ingest(job_id, chunks_dir)
+        finally:
+            db.session.remove()
+
+
+def _ingest(job_id, chunks_dir=None, stream=None):
+    """Runs an ingest job and records its table, or its failure."""
+    try:
+        job = IngestJob.query.get(job_id)
+        job.status = 'running'
+        job.stage = 'parsing' if chunks_dir is None else 'indexing'
+        db.session.commit()
+
+        if chunks_dir is not None:
+            # The chunks were parsed as they arrived; only join them
+            df, stats = ChunkedIngest(chunks_dir).finish(job.filepath, progress=_ProgressReporter(job))
+        elif stream is not None:
+            # Saved and parsed in one pass; progress follows the bytes received
+            df, stats = ingest_upload(stream, job.filepath, progress=_ProgressReporter(job))
+        else:
+            # The saved file is streamed into typed columns, statistics
+            # and the sidecar. Progress follows the bytes on disk, compressed or not.
+            reporter = _ProgressReporter(job)
+            with open(job.filepath, 'rb') as raw:
+                df, stats = ingest_stream(decompressing(raw), job.filepath,
+                                          progress=lambda _: reporter(raw.tell()))
+
+        table = Table(
+            name=table_name(job.filename),
+            filename=job.filename,
+            filepath=job.filepath,
+            columns_schema=df.get_column_types(),
+            column_stats=stats,
+            row_count=stats['row_count'],
+            project_id=job.project_id
+        )
+        db.session.add(table)
+        # New tables may add foreign keys; they are found again on request
+        Project.query.get(job.project_id).relationships = None
+        db.session.flush()
+
+        job.table_id = table.id
+        job.status = 'done'
+        job.stage = None
+        job.bytes_done = job.bytes_total
+        db.session.commit()
+        logger.info(f"Ingested {job.filename}: {stats['row_count']} rows")
+    except Exception as e:
+        logger.error(f"Ingest job {job_id} failed: {e}")
+        db.session.rollback()
+        job = IngestJob.query.get(job_id)
+        if job is not None:
+            job.status = 'failed'
+            job.stage = None
+            job.error = str(e)
+            db.session.commit()
+
+
+def queue_sidecar_build(app, filepath, workers=None):
+    """
+    Builds the missing (or stale) sidecar of a table's CSV on the ingest
+    job threads, so the request that found it missing is not held up;
+    it serves the CSV meanwhile. Once per file in this process, and once
+    across workers (engine.ingest.ensure_sidecar). Returns True while a
+    build is under way.
+    """
+    if has_fresh_sidecar(filepath):
+        return False
+    with _sidecar_builds_lock:
+        if filepath in _sidecar_builds:
+            return True
+        _sidecar_builds.add(filepath)
+    spawn(app, _build_sidecar, filepath, workers)
+    return True
+
+
+def _build_sidecar(filepath, workers):
+    try:
+        ensure_sidecar(filepath, workers)
+    except Exception as e:
+        logger.error(f"Building the columnar sidecar of {filepath} failed: {e}")
+    finally:
+        with _sidecar_builds_lock:
+            _sidecar_builds.discard(filepath)
@@ -1,6 +1,7 @@
 # services/llm_service.py
 import google.generativeai as genai
 from config import Config
+from services.fake_llm import FakeModel
 
 model = None
 
@@ -129,8 +130,14 @@ Example of correct output:
 def configure_llm():
     global model
     try:
-        if Config.GEMINI_API_KEY:
-            genai.configure(api_key=Config.GEMINI_API_KEY)
+        if Config.LLM_FAKE_RESPONSES:
+            # Offline mode: canned responses instead of the Gemini API
+            model = FakeModel.from_file(Config.LLM_FAKE_RESPONSES)
+            print("⚠️ Using the fake LLM with canned responses")
+        elif Config.GEMINI_API_KEY:
+            # REST transport: plain sockets that gevent workers can
+            # cooperatively schedule (gRPC blocks the whole worker)
+            genai.configure(api_key=Config.GEMINI_API_KEY, transport='rest')
             model = genai.GenerativeModel(
                 'gemini-2.5-flash',
                 system_instruction=SYSTEM_PROMPT
@@ -143,3 +150,8 @@ def configure_llm():
 
 def get_model():
     return model
+
+def set_model(new_model):
+    """Replaces the model, e.g. with a FakeModel in tests."""
+    global model
+    model = new_model
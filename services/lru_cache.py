@@ -0,0 +1,82 @@
+# services/lru_cache.py
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with a byte budget.
+
+    Each entry is a value stored with its size in bytes. When the total
+    size passes `max_bytes` the least recently used entries are evicted.
+    A caller-supplied `validate` check on get() drops stale entries
+    (e.g. a table whose file changed since it was loaded).
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, validate=None):
+        """Returns the cached value, or None on a miss or a stale entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and validate is not None and not validate(entry[0]):
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes):
+        """Caches `value`; anything larger than the whole budget is not kept."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, nbytes)
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_where(self, match):
+        """Drops every entry whose value satisfies `match(value)`."""
+        with self._lock:
+            for key in [k for k, (value, _) in self._entries.items() if match(value)]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _remove(self, key):
+        _, nbytes = self._entries.pop(key)
+        self.bytes -= nbytes
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
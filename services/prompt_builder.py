@@ -0,0 +1,283 @@
+# services/prompt_builder.py
+"""
+Token-budgeted chat prompts.
+
+The instruction block is the same for every question; what grows with
+the project is the schema. For wide projects only the tables and columns
+relevant to the question are sent:
+
+  - A keyword index over the schema (words of table and column names,
+    with snake_case / camelCase split and plurals folded) is built once
+    per schema version.
+  - Tables are ranked by question words matching their name (strongly)
+    or their columns; tables related to a match follow, so joins stay
+    possible. Within a table, matching and relationship key columns come
+    first.
+  - Tables are added best-first while the estimated prompt size stays
+    within the token budget; a table that does not fit whole is cut to
+    its best columns. A schema that fits entirely is sent unchanged.
+"""
+import hashlib
+import json
+import re
+import threading
+
+from services.lru_cache import LRUCache
+
+PROMPT_TEMPLATE = """
+    You are a data analysis bot. You have access to a custom Python DataFrame library.
+
+    --- DATABASE SCHEMA ---
+    {schema}
+
+    --- AVAILABLE PYTHON OBJECTS ---
+    {definitions}
+
+    --- RELATIONSHIPS ---
+    {relationships}
+    
+    --- METHODS & PROPERTIES ---
+    - len(df) -> int
+    - .where(col, op, value) -> DataFrame
+        - `op` is one of '==', '!=', '<', '<=', '>', '>=', 'in' (value is a list for 'in').
+        - PREFER .where() over .filter() for simple column comparisons; it uses indexes.
+        - `value` must match the column type from the schema (e.g. 30, not '30', for int columns).
+    - .filter(lambda row: condition) -> DataFrame
+    - .project(list_of_cols) -> list[dict]
+    - .join(other_df, left_col, right_col) -> DataFrame
+    - .groupby(col_name) -> dict
+    - .aggregate(groups, {{col: func}}) -> dict
+        - Supported funcs: 'count', 'sum', 'avg', 'min', 'max'
+    - .order_by(col_or_cols, ascending=True, limit=None) -> DataFrame
+        - Sorts rows; pass `limit` for "top N" style questions.
+    - .describe() -> dict of per-column statistics (count, nulls, min, max, mean, distinct)
+    - .columns -> list[str] (This is a property, NOT a function)
+    - build_chart_url(title, type, data) -> str
+        - `data` MUST be the RAW dictionary returned by .aggregate().
+    
+    --- CRITICAL RULES ---
+    1.  **OUTPUT FORMAT:** Return JSON: {{ "isCode": boolean, "content": string }}.
+    2.  **TABLE OUTPUT:** To show a table, you MUST use `.project()`. To show ALL columns, use `df.columns` (e.g., `customers.project(customers.columns)[:10]`). You MUST slice the result (e.g., `[:10]`).
+    3.  **CHARTING:** When using `build_chart_url`, pass the result of `.aggregate()` DIRECTLY as the 3rd argument.
+    4.  **DATA TYPES:** Values already have the column's type from the schema. Compare them with literals of that type and do NOT cast them with `int()` or `float()` (e.g., `students.where('age', '>', 30)`, or `row['age'] > 30` in a filter).
+    5.  **TABLE NAMES:** Use exact variable names.
+    6.  **FORBIDDEN:** Do NOT use `list()` or `.keys()`. Use `.columns`.
+    
+    --- EXAMPLES ---
+    User: "Hello"
+    Response: {{ "isCode": false, "content": "Hello! I am ready to analyze your data." }}
+
+    User: "How many students?" 
+    Response: {{ "isCode": true, "content": "len(students)" }}
+    
+    User: "show me the first 10 customers"
+    Response: {{ "isCode": true, "content": "customers.project(customers.columns)[:10]" }}
+
+    User: "Show me 3 orders"
+    Response: {{ "isCode": true, "content": "orders.project(orders.columns)[:3]" }}
+
+    User: "Orders of customer 5"
+    Response: {{ "isCode": true, "content": "orders.where('customer_id', '==', 5).project(orders.columns)[:10]" }}
+
+    User: "Sort orders by date, newest first"
+    Response: {{ "isCode": true, "content": "orders.order_by('order_date', False, 10).project(orders.columns)[:10]" }}
+
+    User: "Plot a bar chart of sales by country"
+    Response: {{ "isCode": true, "content": "build_chart_url('Sales by Country', 'bar', customers.join(orders, 'customer_id', 'customer_id').aggregate(customers.join(orders, 'customer_id', 'customer_id').groupby('country'), {{'total_amount': 'sum'}}))" }}
+
+    NOW, generate the JSON for: "{question}"
+    """
+
+# Weights of a question word matching a table name or a column name, and
+# of a table related to a matched one
+_TABLE_MATCH = 3
+_COLUMN_MATCH = 1
+_RELATED = 1
+
+# Memory budget of the per-schema builder cache
+_BUILDER_CACHE_BYTES = 16 * 1024 * 1024
+
+_builders = None
+_builders_lock = threading.Lock()
+
+
+def estimate_tokens(text):
+    """Rough token count: about four characters per token for schema text and English."""
+    return (len(text) + 3) // 4
+
+
+def _fold(word):
+    """Folds simple English plurals, so 'customers' matches 'customer_id'."""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def name_words(name):
+    """Words of an identifier or a question: 'orderDate_2' -> {'order', 'date', '2'}."""
+    name = re.sub(r'([a-z0-9])([A-Z])', r'\1 \2', str(name))
+    return {_fold(word) for word in re.findall(r'[a-z0-9]+', name.lower())}
+
+
+def _relationship_line(r):
+    return f"{r['from_table']}.{r['from_column']} -> {r['to_table']}.{r['to_column']}"
+
+
+def _table_line(table, types):
+    return f"{table}: " + ", ".join(f"{col} {kind}" for col, kind in types.items())
+
+
+def _definition_line(table):
+    return f"{table} = get_dataframe('{table}')"
+
+
+class PromptBuilder:
+    """
+    Prompt builder for one schema version: `schema_types` maps table ->
+    {column: type}, `relationships` is the list of known foreign keys.
+    """
+
+    def __init__(self, schema_types, relationships=None):
+        self.types = schema_types
+        self.relationships = list(relationships or [])
+        self.order = {table: i for i, table in enumerate(schema_types)}
+
+        # word -> [(table, column or None)]
+        self.keywords = {}
+        for table, types in schema_types.items():
+            for word in name_words(table):
+                self.keywords.setdefault(word, []).append((table, None))
+            for col in types:
+                for word in name_words(col):
+                    self.keywords.setdefault(word, []).append((table, col))
+
+        self.related = {table: set() for table in schema_types}
+        self.key_columns = {table: set() for table in schema_types}
+        for r in self.relationships:
+            if r['from_table'] in self.related and r['to_table'] in self.related:
+                self.related[r['from_table']].add(r['to_table'])
+                self.related[r['to_table']].add(r['from_table'])
+                self.key_columns[r['from_table']].add(r['from_column'])
+                self.key_columns[r['to_table']].add(r['to_column'])
+
+        # Static parts, measured once
+        self.static_tokens = estimate_tokens(
+            PROMPT_TEMPLATE.format(schema='', definitions='', relationships='', question='')
+        )
+        self.table_tokens = {
+            table: estimate_tokens(_table_line(table, types)) + estimate_tokens(_definition_line(table))
+            for table, types in schema_types.items()
+        }
+        self.column_tokens = {
+            table: {col: estimate_tokens(f"{col} {kind}, ") for col, kind in types.items()}
+            for table, types in schema_types.items()
+        }
+        self.relationship_tokens = [estimate_tokens(_relationship_line(r)) for r in self.relationships]
+        self.full_tokens = (self.static_tokens + sum(self.table_tokens.values())
+                            + sum(self.relationship_tokens))
+
+    def rank(self, question):
+        """Returns ({table: score}, {(table, column): score}) for a question."""
+        table_scores = dict.fromkeys(self.types, 0)
+        column_scores = {}
+        for word in name_words(question):
+            for table, col in self.keywords.get(word, ()):
+                if col is None:
+                    table_scores[table] += _TABLE_MATCH
+                else:
+                    table_scores[table] += _COLUMN_MATCH
+                    column_scores[(table, col)] = column_scores.get((table, col), 0) + 1
+        matched = [table for table, score in table_scores.items() if score]
+        for table in matched:
+            for other in self.related[table]:
+                table_scores[other] += _RELATED
+        return table_scores, column_scores
+
+    def _columns_by_relevance(self, table, column_scores):
+        key_columns = self.key_columns[table]
+        return sorted(
+            self.types[table],
+            key=lambda col: (-column_scores.get((table, col), 0), col not in key_columns)
+        )
+
+    def select(self, question, budget):
+        """
+        The schema subset to send: ({table: {column: type}}, relationships),
+        in the schema's own table and column order.
+        """
+        if budget is None or self.full_tokens + estimate_tokens(question) <= budget:
+            return self.types, self.relationships
+
+        available = budget - self.static_tokens - estimate_tokens(question)
+        table_scores, column_scores = self.rank(question)
+        ranked = sorted(self.types, key=lambda t: (-table_scores[t], self.order[t]))
+
+        chosen = {}
+        for table in ranked:
+            cost = self.table_tokens[table]
+            if cost <= available:
+                chosen[table] = list(self.types[table])
+                available -= cost
+                continue
+            if chosen and not table_scores[table]:
+                continue  # Irrelevant tables are only sent whole
+            # Cut the table down to its best columns
+            available -= estimate_tokens(_definition_line(table)) + estimate_tokens(f"{table}: ")
+            columns = []
+            for col in self._columns_by_relevance(table, column_scores):
+                if self.column_tokens[table][col] > available and columns:
+                    break
+                columns.append(col)
+                available -= self.column_tokens[table][col]
+            chosen[table] = columns
+            if available <= 0:
+                break
+
+        relationships = []
+        for r, cost in zip(self.relationships, self.relationship_tokens):
+            if (r['from_column'] in chosen.get(r['from_table'], ())
+                    and r['to_column'] in chosen.get(r['to_table'], ())
+                    and cost <= available):
+                relationships.append(r)
+                available -= cost
+
+        subset = {
+            table: {col: kind for col, kind in self.types[table].items() if col in chosen[table]}
+            for table in self.types if table in chosen
+        }
+        return subset, relationships
+
+    def build(self, question, budget=None):
+        """Returns (prompt_schema, relationships, prompt) for a question."""
+        schema, relationships = self.select(question, budget)
+        prompt = PROMPT_TEMPLATE.format(
+            schema="\n    ".join(_table_line(table, types) for table, types in schema.items()),
+            definitions="\n    ".join(_definition_line(table) for table in schema),
+            relationships="\n    ".join(_relationship_line(r) for r in relationships)
+            or "No known relationships.",
+            question=question,
+        )
+        return schema, relationships, prompt
+
+
+def get_prompt_builder(schema_types, relationships=None):
+    """
+    The builder of a schema version, from a process-wide cache keyed by
+    the schema and relationships, so the keyword index and static parts
+    are built once per version.
+    """
+    global _builders
+    if _builders is None:
+        with _builders_lock:
+            if _builders is None:
+                _builders = LRUCache(_BUILDER_CACHE_BYTES)
+    fingerprint = json.dumps([schema_types, relationships or []], sort_keys=True, default=str)
+    key = hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+    builder = _builders.get(key)
+    if builder is None:
+        builder = PromptBuilder(schema_types, relationships)
+        # The index and measurements take a few times the schema text
+        _builders.put(key, builder, 4 * len(fingerprint))
+    return builder
@@ -0,0 +1,146 @@
+# services/relationship_detector.py
+"""
+Foreign-key discovery from the value sketches stored at ingest.
+
+A column A references a key column B (an inclusion dependency) when
+(nearly) every distinct value of A also occurs in B. With bottom-k
+sketches (engine/stats.value_sketch) this is checked without touching
+the data: every hash in A's sketch that is not above the largest hash in
+B's sketch must also be in B's sketch if A's value occurs in B, so the
+share of those hashes found in B estimates the containment.
+
+Candidates must point at a near-unique column of another table. Values
+alone cannot tell apart keys with overlapping ranges (small integer ids
+are contained in every id column), so ties are broken by how well the
+column names match; whatever is still tied is reported as ambiguous for
+an optional LLM tiebreak.
+"""
+from services.prompt_builder import name_words
+
+# Share of A's sampled distinct values that must occur in B
+MIN_CONTAINMENT = 0.9
+# Hashes of A that must be comparable for an estimate
+MIN_SUPPORT = 8
+# A key column has (nearly) as many distinct values as values
+UNIQUE_RATIO = 0.98
+# Columns with fewer distinct values need a name match too (flags, ratings)
+LOW_CARDINALITY = 10
+# Containments closer than this count as a tie
+TIE_MARGIN = 0.02
+
+# Words that say a column is a key but not which one
+_GENERIC_WORDS = {'id', 'key', 'code', 'no', 'number', 'num', 'ref', 'fk', 'pk'}
+
+
+def containment(sketch, key_sketch):
+    """
+    Estimated share of the distinct values behind `sketch` that occur in
+    the column behind `key_sketch`, or None with too few comparable hashes.
+    """
+    if not sketch or not key_sketch:
+        return None
+    threshold = key_sketch[-1]
+    comparable = [h for h in sketch if h <= threshold]
+    if len(comparable) < min(MIN_SUPPORT, len(sketch)):
+        return None
+    keys = set(key_sketch)
+    return sum(h in keys for h in comparable) / len(comparable)
+
+
+def is_key(col_stats):
+    """True if a column's values are (nearly) unique."""
+    count = col_stats.get('count')
+    distinct = col_stats.get('distinct')
+    return bool(count) and distinct is not None and distinct >= UNIQUE_RATIO * count
+
+
+def name_score(from_column, to_table, to_column):
+    """How well a referencing column's name points at a table's key column."""
+    from_words = name_words(from_column) - _GENERIC_WORDS
+    to_words = (name_words(to_table) | name_words(to_column)) - _GENERIC_WORDS
+    return len(from_words & to_words) + (from_column == to_column)
+
+
+def _candidates(tables):
+    """Every (from table, from column) -> list of candidate key references."""
+    keys = [
+        (table, col, col_stats)
+        for table, columns in tables.items()
+        for col, col_stats in columns.items()
+        if col_stats.get('sketch') and is_key(col_stats)
+    ]
+    found = {}
+    for from_table, columns in tables.items():
+        for from_col, from_stats in columns.items():
+            sketch = from_stats.get('sketch')
+            if not sketch:
+                continue
+            from_distinct = from_stats.get('distinct') or len(sketch)
+            for to_table, to_col, to_stats in keys:
+                if to_table == from_table:
+                    continue
+                if from_distinct > (to_stats.get('distinct') or 0) * (1 + TIE_MARGIN):
+                    continue  # More distinct values than the key has
+                share = containment(sketch, to_stats['sketch'])
+                if share is None or share < MIN_CONTAINMENT:
+                    continue
+                names = name_score(from_col, to_table, to_col)
+                if not names and (from_distinct < LOW_CARDINALITY or is_key(from_stats)):
+                    # Tiny value sets, and one key inside another (ids
+                    # 1..n in two tables), need the names to agree
+                    continue
+                found.setdefault((from_table, from_col), []).append({
+                    'from_table': from_table,
+                    'from_column': from_col,
+                    'to_table': to_table,
+                    'to_column': to_col,
+                    'containment': round(share, 3),
+                    'name_score': names,
+                    'to_distinct': to_stats.get('distinct'),
+                })
+    return found
+
+
+def _rank(candidate):
+    # Better names, then higher containment, then the tightest key
+    return (-candidate['name_score'], -candidate['containment'], candidate['to_distinct'] or 0)
+
+
+def _public(candidate):
+    return {key: candidate[key] for key in ('from_table', 'from_column', 'to_table', 'to_column', 'containment')}
+
+
+def detect_relationships(tables):
+    """
+    Finds foreign keys between tables from their column statistics.
+    `tables` maps table name -> {column: stats} (the 'columns' part of
+    engine/stats.compute_stats). Returns (relationships, ambiguous):
+    the best reference of every referencing column, and for the columns
+    whose best references tie, all tied candidates.
+    """
+    relationships = []
+    ambiguous = {}
+    for key, candidates in sorted(_candidates(tables).items()):
+        candidates.sort(key=_rank)
+        best = candidates[0]
+        tied = [
+            c for c in candidates
+            if c['name_score'] == best['name_score']
+            and best['containment'] - c['containment'] <= TIE_MARGIN
+        ]
+        relationships.append(_public(best))
+        if len(tied) > 1:
+            ambiguous[key] = [_public(c) for c in tied]
+    return relationships, ambiguous
+
+
+def resolve_ambiguous(relationships, choices):
+    """
+    Replaces the reference of each column in `choices` ((from table,
+    from column) -> chosen candidate) in a relationship list.
+    """
+    resolved = []
+    for r in relationships:
+        choice = choices.get((r['from_table'], r['from_column']))
+        resolved.append(choice or r)
+    return resolved
@@ -0,0 +1,60 @@
+# services/result_cache.py
+import ast
+import json
+
+from services.lru_cache import LRUCache
+
+
+def normalize_expression(code):
+    """
+    Canonical form of a generated expression: its AST dump, so spacing,
+    quote style and redundant parentheses do not change the key.
+    Raises SyntaxError for code that does not parse.
+    """
+    return ast.dump(ast.parse(code.strip(), mode='eval'))
+
+
+def referenced_tables(code, table_names):
+    """Names from `table_names` that the expression refers to."""
+    tree = ast.parse(code.strip(), mode='eval')
+    names = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+    return sorted(names & set(table_names))
+
+
+class ResultCache:
+    """
+    LRU cache of chat query results, keyed by the normalized expression,
+    the project and the version of every table the expression reads.
+    A re-uploaded table has a new version, so stale results are never
+    returned; invalidate_table() also drops them right away on a rename
+    or delete. Other workers miss them too: invalidation touches the
+    table's change stamp, which is part of its version.
+    """
+
+    def __init__(self, max_bytes):
+        self._lru = LRUCache(max_bytes)
+
+    @staticmethod
+    def key(code, project_id, table_versions):
+        """`table_versions` maps each referenced table name to its version."""
+        return (project_id, normalize_expression(code), tuple(sorted(table_versions.items())))
+
+    @staticmethod
+    def table_versions(key):
+        """{table name: version} of the tables a key's expression reads."""
+        return dict(key[2])
+
+    def get(self, key):
+        entry = self._lru.get(key)
+        return entry['payload'] if entry is not None else None
+
+    def put(self, key, payload, filepaths):
+        """Caches a JSON response payload computed from the tables at `filepaths`."""
+        nbytes = len(json.dumps(payload, default=str))
+        self._lru.put(key, {'payload': payload, 'filepaths': set(filepaths)}, nbytes)
+
+    def invalidate_table(self, filepath):
+        self._lru.invalidate_where(lambda entry: filepath in entry['filepaths'])
+
+    def stats(self):
+        return self._lru.stats()
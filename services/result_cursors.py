@@ -0,0 +1,218 @@
+# services/result_cursors.py
+"""
+Server-side cursors over large chat results.
+
+A table result with more rows than one page is written to disk in
+pages, under a random cursor ID, and only its first page goes into the
+response; the client fetches the others from /api/results/<id>. The
+files are shared by all worker processes, and cursors expire after a
+TTL. Writing reads the result rows one at a time, and a page request
+reads only the pages it covers, so no request holds the whole result.
+Only the first page is written before the response; the rest of the
+result is read and written in the background while the client reads.
+
+Pages use a columnar JSON layout: the column names once, then one list
+of values per row. They are stored as gzip'd JSON, never pickled, in a
+directory of their own outside the upload folder (RESULT_CURSOR_FOLDER).
+"""
+import gzip
+import json
+import os
+import shutil
+import time
+import uuid
+from itertools import islice
+
+from engine.rows import LazyRows
+from services.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Responses smaller than this are not worth compressing
+MIN_GZIP_BYTES = 1024
+
+
+def column_names(rows):
+    """The columns of a list of row dicts, in first-seen order."""
+    names = {}
+    for row in rows:
+        for col in row:
+            names.setdefault(col, None)
+    return list(names)
+
+
+def row_values(rows, columns):
+    """Row dicts -> lists of values in `columns` order."""
+    return [[row.get(col) for col in columns] for row in rows]
+
+
+def iter_result(rows):
+    """Iterates a result's rows without keeping them all in memory where possible."""
+    if isinstance(rows, LazyRows):
+        return rows.stream()
+    return iter(rows)
+
+
+def _accepts_gzip(accept_encoding):
+    """True if an Accept-Encoding header allows gzip (a q=0 entry refuses it)."""
+    for part in (accept_encoding or '').lower().split(','):
+        coding, _, params = part.partition(';')
+        if coding.strip() not in ('gzip', '*'):
+            continue
+        quality = params.strip()
+        try:
+            return not quality.startswith('q=') or float(quality[2:]) > 0
+        except ValueError:
+            return False
+    return False
+
+
+def gzip_body(body, accept_encoding):
+    """
+    (body, content encoding) for a response: gzip-compressed if the
+    client accepts gzip and the body is large enough, else unchanged
+    with encoding None. `accept_encoding` is the request's
+    Accept-Encoding header.
+    """
+    if not _accepts_gzip(accept_encoding) or len(body) < MIN_GZIP_BYTES:
+        return body, None
+    return gzip.compress(body, compresslevel=6), 'gzip'
+
+
+class ResultCursors:
+    """
+    Cursor files under `directory`: one subdirectory per cursor holding
+    page-N.json.gz files of `page_rows` rows each and meta.json. The
+    metadata is replaced after every page, and `rows_written` only counts
+    pages already on disk, so a cursor can be read while it is filled.
+    `row_count` stays None until the last page is written.
+    """
+
+    def __init__(self, directory, ttl, page_rows):
+        self.directory = directory
+        self.ttl = ttl
+        self.page_rows = page_rows
+
+    def _path(self, cursor_id, name=''):
+        return os.path.join(self.directory, cursor_id, name)
+
+    def _write_meta(self, cursor_id, meta):
+        tmp = self._path(cursor_id, 'meta.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, default=str)
+        os.replace(tmp, self._path(cursor_id, 'meta.json'))
+
+    def _write_page(self, cursor_id, meta, rows):
+        """Writes the next page from `rows`; returns False once they run out."""
+        pages = meta['rows_written'] // self.page_rows
+        page = row_values(islice(rows, self.page_rows), meta['columns'])
+        if page or not pages:
+            with gzip.open(self._path(cursor_id, f'page-{pages}.json.gz'), 'wt', encoding='utf-8') as f:
+                json.dump(page, f, default=str)
+            meta['rows_written'] += len(page)
+        more = len(page) == self.page_rows
+        if not more:
+            meta['row_count'] = meta['rows_written']
+        self._write_meta(cursor_id, meta)
+        return more
+
+    def _fill(self, cursor_id, meta, rows):
+        """Writes the remaining pages of a cursor."""
+        try:
+            while self._write_page(cursor_id, meta, rows):
+                pass
+        except Exception as e:
+            # The query failed part way, or the cursor was purged: what
+            # was written stays readable, and the error is reported
+            logger.error(f"Result cursor {cursor_id} stopped after {meta['rows_written']} rows: {e}")
+            meta['row_count'] = meta['rows_written']
+            meta['error'] = str(e)
+            try:
+                self._write_meta(cursor_id, meta)
+            except OSError:
+                pass
+
+    def create(self, owner, columns, rows, spawn=None):
+        """
+        Writes `rows` (row dicts) as a cursor owned by `owner` (a user ID).
+        Returns (cursor ID, row count). With `spawn` (called as
+        spawn(func, *args)) only the first page is written here and the
+        rest in the background: the row count is then None.
+        """
+        self.purge()
+        cursor_id = uuid.uuid4().hex
+        os.makedirs(self._path(cursor_id), mode=0o700)
+        rows = iter(rows)
+        meta = {'owner': owner, 'columns': columns, 'row_count': None,
+                'rows_written': 0, 'created_at': time.time()}
+        if self._write_page(cursor_id, meta, rows):
+            if spawn is not None:
+                spawn(self._fill, cursor_id, meta, rows)
+                return cursor_id, None
+            self._fill(cursor_id, meta, rows)
+        return cursor_id, meta['row_count']
+
+    def _meta(self, cursor_id, owner):
+        """The cursor's metadata, or None if it is unknown, expired or not the owner's."""
+        if not cursor_id.isalnum():
+            return None
+        try:
+            with open(self._path(cursor_id, 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta['owner'] != owner or time.time() - meta['created_at'] > self.ttl:
+            return None
+        return meta
+
+    def page(self, cursor_id, owner, offset=0, limit=None):
+        """
+        Rows offset..offset+limit of a cursor (limit defaults to one
+        page) as {'columns', 'data', 'offset', 'row_count',
+        'next_offset'}; next_offset is None after the last row. While
+        the cursor is still being filled row_count is None, and rows not
+        written yet are left out: next_offset then points at the first
+        missing row, to be asked for again. A cursor whose query failed
+        part way also carries 'error'. Returns None if the cursor does
+        not exist for `owner`.
+        """
+        meta = self._meta(cursor_id, owner)
+        if meta is None:
+            return None
+        offset = max(0, offset)
+        limit = self.page_rows if limit is None else max(0, min(limit, self.page_rows))
+        end = min(offset + limit, meta['rows_written'])
+
+        data = []
+        for number in range(offset // self.page_rows, (end - 1) // self.page_rows + 1 if end > offset else 0):
+            with gzip.open(self._path(cursor_id, f'page-{number}.json.gz'), 'rt', encoding='utf-8') as f:
+                rows = json.load(f)
+            first = number * self.page_rows
+            data.extend(rows[max(offset - first, 0):end - first])
+        complete = meta['row_count'] is not None
+        page = {
+            'columns': meta['columns'],
+            'data': data,
+            'offset': offset,
+            'row_count': meta['row_count'],
+            'next_offset': None if complete and end >= meta['row_count'] else max(end, offset),
+        }
+        if meta.get('error'):
+            page['error'] = meta['error']
+        return page
+
+    def purge(self):
+        """Deletes expired cursors."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        cutoff = time.time() - self.ttl
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                expired = os.path.getmtime(path) < cutoff
+            except OSError:
+                continue
+            if expired:
+                shutil.rmtree(path, ignore_errors=True)
@@ -16,7 +16,7 @@ class AstValidator(ast.NodeVisitor):
         self.allowed_attributes = {
             'filter', 'project', 'join', 'groupby', 'aggregate',
             'get_header', 'columns', 'items',
-            'max_by', 'min_by', 'top_k_by'
+            'max_by', 'min_by', 'top_k_by', 'order_by', 'describe', 'where'
         }
 
         self.allowed_functions = {
@@ -0,0 +1,24 @@
+# services/sse.py
+import json
+
+# Response headers of an event stream; X-Accel-Buffering stops nginx from
+# holding events back until the response ends.
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+def sse_event(event, data):
+    """One Server-Sent Event with a JSON payload."""
+    payload = json.dumps(data, default=str)
+    # A data line must not contain a newline; json.dumps never emits one
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def sse_comment(text):
+    """A comment line, ignored by EventSource; keeps idle connections open."""
+    return f": {text}\n\n"
+
+
+def row_batches(rows, size):
+    """Splits a result's rows into lists of at most `size` rows."""
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
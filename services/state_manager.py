@@ -1,34 +1,186 @@
 # services/state_manager.py
-from flask import session
+import os
+import threading
+from collections import namedtuple
+from flask import session, current_app
 from engine.dataframe import DataFrame
+from engine.storage import sidecar_path, stamp_path, touch_stamp
 from models import Table
+from services.lru_cache import LRUCache
+from services.result_cache import ResultCache
+from services.result_cursors import ResultCursors
+from services.ingest_jobs import queue_sidecar_build
+
+# Size charged for a DataFrame whose data is not private to this
+# process: a mapped sidecar (shared page cache across workers) or a CSV
+# read on demand. Only the header, types and metadata are held.
+_SHARED_FRAME_BYTES = 64 * 1024
+
+_cache = None
+_result_cache = None
+_result_cursors = None
+_cache_lock = threading.Lock()
+
+
+class CachedTable:
+    """A loaded DataFrame plus what is needed to tell if it is still current."""
+
+    __slots__ = ('df', 'filepath', 'version', 'project_id', 'user_id')
+
+    def __init__(self, df, filepath, version, project_id, user_id):
+        self.df = df
+        self.filepath = filepath
+        self.version = version
+        self.project_id = project_id
+        self.user_id = user_id
+
+
+def get_table_cache():
+    """The process-wide table cache, sized by TABLE_CACHE_BYTES."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LRUCache(current_app.config['TABLE_CACHE_BYTES'])
+    return _cache
+
+
+def get_result_cache():
+    """The process-wide chat result cache, sized by RESULT_CACHE_BYTES."""
+    global _result_cache
+    if _result_cache is None:
+        with _cache_lock:
+            if _result_cache is None:
+                _result_cache = ResultCache(current_app.config['RESULT_CACHE_BYTES'])
+    return _result_cache
+
+
+def get_result_cursors():
+    """The result cursor store, shared by all workers through RESULT_CURSOR_FOLDER."""
+    global _result_cursors
+    if _result_cursors is None:
+        _result_cursors = ResultCursors(
+            current_app.config['RESULT_CURSOR_FOLDER'],
+            current_app.config['RESULT_CURSOR_TTL'],
+            current_app.config['RESULT_PAGE_ROWS'],
+        )
+    return _result_cursors
+
+
+# Version of a file-backed table: its path and _file_version()
+TableVersion = namedtuple('TableVersion', ['filepath', 'mtimes'])
+
+
+def table_version(df):
+    """The TableVersion of a file-backed DataFrame."""
+    return TableVersion(df.filepath, _file_version(df.filepath))
+
+
+def _file_version(filepath):
+    """
+    Modification times of the CSV, its sidecar and its change stamp
+    (None if missing). invalidate_table() touches the stamp, so the
+    version changes in every worker.
+    """
+    version = []
+    for path in (filepath, sidecar_path(filepath), stamp_path(filepath)):
+        try:
+            version.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
+
+def _frame_bytes(df):
+    if df.store is not None and df.store.mapping is None:
+        return df.store.nbytes
+    return _SHARED_FRAME_BYTES
+
 
 def get_dataframe(table_name):
     """
     Factory function to get a DataFrame object.
-    Fetches metadata from PostgreSQL based on the active project.
+    Loaded tables are kept in a process-wide LRU cache keyed by table ID.
+    Every hit is checked against the table's version (its record ID and
+    the modification times of its files, including the change stamp
+    that invalidate_table() touches in any worker). The table metadata
+    is only queried from the database on a miss.
     """
     active_project_id = session.get('active_project_id')
     if not active_project_id:
         return None
 
+    cache = get_table_cache()
+    table_id = (session.get('db_schema') or {}).get(table_name, {}).get('id')
+    if table_id is not None:
+        cached = cache.get(
+            table_id,
+            validate=lambda entry: entry.project_id == active_project_id
+            and entry.version == (table_id, _file_version(entry.filepath))
+        )
+        if cached is not None:
+            return cached.df
+
     # Query Postgres for the table info
-    table_record = Table.query.filter_by(project_id=active_project_id, name=table_name).first()
-    
+    # The newest record wins if a file was uploaded again under the same name
+    table_record = Table.query.filter_by(
+        project_id=active_project_id, name=table_name
+    ).order_by(Table.id.desc()).first()
+
     if table_record:
         try:
+            # Tables without a sidecar get one (built once across workers),
+            # so every worker maps the same copy of the columns. It is built
+            # in the background: until then the CSV is read, and the
+            # sidecar's mtime in the version makes the next lookup map it.
+            try:
+                queue_sidecar_build(current_app._get_current_object(), table_record.filepath,
+                                    current_app.config.get('INGEST_WORKERS'))
+            except Exception as e:
+                print(f"Error queueing the columnar sidecar build for {table_name}: {e}")
+
             # Re-create the DataFrame object from the stored path
-            df = DataFrame(source=table_record.filepath)
+            version = (table_record.id, _file_version(table_record.filepath))
+            df = DataFrame(
+                source=table_record.filepath,
+                stats=table_record.column_stats,
+                indexes=table_record.indexes
+            )
+            cache.put(
+                table_record.id,
+                CachedTable(df, table_record.filepath, version, active_project_id, session.get('user_id')),
+                _frame_bytes(df)
+            )
             return df
         except Exception as e:
             print(f"Error initializing DataFrame for {table_name}: {e}")
             return None
-    
+
     return None
 
-def clear_cache_for_user():
+def invalidate_table(table_id, filepath):
+    """
+    Drops a table and the query results computed from it from the caches
+    (after a rename, delete or new index). This worker drops them right
+    away; the others miss on their next lookup, since touching the
+    change stamp gives the table a new version.
+    """
+    try:
+        touch_stamp(filepath)
+    except OSError as e:
+        print(f"Error touching the change stamp of {filepath}: {e}")
+    get_table_cache().invalidate(table_id)
+    get_result_cache().invalidate_table(filepath)
+
+def get_cache_stats():
+    """Hit/miss counters and memory use of the table and result caches."""
+    return {'tables': get_table_cache().stats(), 'results': get_result_cache().stats()}
+
+def clear_cache_for_user(user_id=None):
     """
-    No longer needed since we don't cache objects, 
-    but kept for interface compatibility.
+    Drops the cached tables loaded by a user (the current session's user
+    by default), e.g. on logout.
     """
-    pass
\ No newline at end of file
+    user_id = user_id if user_id is not None else session.get('user_id')
+    if user_id is not None:
+        get_table_cache().invalidate_where(lambda entry: entry.user_id == user_id)
@@ -0,0 +1,130 @@
+# services/translation_cache.py
+import hashlib
+import json
+import re
+import threading
+import time
+
+
+def normalize_question(question):
+    """Case, spacing and trailing punctuation do not change a question."""
+    question = re.sub(r'\s+', ' ', (question or '').strip().lower())
+    return question.rstrip('?.! ')
+
+
+def translation_key(question, schema, relationships, version=1):
+    """
+    Cache key of one translation: a SHA-256 over the normalized question,
+    the schema fingerprint (table -> column types), the known
+    relationships and the prompt version.
+    """
+    fingerprint = json.dumps(
+        [normalize_question(question), schema, relationships or [], version],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one: the first
+    caller runs the function, the others wait for and share its result
+    (or its exception). Works across the threads of one process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> [event, result, error]
+
+    def do(self, key, func):
+        """Returns (result, shared): shared is True if another call produced it."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = [threading.Event(), None, None]
+        if not leader:
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1], True
+        try:
+            call[1] = func()
+            return call[1], False
+        except Exception as e:
+            call[2] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call[0].set()
+
+
+class MemoryTranslationStore:
+    """In-process translation store (tests and setups without a database)."""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.entries = {}
+
+    def get(self, key, ttl):
+        entry = self.entries.get(key)
+        if entry is None or self.clock() - entry[1] > ttl:
+            return None
+        return entry[0]
+
+    def set(self, key, question, response_text):
+        self.entries[key] = (response_text, self.clock())
+
+
+class TranslationCache:
+    """
+    Caches LLM translations (question -> generated JSON text) in a
+    persistent store with a TTL, and sends at most one request per key to
+    the model at a time.
+
+    `store` provides get(key, ttl) -> text or None and
+    set(key, question, text); see services/translation_store.py for the
+    database-backed one. `model` is anything with generate_content(prompt)
+    returning an object with a `.text` (the Gemini model, or FakeModel).
+    """
+
+    def __init__(self, store, ttl):
+        self.store = store
+        self.ttl = ttl
+        self.flight = SingleFlight()
+        self._counter_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _count(self, hit):
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def translate(self, model, key, question, prompt, parse):
+        """
+        Returns (parsed response, cached). `parse(text)` turns the model
+        output into the result and raises on invalid output, which is then
+        not cached.
+        """
+        text = self.store.get(key, self.ttl)
+        if text is not None:
+            self._count(hit=True)
+            return parse(text), True
+
+        def generate():
+            # A request that waited on the lock may find the answer stored
+            cached = self.store.get(key, self.ttl)
+            if cached is not None:
+                return cached, True
+            response_text = model.generate_content(prompt).text
+            parse(response_text)  # Invalid output raises and is not stored
+            self.store.set(key, question, response_text)
+            return response_text, False
+
+        (text, cached), shared = self.flight.do(key, generate)
+        self._count(hit=cached or shared)
+        return parse(text), cached or shared
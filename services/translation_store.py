@@ -0,0 +1,45 @@
+# services/translation_store.py
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import TranslationCacheEntry
+from services.translation_cache import TranslationCache
+
+
+class DbTranslationStore:
+    """Translation cache entries in the app database, expiring after the TTL."""
+
+    def get(self, key, ttl):
+        entry = db.session.get(TranslationCacheEntry, key)
+        if entry is None or entry.created_at < datetime.utcnow() - timedelta(seconds=ttl):
+            return None
+        return entry.response_text
+
+    def set(self, key, question, response_text):
+        now = datetime.utcnow()
+        try:
+            db.session.merge(TranslationCacheEntry(
+                cache_key=key, question=question, response_text=response_text, created_at=now
+            ))
+            db.session.commit()
+        except IntegrityError:
+            # Another worker stored the same key first
+            db.session.rollback()
+
+    def purge(self, ttl):
+        """Deletes expired entries."""
+        cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+        TranslationCacheEntry.query.filter(TranslationCacheEntry.created_at < cutoff).delete()
+        db.session.commit()
+
+
+_cache = None
+
+
+def get_translation_cache():
+    """The process-wide translation cache over the database store."""
+    global _cache
+    if _cache is None:
+        _cache = TranslationCache(DbTranslationStore(), current_app.config['TRANSLATION_CACHE_TTL'])
+    return _cache
@@ -372,37 +372,142 @@ document.addEventListener("DOMContentLoaded", () => {
     });
   }
 
+  // Polls the background ingest jobs of an upload until all finish,
+  // showing their progress; returns the updated schema.
+  async function waitForIngestJobs(jobs) {
+    let schema = {};
+    let pending = jobs.map((job) => job.id);
+    const progress = {};
+    while (pending.length > 0) {
+      const stillPending = [];
+      for (const id of pending) {
+        const response = await apiFetch(`/api/upload/jobs/${id}`);
+        if (!response) return schema;
+        const data = await response.json();
+        if (!data.success) continue;
+        schema = data.schema;
+        const job = data.job;
+        progress[id] = job.progress || 0;
+        if (job.status === "failed") {
+          showError(`Could not ingest "${job.filename}": ${job.error}`);
+        } else if (job.status !== "done") {
+          stillPending.push(id);
+          const stage = job.stage === "indexing" ? "Indexing" : "Parsing";
+          const percent = Math.round(
+            (100 * Object.values(progress).reduce((a, b) => a + b, 0)) /
+              jobs.length
+          );
+          showLoading(true, `${stage} ${job.filename}... ${percent}%`);
+        }
+      }
+      pending = stillPending;
+      if (pending.length > 0)
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+    return schema;
+  }
+
+  async function sha256Hex(buffer) {
+    if (!window.crypto || !crypto.subtle) return null; // Not a secure context
+    const digest = await crypto.subtle.digest("SHA-256", buffer);
+    return Array.from(new Uint8Array(digest))
+      .map((b) => b.toString(16).padStart(2, "0"))
+      .join("");
+  }
+
+  // Sends one file through the resumable upload API, chunk by chunk.
+  // After a failed chunk it asks the server for its offset and resumes
+  // from there. Returns the ingest job started on finalize.
+  async function uploadChunked(file, onProgress) {
+    const initResponse = await apiFetch("/api/uploads", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ filename: file.name, size: file.size }),
+    });
+    if (!initResponse) return null;
+    const init = await initResponse.json();
+    if (!init.success) throw new Error(init.error);
+
+    let offset = 0;
+    let failures = 0;
+    while (offset < file.size) {
+      const chunk = await file
+        .slice(offset, offset + init.chunk_size)
+        .arrayBuffer();
+      const headers = { "Content-Type": "application/octet-stream" };
+      const checksum = await sha256Hex(chunk);
+      if (checksum) headers["X-Chunk-SHA256"] = checksum;
+      try {
+        const response = await apiFetch(
+          `/api/uploads/${init.upload_id}/chunks?offset=${offset}`,
+          { method: "PUT", headers, body: chunk }
+        );
+        if (!response) return null;
+        const data = await response.json();
+        if (data.success || response.status === 409) {
+          offset = data.offset;
+          failures = 0;
+          onProgress(offset / file.size);
+          continue;
+        }
+        throw new Error(data.error);
+      } catch (error) {
+        if (++failures > 5) throw error;
+        await new Promise((resolve) => setTimeout(resolve, 1000 * failures));
+        const response = await apiFetch(`/api/uploads/${init.upload_id}`);
+        if (!response) return null;
+        const data = await response.json();
+        if (data.success) offset = data.offset;
+      }
+    }
+
+    const response = await apiFetch(
+      `/api/uploads/${init.upload_id}/finalize`,
+      { method: "POST" }
+    );
+    if (!response) return null;
+    const data = await response.json();
+    if (!data.success) throw new Error(data.error);
+    return data.job;
+  }
+
   async function handleFiles(files) {
     if (files.length === 0) return;
-    const formData = new FormData();
+    const csvFiles = [];
     for (const file of files) {
-      if (file.type !== "text/csv" && !file.name.endsWith(".csv")) {
+      // CSVs may be gzip, bz2 or xz compressed; they stay compressed on the server
+      if (
+        file.type !== "text/csv" &&
+        !/\.csv(\.(gz|gzip|bz2|xz))?$/i.test(file.name)
+      ) {
         showError(`File "${file.name}" is not a CSV.`);
         continue;
       }
-      formData.append("files", file);
+      csvFiles.push(file);
     }
-    if (formData.getAll("files").length === 0) return;
+    if (csvFiles.length === 0) return;
 
-    showLoading(true, "Uploading, parsing, and inferring types...");
+    showLoading(true, "Uploading...");
     try {
-      const response = await apiFetch("/api/upload", {
-        method: "POST",
-        body: formData,
-      });
-      if (!response) return;
-      const data = await response.json();
-      if (data.success) {
-        renderSchema(data.schema);
-        goChat.disabled = false;
-        const schemaSize = Object.keys(data.schema).length;
-        detectRelationshipsBtn.disabled = schemaSize < 2;
-        if (schemaSize >= 2) await detectRelationships(true);
-      } else {
-        showError(data.error);
+      const jobs = [];
+      for (const file of csvFiles) {
+        const job = await uploadChunked(file, (fraction) =>
+          showLoading(
+            true,
+            `Uploading ${file.name}... ${Math.round(100 * fraction)}%`
+          )
+        );
+        if (!job) return;
+        jobs.push(job);
       }
+      const schema = await waitForIngestJobs(jobs);
+      renderSchema(schema);
+      goChat.disabled = false;
+      const schemaSize = Object.keys(schema).length;
+      detectRelationshipsBtn.disabled = schemaSize < 2;
+      if (schemaSize >= 2) await detectRelationships(true);
     } catch (error) {
-      showError("File upload failed.");
+      showError(`File upload failed: ${error.message}`);
     } finally {
       showLoading(false);
       fileUpload.value = null;
@@ -553,8 +658,11 @@ document.addEventListener("DOMContentLoaded", () => {
     if (!silent) setButtonLoading(detectRelationshipsBtn, true);
     relationshipList.innerHTML = "";
     try {
+      // An explicit click re-runs detection; otherwise the stored result is used
       const response = await apiFetch("/api/detect-relationships", {
         method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ refresh: !silent }),
       });
       if (!response) return;
       const data = await response.json();
@@ -651,25 +759,114 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   }
 
-  function renderTable(data) {
-    if (data.length === 0)
+  function tableRowsHtml(rows) {
+    return rows
+      .map(
+        (row) =>
+          '<tr class="hover:bg-slate-50">' +
+          row.map((v) => `<td class="p-1.5 border-t">${v}</td>`).join("") +
+          "</tr>"
+      )
+      .join("");
+  }
+
+  // Table results are columnar: column names once, one value array per
+  // row. Long results come one page at a time from a server-side cursor.
+  function renderTable(result) {
+    const rows = result.data || [];
+    if (rows.length === 0)
       return '<p class="text-[11px] text-slate-500">Query returned no results.</p>';
-    const headers = Object.keys(data[0]);
     let table =
       '<table class="text-[11px] border border-slate-200 rounded-lg overflow-hidden w-full">';
     table += '<thead class="bg-slate-100"><tr>';
-    headers.forEach((h) => (table += `<th class="p-1.5 text-left">${h}</th>`));
+    result.columns.forEach(
+      (h) => (table += `<th class="p-1.5 text-left">${h}</th>`)
+    );
     table += "</tr></thead>";
-    table += "<tbody>";
-    data.forEach((row) => {
-      table += '<tr class="hover:bg-slate-50">';
-      headers.forEach(
-        (h) => (table += `<td class="p-1.5 border-t">${row[h]}</td>`)
+    table += `<tbody>${tableRowsHtml(rows)}</tbody></table>`;
+    let more = "";
+    if (result.cursor && result.next_offset != null) {
+      more = `<button type="button" class="load-more-rows mt-2 text-[11px] text-sky-600 hover:underline" data-cursor="${result.cursor}" data-offset="${result.next_offset}">Load more (${rowCountText(rows.length, result.row_count)})</button>`;
+    }
+    return `<div class="overflow-x-auto">${table}</div>${more}`;
+  }
+
+  // The total is null while the server is still writing the result
+  function rowCountText(shown, total) {
+    return total == null ? `${shown} rows so far` : `${shown} of ${total} rows`;
+  }
+
+  async function loadMoreRows(button) {
+    button.disabled = true;
+    try {
+      const response = await apiFetch(
+        `/api/results/${button.dataset.cursor}?offset=${button.dataset.offset}`
       );
-      table += "</tr>";
-    });
-    table += "</tbody></table>";
-    return `<div class="overflow-x-auto">${table}</div>`;
+      if (!response) return;
+      const page = await response.json();
+      if (!page.success) {
+        button.textContent = page.error || "Could not load more rows.";
+        return;
+      }
+      const tbody = button.previousElementSibling.querySelector("tbody");
+      tbody.insertAdjacentHTML("beforeend", tableRowsHtml(page.data));
+      if (page.next_offset == null) {
+        button.remove();
+        return;
+      }
+      button.dataset.offset = page.next_offset;
+      button.textContent = `Load more (${rowCountText(page.next_offset, page.row_count)})`;
+      button.disabled = false;
+    } catch (error) {
+      button.textContent = "Could not load more rows.";
+    }
+  }
+
+  document.addEventListener("click", (e) => {
+    const button = e.target.closest(".load-more-rows");
+    if (button) loadMoreRows(button);
+  });
+
+  // Reads the /api/chat/stream events into the same result object that
+  // /api/chat returns, showing the progress steps in the typing bubble.
+  async function readChatStream(response, typingEl) {
+    const steps = {
+      translating: "Translating question...",
+      code: "Generated code",
+      executing: "Running query...",
+    };
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const rows = [];
+    let buffer = "";
+    let result = null;
+    while (!result) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let end;
+      while (!result && (end = buffer.indexOf("\n\n")) !== -1) {
+        const message = buffer.slice(0, end);
+        buffer = buffer.slice(end + 2);
+        let event = "message";
+        let data = "";
+        message.split("\n").forEach((line) => {
+          if (line.startsWith("event: ")) event = line.slice(7);
+          else if (line.startsWith("data: ")) data += line.slice(6);
+        });
+        if (!data) continue; // keep-alive comment
+        const payload = JSON.parse(data);
+        if (event === "rows") {
+          rows.push(...payload.rows);
+        } else if (event === "done" || event === "error") {
+          result = payload;
+          if (result.type === "table") result.data = rows;
+        } else if (steps[event]) {
+          typingEl.firstChild.textContent = steps[event];
+        }
+      }
+    }
+    return result || { type: "error", data: "The response ended early." };
   }
 
   async function sendMessage() {
@@ -687,7 +884,7 @@ document.addEventListener("DOMContentLoaded", () => {
     chatThread.appendChild(typingEl);
     chatThread.scrollTop = chatThread.scrollHeight;
     try {
-      const response = await apiFetch("/api/chat", {
+      const response = await apiFetch("/api/chat/stream", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ query: value }),
@@ -697,7 +894,9 @@ document.addEventListener("DOMContentLoaded", () => {
         setButtonLoading(chatSend, false);
         return;
       }
-      const result = await response.json();
+      const result = response.ok
+        ? await readChatStream(response, typingEl)
+        : await response.json();
 
       // --- ADDED THIS CONSOLE.LOG ---
       // console.log("Received from backend:", result);
@@ -709,7 +908,7 @@ document.addEventListener("DOMContentLoaded", () => {
           break;
         case "table":
           htmlResponse = `<p class="text-[11px] text-slate-500 mb-2">Here are the results:</p>${renderTable(
-            result.data
+            result
           )}`;
           break;
         case "count":
@@ -0,0 +1,59 @@
+import os
+
+from engine.aggregation import HashAggregator
+from engine.dataframe import DataFrame, _aggregate_groups
+
+
+def make_rows(n=2000, keys=300):
+    return [
+        {"key": f"k{(i * 7) % keys}", "amount": i % 13 if i % 5 else None, "label": str(i % 3)}
+        for i in range(n)
+    ]
+
+
+def test_groupby_agg_matches_materialized_groups():
+    df = DataFrame(make_rows())
+    agg_map = {"amount": "avg", "label": "sum", "key": "count"}
+
+    expected = _aggregate_groups(df._group_rows("key"), agg_map)
+    result = df.groupby_agg("key", agg_map)
+
+    assert result == expected
+    assert list(result) == list(expected)  # Order of first appearance
+
+
+def test_aggregate_of_groupby_is_rewritten(monkeypatch):
+    df = DataFrame(make_rows(50, 5))
+    monkeypatch.setattr(df, "_group_rows", lambda col: (_ for _ in ()).throw(AssertionError))
+
+    result = df.aggregate(df.groupby("key"), {"amount": "max"})
+
+    assert set(result) == {"k0", "k1", "k2", "k3", "k4"}
+
+
+def test_spill_to_disk_gives_same_result(tmp_path):
+    rows = make_rows(5000, 1200)
+    df = DataFrame(rows)
+    agg_map = {"amount": "sum", "label": "min", "key": "count"}
+
+    in_memory = df.groupby_agg("key", agg_map)
+
+    aggregator = HashAggregator(agg_map, memory_limit=20000, spill_dir=str(tmp_path))
+    aggregator.consume((r["key"] for r in rows), [(r["amount"] for r in rows), (r["label"] for r in rows)])
+    assert aggregator.spilled > 0
+    spilled = aggregator.results()
+
+    assert spilled == in_memory
+    assert list(spilled) == list(in_memory)
+    assert os.listdir(tmp_path) == []  # Spill files are removed
+
+
+def test_file_backed_groupby_agg_streams(tmp_path):
+    path = tmp_path / "sales.csv"
+    path.write_text("region,amount\nN,10\nS,5\nN,\nS,x\nN,2.5\n")
+    df = DataFrame(str(path))
+
+    result = df.aggregate(df.groupby("region"), {"amount": "sum", "region": "count"})
+
+    assert df.store is None
+    assert result == {"N": {"amount": 12.5, "region": 3}, "S": {"amount": 5.0, "region": 2}}
@@ -0,0 +1,57 @@
+import pytest
+from array import array
+from engine.columnar import ColumnStore, ColumnBuilder, RowView
+
+
+def test_typed_columns_from_rows():
+    rows = [
+        {"id": 1, "price": 2.5, "name": "A"},
+        {"id": 2, "price": None, "name": "B"},
+    ]
+    store = ColumnStore.from_rows(rows, column_types={"id": "int", "price": "float", "name": "str"})
+
+    assert isinstance(store.column("id").values, array)
+    assert isinstance(store.column("price").values, array)
+    assert store.column("price").null_count == 1
+    assert list(store.column("price")) == [2.5, None]
+    assert len(store) == 2
+
+
+def test_builder_downgrades_on_mismatch():
+    builder = ColumnBuilder("int")
+    builder.append(1)
+    builder.append(None)
+    builder.append("oops")
+    column = builder.finish()
+
+    assert column.kind == "object"
+    assert list(column) == [1, None, "oops"]
+
+
+def test_rows_round_trip():
+    rows = [{"a": 1, "b": "x"}, {"a": None, "b": "y"}]
+    store = ColumnStore.from_rows(rows, column_types={"a": "int", "b": "str"})
+
+    assert list(store.iter_rows()) == rows
+    assert store.row(1) == {"a": None, "b": "y"}
+
+
+def test_take_preserves_nulls():
+    rows = [{"a": 1}, {"a": None}, {"a": 3}]
+    store = ColumnStore.from_rows(rows, column_types={"a": "int"})
+    taken = store.take([2, 1])
+
+    assert list(taken.iter_rows()) == [{"a": 3}, {"a": None}]
+
+
+def test_row_view_indexing_and_values():
+    rows = [{"a": 1}, {"a": None}, {"a": 3}]
+    store = ColumnStore.from_rows(rows, column_types={"a": "int"})
+    view = RowView(store, [0, 1, 2])
+
+    assert len(view) == 3
+    assert view[-1] == {"a": 3}
+    assert view == rows
+    assert list(view.values("a")) == [1, 3]
+    with pytest.raises(IndexError):
+        RowView(store)[5]
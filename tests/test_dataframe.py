@@ -84,3 +84,83 @@ def test_infer_types():
     assert types["a"] == "int"
     assert types["b"] == "float"
     assert types["c"] == "str"
+
+
+def test_columnar_file_source(tmp_path):
+    path = tmp_path / "orders.csv"
+    path.write_text("id,total\n1,10\n2,\n3,30\n", encoding="utf-8")
+    df = DataFrame(str(path), columnar=True)
+
+    assert df.source_type == "columnar"
+    assert len(df) == 3
+    assert df.max_by("total") == [{"id": 3, "total": 30}]
+    assert df.min_by("total") == [{"id": 1, "total": 10}]
+    assert df.top_k_by("total", 1) == [{"id": 3, "total": 30}]
+
+
+def test_groupby_returns_row_sequences():
+    df = DataFrame([
+        {"dept": "HR", "salary": 100},
+        {"dept": "ENG", "salary": None},
+        {"dept": "HR", "salary": 200},
+    ])
+    groups = df.groupby("dept")
+    agg = df.aggregate(groups, {"salary": "avg", "dept": "count"})
+
+    assert list(groups["HR"]) == [{"dept": "HR", "salary": 100}, {"dept": "HR", "salary": 200}]
+    assert agg["HR"] == {"salary": 150.0, "dept": 2}
+    assert agg["ENG"] == {"salary": 0, "dept": 1}
+
+
+def test_join_name_clash_uses_right_tag():
+    left = DataFrame([{"id": 1, "name": "A"}])
+    right = DataFrame([{"uid": 1, "name": "Z"}])
+
+    joined = left.join(right, "id", "uid")
+
+    assert joined.data[0] == {"id": 1, "name": "A", "joined.name": "Z"}
+
+
+def test_file_operators_decode_only_needed_columns(tmp_path, monkeypatch):
+    path = tmp_path / "orders.csv"
+    path.write_text("id,total_amount,note\n1,5.5,a\n2,9.0,b\n3,7.25,c\n")
+    df = DataFrame(str(path))
+
+    requested = []
+    parse = df.parser.parse
+
+    def recording_parse(cast=True, columns=None):
+        requested.append(columns)
+        return parse(cast=cast, columns=columns)
+
+    monkeypatch.setattr(df.parser, "parse", recording_parse)
+
+    assert len(df) == 3
+    assert df.max_by("total_amount") == [{"id": 2, "total_amount": 9.0, "note": "b"}]
+    assert df.top_k_by("total_amount", 2) == [
+        {"id": 2, "total_amount": 9.0, "note": "b"},
+        {"id": 3, "total_amount": 7.25, "note": "c"},
+    ]
+    assert df.project(["note"]) == [{"note": "a"}, {"note": "b"}, {"note": "c"}]
+
+    lazy = df.lazy()
+    assert lazy.aggregate(lazy.groupby("note"), {"total_amount": "sum"})["c"] == {"total_amount": 7.25}
+    assert requested == [[], ["total_amount"], ["total_amount"], ["note"], ["note", "total_amount"]]
+
+
+def test_project_slice_reads_only_needed_rows(tmp_path):
+    path = tmp_path / "big.csv"
+    path.write_text("id,name\n" + "".join(f"{i},n{i}\n" for i in range(1000)), encoding="utf-8")
+    df = DataFrame(str(path))
+    read = []
+    parse = df.parser.parse
+
+    def counting_parse(*args, **kwargs):
+        for row in parse(*args, **kwargs):
+            read.append(row)
+            yield row
+
+    df.parser.parse = counting_parse
+    assert df.project(["name"])[:3] == [{"name": "n0"}, {"name": "n1"}, {"name": "n2"}]
+    assert len(read) == 3
+    assert df.project(["id"])[998:] == [{"id": 998}, {"id": 999}]
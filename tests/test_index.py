@@ -0,0 +1,107 @@
+import os
+import pickle
+
+import pytest
+
+from engine.columnar import ColumnStore
+from engine.dataframe import DataFrame
+from engine.index import build_index, index_path, open_index, write_index
+from engine.plan import PlanContext
+from engine.predicates import col
+from engine.storage import sidecar_path, write_sidecar
+
+
+def _write_customers(tmp_path, with_sidecar):
+    path = tmp_path / "customers.csv"
+    lines = ["customer_id,city,score"] + [f"{i % 50},{'Oslo' if i % 2 else 'Bern'},{i * 0.5}" for i in range(200)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    if with_sidecar:
+        write_sidecar(sidecar_path(str(path)), DataFrame(str(path), columnar=True).store)
+    return str(path)
+
+
+@pytest.mark.parametrize("kind", ["hash", "sorted"])
+def test_index_lookup_matches_scan(kind):
+    store = ColumnStore.from_rows(
+        [{"v": v} for v in [5, 3, None, 5, 8, 1, 3]], column_types={"v": "int"},
+    )
+    index = build_index(store, "v", kind)
+
+    assert index.lookup("==", 5) == [0, 3]
+    assert index.lookup("in", [3, 8]) == [1, 4, 6]
+    assert index.lookup("==", "5") == []
+    if kind == "sorted":
+        assert index.lookup(">=", 5) == [0, 3, 4]
+        assert index.lookup("<", 3) == [5]
+    else:
+        assert index.lookup("<", 3) is None
+
+
+@pytest.mark.parametrize("with_sidecar", [True, False])
+def test_where_uses_index(tmp_path, monkeypatch, with_sidecar):
+    path = _write_customers(tmp_path, with_sidecar)
+    DataFrame(path).create_index("customer_id", "sorted")
+    df = DataFrame(path, indexes={"customer_id": "sorted"})
+    expected = df.filter(lambda row: row["customer_id"] == 7 and row["city"] == "Oslo").project(["score"])
+
+    # The index answers the lookup: no full scan of the columns or CSV
+    monkeypatch.setattr(ColumnStore, "iter_rows", lambda *a, **k: pytest.fail("scanned"))
+    if not with_sidecar:
+        monkeypatch.setattr(df.parser, "parse", lambda *a, **k: pytest.fail("scanned"))
+    result = df.filter((col("customer_id") == 7) & (col("city") == "Oslo"))
+    monkeypatch.undo()
+
+    assert result.project(["score"]) == expected
+    assert len(df.where("customer_id", ">=", 48)) == 8
+
+
+def test_lazy_where_and_stale_index(tmp_path):
+    path = _write_customers(tmp_path, True)
+    df = DataFrame(path)
+    df.create_index("city", "hash")
+
+    lazy = DataFrame(path, indexes={"city": "hash"}).lazy(PlanContext())
+    assert len(lazy.where("city", "==", "Bern").where("customer_id", "<", 2)) == 4
+
+    # An index older than its CSV is ignored
+    stale = os.path.getmtime(path) - 10
+    os.utime(index_path(path, "city", "hash"), (stale, stale))
+    assert open_index(path, "city", "hash") is None
+
+
+def test_write_and_open_index_roundtrip(tmp_path):
+    path = _write_customers(tmp_path, False)
+    store = DataFrame(path, columnar=True).store
+    write_index(path, build_index(store, "city", "sorted"))
+
+    index = open_index(path, "city", "sorted")
+    assert index.lookup("==", "Oslo") == list(range(1, 200, 2))
+
+
+@pytest.mark.parametrize("kind", ["hash", "sorted"])
+@pytest.mark.parametrize("column", ["customer_id", "city", "score"])
+def test_index_files_are_typed_arrays(tmp_path, kind, column):
+    path = _write_customers(tmp_path, False)
+    store = DataFrame(path, columnar=True).store
+    built = build_index(store, column, kind)
+    write_index(path, built)
+
+    loaded = open_index(path, column, kind)
+    value = store.column(column)[7]
+    assert loaded.lookup("==", value) == built.lookup("==", value)
+    assert loaded.lookup("in", [value, store.column(column)[8]]) == built.lookup("in", [value, store.column(column)[8]])
+
+
+class _Exploit:
+    def __reduce__(self):
+        return (os.system, ("touch pwned",))
+
+
+def test_uploaded_pickle_is_not_loaded_as_an_index(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = _write_customers(tmp_path, False)
+    with open(index_path(path, "city", "hash"), "wb") as f:
+        pickle.dump(_Exploit(), f)
+
+    assert open_index(path, "city", "hash") is None
+    assert not os.path.exists("pwned")
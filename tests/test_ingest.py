@@ -0,0 +1,160 @@
+import gzip
+import hashlib
+import io
+import json
+
+import pytest
+
+from engine.dataframe import DataFrame
+from engine.ingest import (
+    ChunkedIngest, ChunkOffsetError, infer_column, ingest_csv, ingest_stream, ingest_upload,
+)
+from engine.storage import MAGIC, has_fresh_sidecar
+
+
+CSV = (
+    'id,city,score,note\n'
+    '1,Oslo,1.5,"a, quoted\nnote"\n'
+    '2,Bern,,plain\n'
+    '3,Zug,7,\n'
+    '4,Oslo,2.25,last\n'
+)
+
+
+def stream_ingest(path, text, **kwargs):
+    path.write_text(text, encoding="utf-8")
+    with open(path, "rb") as f:
+        return ingest_stream(f, str(path), **kwargs)
+
+
+def test_stream_writes_sidecar(tmp_path):
+    path = tmp_path / "events.csv"
+    seen = []
+    df, stats = stream_ingest(path, CSV, block_size=7, progress=seen.append)
+
+    assert path.read_bytes() == CSV.encode()
+    assert has_fresh_sidecar(str(path))
+    assert seen[-1] == len(CSV.encode()) and seen == sorted(seen)
+    assert stats["row_count"] == 4
+    assert df.get_column_types() == {"id": "int", "city": "str", "score": "float", "note": "str"}
+    assert df.project(["id", "score", "note"])[:2] == [
+        {"id": 1, "score": 1.5, "note": "a, quoted\nnote"},
+        {"id": 2, "score": None, "note": "plain"},
+    ]
+
+
+def test_stream_matches_file_ingest(tmp_path):
+    streamed = tmp_path / "a.csv"
+    parsed = tmp_path / "b.csv"
+    parsed.write_text(CSV, encoding="utf-8")
+    stream_ingest(streamed, CSV)
+    ingest_csv(str(parsed))
+
+    rows = DataFrame(str(streamed)).project(["id", "city", "score", "note"])
+    assert rows == DataFrame(str(parsed)).project(["id", "city", "score", "note"])
+
+
+def test_stream_widens_columns_block_by_block(tmp_path):
+    text = "code,amount,late\n" + "".join(f"{i},{i},\n" for i in range(50)) + "007,2.5,\nA7,3,x\n"
+    df, stats = stream_ingest(tmp_path / "w.csv", text, block_size=16)
+
+    # int -> float is recast in place; int -> str reads the column again
+    assert df.get_column_types() == {"code": "str", "amount": "float", "late": "str"}
+    rows = df.project(df.columns)
+    assert rows[0] == {"code": "0", "amount": 0.0, "late": None}
+    assert rows[-2:] == [
+        {"code": "007", "amount": 2.5, "late": None},
+        {"code": "A7", "amount": 3.0, "late": "x"},
+    ]
+    assert stats["row_count"] == 52
+
+
+class _Body:
+    """A request body: read() only, no seeking."""
+
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+
+    def read(self, size=-1):
+        return self.data.read(min(size, 5) if size and size > 0 else size)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_upload_is_saved_while_it_is_parsed(tmp_path, compress):
+    text = "code,amount\n" + "".join(f"{i},{i}\n" for i in range(50)) + "007,2.5\nA7,3\n"
+    data = gzip.compress(text.encode()) if compress else text.encode()
+    path = tmp_path / ("codes.csv.gz" if compress else "codes.csv")
+    seen = []
+    df, stats = ingest_upload(_Body(data), str(path), block_size=16, progress=seen.append)
+
+    # Saved as received (still compressed), and the text column read back from it
+    assert path.read_bytes() == data
+    assert seen[-1] == len(data)
+    assert stats["row_count"] == 52
+    assert df.get_column_types() == {"code": "str", "amount": "float"}
+    assert df.project(["code"])[-2:] == [{"code": "007"}, {"code": "A7"}]
+
+
+def test_failed_upload_leaves_no_file(tmp_path):
+    class Broken:
+        def read(self, size=-1):
+            raise OSError("connection reset")
+
+    with pytest.raises(OSError):
+        ingest_upload(Broken(), str(tmp_path / "broken.csv"))
+    assert not (tmp_path / "broken.csv").exists()
+
+
+def test_types_are_inferred_over_the_whole_column():
+    chunks = [["1", "2"]] * 30 + [["3", "x"]]
+    kind, cast = infer_column(chunks)
+    assert kind == "str"
+    assert cast[0] == ["1", "2"] and cast[-1] == ["3", "x"]
+
+    kind, cast = infer_column([["1", ""], ["2.5"]])
+    assert kind == "float"
+    assert cast == [[1.0, None], [2.5]]
+
+
+def chunks_of(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_chunked_ingest_matches_stream_ingest(tmp_path):
+    data = CSV.encode()
+    upload = ChunkedIngest.create(str(tmp_path / "upload"))
+    for chunk in chunks_of(data, 5):
+        upload.append(upload.offset, chunk, hashlib.sha256(chunk).hexdigest())
+
+    # Another process picks the upload up from its directory
+    df, stats = ChunkedIngest(str(tmp_path / "upload")).finish(str(tmp_path / "chunked.csv"))
+    streamed, _ = stream_ingest(tmp_path / "streamed.csv", CSV)
+
+    assert (tmp_path / "chunked.csv").read_bytes() == data
+    assert not (tmp_path / "upload").exists()
+    assert stats["row_count"] == 4
+    assert df.get_column_types() == streamed.get_column_types()
+    assert df.project(df.columns) == streamed.project(streamed.columns)
+
+
+def test_chunks_are_checked_and_resumable(tmp_path):
+    upload = ChunkedIngest.create(str(tmp_path / "upload"))
+    first, rest = b"id,code\n1,7\n", b"2,007\n3,x\n"
+
+    with pytest.raises(ValueError):
+        upload.append(0, first, sha256="0" * 64)
+    assert upload.append(0, first) == len(first)
+    # A resent chunk (the reply was lost) is refused with the current offset
+    with pytest.raises(ChunkOffsetError) as error:
+        upload.append(0, first)
+    assert error.value.expected == len(first)
+
+    upload.append(upload.offset, rest)
+    # The upload state is JSON and the segments are sidecars: no pickles
+    state = json.loads((tmp_path / "upload" / "state.json").read_text())
+    assert state["segments"] == 2 and state["pending"] == 0
+    assert (tmp_path / "upload" / "seg-0.col").read_bytes().startswith(MAGIC)
+    df, _ = upload.finish(str(tmp_path / "codes.csv"))
+    # 'code' looked numeric in the first chunk; its text is kept once it is not
+    assert df.get_column_types() == {"id": "int", "code": "str"}
+    assert df.project(["code"]) == [{"code": "7"}, {"code": "007"}, {"code": "x"}]
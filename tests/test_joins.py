@@ -0,0 +1,183 @@
+import pytest
+
+import engine.joins as joins
+from engine.columnar import ColumnStore
+from engine.dataframe import DataFrame
+from engine.joins import column_order, hash_join, join_positions, merge_join_positions
+from engine.stats import compute_stats, stamp_stats
+from engine.storage import sidecar_path, write_sidecar
+
+
+def _stores():
+    left = ColumnStore.from_rows(
+        [{"id": i % 7, "name": f"n{i}"} for i in range(30)] + [{"id": None, "name": "x"}],
+        column_types={"id": "int", "name": "str"},
+    )
+    right = ColumnStore.from_rows(
+        [{"uid": u, "name": f"r{u}"} for u in (1, 3, 3, 5, None)],
+        column_types={"uid": "int", "name": "str"},
+    )
+    return left, right
+
+
+def _rows(store):
+    return sorted(repr(sorted(row.items())) for row in store.iter_rows())
+
+
+def test_smaller_side_is_built_and_result_is_the_same():
+    left, right = _stores()
+    expected = sorted(
+        (i, j) for i, lk in enumerate(left.column("id")) for j, rk in enumerate(right.column("uid")) if lk == rk
+    )
+
+    assert sorted(zip(*join_positions(left, right, "id", "uid"))) == expected
+    # Swapping the inputs swaps the build side but not the matches
+    right_idx, left_idx = join_positions(right, left, "uid", "id")
+    assert sorted(zip(left_idx, right_idx)) == expected
+
+
+def test_grace_join_spills_and_matches_in_memory(tmp_path, monkeypatch):
+    left, right = _stores()
+    spilled = []
+    original = joins._partition
+
+    def spy(keyed, directory, name, partitions, salt=0):
+        spilled.append((name, salt))
+        return original(keyed, directory, name, partitions, salt)
+
+    monkeypatch.setattr(joins, "_partition", spy)
+    in_memory = hash_join(left, right, "id", "uid", "t")
+    assert not spilled
+
+    grace = hash_join(left, right, "id", "uid", "t", memory_limit=200, spill_dir=str(tmp_path))
+
+    # A budget of one pair: partitions with several keys are split again
+    assert spilled[:2] == [("build", 0), ("probe", 0)]
+    assert ("build", 1) in spilled
+    assert grace.header == in_memory.header == ["id", "name", "t.name"]
+    assert _rows(grace) == _rows(in_memory)
+    assert grace.num_rows == 18
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_dataframe_join_with_memory_limit():
+    left, right = _stores()
+    joined = DataFrame(left).join(DataFrame(right), "id", "uid", memory_limit=100)
+
+    assert len(joined) == 18
+    assert {row["joined.name"] for row in joined.data} == {"r1", "r3", "r5", "rNone"}
+
+
+def test_hot_key_falls_back_to_nested_loops(tmp_path):
+    left = ColumnStore.from_rows([{"k": 1, "v": i} for i in range(40)], column_types={"k": "int", "v": "int"})
+    right = ColumnStore.from_rows([{"k": k, "w": i} for i, k in enumerate([1] * 30 + [2])],
+                                  column_types={"k": "int", "w": "int"})
+
+    # The build side is one key that no hash can split
+    grace = hash_join(left, right, "k", "k", memory_limit=5 * 120, spill_dir=str(tmp_path))
+
+    assert grace.num_rows == 40 * 30
+    assert _rows(grace) == _rows(hash_join(left, right, "k", "k"))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_file_join_streams_through_spill_files(tmp_path, monkeypatch):
+    spill = tmp_path / "spill"
+    spill.mkdir()
+    customers = tmp_path / "customers.csv"
+    customers.write_text("id,country\n" + "".join(f"{i},c{i % 3}\n" for i in range(60)), encoding="utf-8")
+    orders = tmp_path / "orders.csv"
+    orders.write_text("order_id,id,total\n" + "".join(f"{n},{n % 70},{n}.5\n" for n in range(200)), encoding="utf-8")
+    expected = DataFrame(str(orders), columnar=True).join(DataFrame(str(customers), columnar=True), "id", "id")
+
+    def no_loading(self, columns=None):
+        raise AssertionError("input loaded into memory")
+
+    monkeypatch.setattr(DataFrame, "_to_store", no_loading)
+    joined = DataFrame(str(orders)).join(DataFrame(str(customers)), "id", "id", memory_limit=2000,
+                                         spill_dir=str(spill))
+
+    assert joined.header == expected.header == ["order_id", "id", "total", "country"]
+    assert joined.get_column_types() == {"order_id": "int", "id": "int", "total": "float", "country": "str"}
+    assert len(joined) == 180
+    assert _rows(joined.store) == _rows(expected.store)
+    assert list(spill.iterdir()) == []
+
+
+def _sorted_tables(tmp_path):
+    customers = tmp_path / "customers.csv"
+    customers.write_text("customer_id,country\n" + "".join(f"{i},c{i % 3}\n" for i in range(1, 40)), encoding="utf-8")
+    orders = tmp_path / "orders.csv"
+    orders.write_text(
+        "order_id,customer_id,total\n" + "".join(f"{n},{n // 3 + 1},{n}.5\n" for n in range(100)), encoding="utf-8"
+    )
+    return str(customers), str(orders)
+
+
+def test_merge_join_matches_hash_join():
+    left = ColumnStore.from_rows([{"k": k} for k in [1, 1, 2, 4, 4, None]], column_types={"k": "int"})
+    right = ColumnStore.from_rows([{"k": k} for k in [None, 0, 1, 4, 4, 5]], column_types={"k": "int"})
+
+    merged = merge_join_positions(column_order(left.column("k")), column_order(right.column("k")))
+    hashed = join_positions(left, right, "k", "k")
+
+    assert sorted(zip(*merged)) == sorted(zip(*hashed))
+    assert list(merged[0]) == [0, 1, 3, 3, 4, 4, 5]  # Key order, nulls last
+
+
+def test_join_uses_merge_for_sorted_inputs(tmp_path, monkeypatch):
+    customers, orders = _sorted_tables(tmp_path)
+    stats = {path: stamp_stats(compute_stats(DataFrame(path, columnar=True).store), path) for path in (customers, orders)}
+    assert stats[orders]["columns"]["customer_id"]["sorted"]
+    expected = DataFrame(customers).join(DataFrame(orders), "customer_id", "customer_id")
+
+    monkeypatch.setattr(joins, "hash_join", lambda *a, **k: pytest.fail("hash join used"))
+    left = DataFrame(customers, stats=stats[customers])
+    right = DataFrame(orders, stats=stats[orders])
+    eager = left.join(right, "customer_id", "customer_id")
+    lazy = left.lazy().where("country", "!=", "c0").join(right.lazy(), "customer_id", "customer_id")
+
+    assert _rows(eager.store) == _rows(expected.store)
+    assert len(lazy) == len([row for row in expected.data if row["country"] != "c0"])
+
+
+def test_sorted_index_enables_merge_join(tmp_path, monkeypatch):
+    customers, orders = _sorted_tables(tmp_path)
+    DataFrame(customers).create_index("customer_id", "sorted")
+    stats = stamp_stats(compute_stats(DataFrame(orders, columnar=True).store), orders)
+
+    calls = []
+    monkeypatch.setattr(joins, "merge_join_positions", lambda *a: calls.append(1) or merge_join_positions(*a))
+    left = DataFrame(customers, indexes={"customer_id": "sorted"})
+    joined = left.join(DataFrame(orders, stats=stats), "customer_id", "customer_id")
+
+    assert calls and len(joined) == 100
+
+
+def test_sorted_inputs_merge_before_spilling(tmp_path, monkeypatch):
+    customers, orders = _sorted_tables(tmp_path)
+    stats = {path: stamp_stats(compute_stats(DataFrame(path, columnar=True).store), path) for path in (customers, orders)}
+    expected = DataFrame(customers).join(DataFrame(orders), "customer_id", "customer_id")
+
+    monkeypatch.setattr(joins, "hash_join", lambda *a, **k: pytest.fail("hash join used"))
+    monkeypatch.setattr("engine.dataframe.spill_join", lambda *a, **k: pytest.fail("spilled"))
+    left = DataFrame(customers, stats=stats[customers])
+    right = DataFrame(orders, stats=stats[orders])
+    eager = left.join(right, "customer_id", "customer_id", memory_limit=100)
+    lazy = left.lazy().join(right.lazy(), "customer_id", "customer_id", memory_limit=100)
+
+    assert _rows(eager.store) == _rows(expected.store)
+    assert len(lazy) == len(expected)
+
+
+def test_footprint_measures_the_sidecar(tmp_path):
+    path = tmp_path / "wide.csv"
+    path.write_text("id,value\n" + "".join(f"{i},{'x' * 40}\n" for i in range(100)), encoding="utf-8")
+    csv_only = DataFrame(str(path))
+    write_sidecar(sidecar_path(str(path)), DataFrame(str(path), columnar=True).store)
+    mapped = DataFrame(str(path))
+
+    assert csv_only._footprint() == path.stat().st_size
+    assert mapped.store is not None
+    assert mapped._footprint() == sum(mapped.store.column(col).nbytes for col in mapped.header)
+    assert mapped._footprint() != csv_only._footprint()
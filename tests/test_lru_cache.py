@@ -0,0 +1,53 @@
+import threading
+
+from services.lru_cache import LRUCache
+
+
+def test_lru_eviction_against_byte_budget():
+    cache = LRUCache(max_bytes=100)
+    cache.put(1, "a", 40)
+    cache.put(2, "b", 40)
+    assert cache.get(1) == "a"  # 1 is now the most recently used
+
+    cache.put(3, "c", 40)
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "a" and cache.get(3) == "c"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["bytes"]) == (3, 1, 1, 80)
+
+
+def test_stale_and_invalidated_entries_miss():
+    cache = LRUCache(max_bytes=100)
+    cache.put(1, {"version": 1, "user": 7}, 10)
+    cache.put(2, {"version": 1, "user": 8}, 10)
+    cache.put(3, "too big", 500)
+
+    assert cache.get(1, validate=lambda v: v["version"] == 2) is None
+    assert cache.get(1) is None  # The stale entry was dropped
+    assert cache.get(3) is None
+
+    cache.invalidate_where(lambda v: v["user"] == 8)
+    assert cache.stats()["entries"] == 0 and cache.stats()["bytes"] == 0
+
+
+def test_concurrent_access_keeps_accounting_consistent():
+    cache = LRUCache(max_bytes=50)
+
+    def worker(offset):
+        for i in range(500):
+            key = (offset + i) % 20
+            if cache.get(key) is None:
+                cache.put(key, key, 5)
+            if i % 7 == 0:
+                cache.invalidate(key)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = cache.stats()
+    assert stats["bytes"] == 5 * stats["entries"] <= 50
+    assert stats["hits"] + stats["misses"] == 8 * 500
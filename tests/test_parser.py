@@ -28,6 +28,18 @@ def test_header_parsing():
     os.remove(filepath)
 
 
+@pytest.mark.parametrize("tokenizer", ["line", "block"])
+def test_header_fields_are_stripped(tokenizer):
+    filepath = create_temp_csv("id, name ,age\n1,A,10\n")
+
+    parser = CsvParser(filepath, tokenizer=tokenizer)
+
+    assert parser.get_header() == ["id", "name", "age"]
+    assert list(parser.parse()) == [{"id": 1, "name": "A", "age": 10}]
+
+    os.remove(filepath)
+
+
 def test_row_parsing():
     """
     With the new CsvParser, parse() casts values by default based on
@@ -114,3 +126,92 @@ def test_skip_malformed_rows():
 def test_file_not_found():
     with pytest.raises(FileNotFoundError):
         CsvParser("missing_file.csv")
+
+
+def test_byte_ranges_align_to_lines():
+    csv = "id,name\n" + "".join(f"{i},name{i}\n" for i in range(100))
+    filepath = create_temp_csv(csv)
+
+    parser = CsvParser(filepath)
+    ranges = parser._byte_ranges(range_size=64)
+
+    with open(filepath, "rb") as f:
+        data = f.read()
+    assert ranges[0][0] == len("id,name\n")
+    assert ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        assert data[end - 1:end] == b"\n"
+
+    os.remove(filepath)
+
+
+def test_parallel_parse_matches_serial(capsys):
+    lines = [f"{i},name{i}" for i in range(200)]
+    lines[150] = "150,name150,EXTRA"
+    filepath = create_temp_csv("id,name\n" + "\n".join(lines) + "\n")
+
+    parser = CsvParser(filepath)
+    serial = list(parser.parse())
+    serial_out = capsys.readouterr().out
+    parallel = list(parser.parse_parallel(workers=2, range_size=256))
+    parallel_out = capsys.readouterr().out
+
+    assert parallel == serial
+    assert len(parallel) == 199
+    assert "malformed line 152" in serial_out
+    assert "malformed line 152" in parallel_out
+
+    chunks = list(parser.parse_chunks(chunk_size=50, workers=2))
+    assert [len(c) for c in chunks] == [50, 50, 50, 49]
+
+    os.remove(filepath)
+
+
+def test_block_tokenizer_keeps_quoted_rows():
+    csv = 'id,name,score\n1,"Smith, J",10\n2,"multi\nline",20\n3,plain,30\n4,broken\n'
+    filepath = create_temp_csv(csv)
+
+    line_rows = list(CsvParser(filepath).parse())
+    block_parser = CsvParser(filepath, tokenizer='block')
+    rows = list(block_parser.parse())
+
+    # The line tokenizer drops the quoted rows as malformed
+    assert [r["id"] for r in line_rows] == [3]
+    assert block_parser.get_column_types()["score"] == "int"
+    assert rows == [
+        {"id": 1, "name": "Smith, J", "score": 10},
+        {"id": 2, "name": "multi\nline", "score": 20},
+        {"id": 3, "name": "plain", "score": 30},
+    ]
+    assert [list(c) for batch in block_parser.parse_columns() for c in batch][0] == [1, 2, 3]
+
+    os.remove(filepath)
+
+
+def test_block_tokenizer_matches_line_tokenizer():
+    lines = ["id,name,value"] + [f"{i}, n{i} ,{i * 0.5}" for i in range(500)]
+    lines[100] = "oops"
+    filepath = create_temp_csv("\n".join(lines) + "\n\n")
+
+    assert list(CsvParser(filepath, tokenizer='block').parse()) == list(CsvParser(filepath).parse())
+
+    os.remove(filepath)
+
+
+@pytest.mark.parametrize("tokenizer", ["line", "block"])
+def test_parse_only_requested_columns(tokenizer):
+    csv = "id,name,score,city\n1,A,10,X\n2,B,20\n3,C,30,Z\n"
+    filepath = create_temp_csv(csv)
+    parser = CsvParser(filepath, tokenizer=tokenizer)
+
+    assert list(parser.parse(columns=["score", "id", "missing"])) == [
+        {"score": 10, "id": 1},
+        {"score": 30, "id": 3},
+    ]
+    # The width check still drops the short line
+    assert list(parser.parse(columns=[])) == [{}, {}]
+    assert [len(chunk) for chunk in parser.parse_chunks(chunk_size=1, columns=["city"])] == [1, 1]
+    assert list(parser.parse_records(columns=["city", "id"])) == [[("X", 1), ("Z", 3)]]
+
+    os.remove(filepath)
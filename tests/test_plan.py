@@ -0,0 +1,146 @@
+import pytest
+
+from engine.dataframe import DataFrame
+from engine.plan import PlanContext
+import engine.plan as plan
+
+
+def make_tables():
+    customers = DataFrame([
+        {"customer_id": i, "country": "US" if i % 2 else "DE", "age": 20 + i}
+        for i in range(10)
+    ])
+    orders = DataFrame([
+        {"order_id": j, "customer_id": j % 10, "total_amount": j * 1.5}
+        for j in range(40)
+    ])
+    return customers, orders
+
+
+def test_filters_are_lazy_and_fused():
+    customers, _ = make_tables()
+    calls = []
+
+    def older(row):
+        calls.append(row["customer_id"])
+        return row["age"] > 22
+
+    lazy = customers.lazy().filter(older).filter(lambda r: r["country"] == "US")
+    assert calls == []  # Nothing runs until a result is needed
+
+    assert lazy.project(["customer_id"]) == [{"customer_id": i} for i in (3, 5, 7, 9)]
+    assert len(lazy) == 4
+    assert len(calls) == 10  # One pass, reused by len()
+
+
+def test_repeated_join_runs_once(monkeypatch):
+    customers, orders = make_tables()
+    joins = []
+    original = plan.join
+
+    def counting_join(*args, **kwargs):
+        joins.append(args[2:4])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(plan, "join", counting_join)
+
+    context = PlanContext()
+    c = customers.lazy(context)
+    o = orders.lazy(context)
+    result = c.join(o, "customer_id", "customer_id").aggregate(
+        c.join(o, "customer_id", "customer_id").groupby("country"),
+        {"total_amount": "sum"}
+    )
+
+    eager = customers.join(orders, "customer_id", "customer_id")
+    assert result == eager.aggregate(eager.groupby("country"), {"total_amount": "sum"})
+    assert joins == [("customer_id", "customer_id")]
+
+
+def test_equal_lambdas_share_a_node():
+    customers, _ = make_tables()
+    lazy = customers.lazy()
+
+    first = lazy.filter(lambda r: r["age"] > 25)
+    second = lazy.filter(lambda r: r["age"] > 25)
+    other = lazy.filter(lambda r: r["age"] > 26)
+
+    assert first.node is second.node
+    assert first.node is not other.node
+
+
+def test_lazy_groupby_over_filter_matches_eager():
+    customers, orders = make_tables()
+    lazy = orders.lazy().filter(lambda r: r["total_amount"] > 10)
+    eager = orders.filter(lambda r: r["total_amount"] > 10)
+
+    agg = {"total_amount": "avg", "order_id": "count"}
+    assert lazy.aggregate(lazy.groupby("customer_id"), agg) == eager.aggregate(eager.groupby("customer_id"), agg)
+    assert lazy.top_k_by("total_amount", 2) == eager.top_k_by("total_amount", 2)
+    assert lazy.join(customers, "customer_id", "customer_id").columns == \
+        eager.join(customers, "customer_id", "customer_id").columns
+
+
+def test_lazy_order_by_over_filter():
+    _, orders = make_tables()
+    lazy = orders.lazy().filter(lambda r: r["customer_id"] == 3).order_by("total_amount", False, 2)
+
+    assert lazy.project(["order_id"]) == [{"order_id": 33}, {"order_id": 23}]
+
+
+def test_project_prefix_stops_early():
+    customers, orders = make_tables()
+    calls = []
+
+    def us(row):
+        calls.append(row["customer_id"])
+        return row["country"] == "US"
+
+    rows = customers.lazy().filter(us).project(["customer_id"])
+    assert rows[:2] == [{"customer_id": 1}, {"customer_id": 3}]
+    assert calls == [0, 1, 2, 3]  # The filter stopped after two matches
+    assert rows[1] == {"customer_id": 3}
+    assert len(rows) == 5 and rows[-1] == {"customer_id": 9}
+
+
+def test_project_slices_behave_like_lists():
+    customers, _ = make_tables()
+    expected = list(customers.project(["customer_id"]))
+    rows = customers.lazy().project(["customer_id"])
+
+    assert rows[1:7:2] == expected[1:7:2]
+    with pytest.raises(ValueError):
+        rows[:3:0]
+
+
+def test_join_prefix_streams_matching_rows():
+    customers, orders = make_tables()
+    joined = orders.lazy().join(customers.lazy(), "customer_id", "customer_id")
+    eager = orders.join(customers, "customer_id", "customer_id").project(joined.columns)
+
+    preview = joined.project(joined.columns)[:5]
+    assert preview == [row for row in eager if row["order_id"] < 5]
+    assert list(preview[0]) == joined.columns
+
+
+def test_plan_join_over_large_files_spills(tmp_path, monkeypatch):
+    customers = tmp_path / "customers.csv"
+    customers.write_text("id,country\n" + "".join(f"{i},c{i % 3}\n" for i in range(60)), encoding="utf-8")
+    orders = tmp_path / "orders.csv"
+    orders.write_text("order_id,id,total\n" + "".join(f"{n},{n % 70},{n}.5\n" for n in range(200)), encoding="utf-8")
+    expected = DataFrame(str(orders)).filter(lambda r: r["total"] > 20).join(DataFrame(str(customers)), "id", "id")
+
+    def no_loading(self, columns=None):
+        raise AssertionError("input loaded into memory")
+
+    monkeypatch.setattr(DataFrame, "_to_store", no_loading)
+    context = PlanContext()
+    big = DataFrame(str(orders)).lazy(context).filter(lambda r: r["total"] > 20)
+    joined = big.join(DataFrame(str(customers)), "id", "id", memory_limit=300, spill_dir=str(tmp_path))
+
+    # A preview streams through the spilling join too
+    assert len(joined.project(["order_id"])[:5]) == 5
+    rows = joined.project(joined.header)
+    assert sorted(map(tuple, (r.values() for r in rows))) == \
+        sorted(map(tuple, (r.values() for r in expected.project(expected.header))))
+    assert len(joined) == len(expected) == 160
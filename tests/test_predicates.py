@@ -0,0 +1,69 @@
+import pytest
+
+from engine.columnar import ColumnStore
+from engine.dataframe import DataFrame
+from engine.plan import PlanContext
+from engine.predicates import Compare, col
+from engine.stats import compute_zone_maps
+from engine.storage import sidecar_path, write_sidecar
+
+
+def _rows():
+    return [{"ts": i, "kind": "click" if i % 3 else "view", "amount": None if i % 5 == 0 else i * 1.5}
+            for i in range(40)]
+
+
+def test_predicates_are_row_callables():
+    pred = (col("ts") >= 10) & ((col("kind") == "view") | (col("amount") < 3))
+    rows = _rows()
+
+    assert [r["ts"] for r in rows if pred(r)] == [r["ts"] for r in rows if r["ts"] >= 10 and r["kind"] == "view"]
+    assert not (col("amount") > 0)({"amount": None})
+    assert not (col("ts") > "a")({"ts": 3})
+
+
+def test_in_takes_a_collection_of_values():
+    assert Compare("kind", "in", ["view", "buy"])({"kind": "view"})
+    assert Compare("ts", "in", range(3)).value == (0, 1, 2)
+    # A string would otherwise match its characters ('v' in "view")
+    for value in ("view", b"view", 5, None):
+        with pytest.raises(ValueError):
+            Compare("kind", "in", value)
+
+
+def test_filter_matches_lambda_and_skips_blocks(tmp_path, monkeypatch):
+    path = tmp_path / "events.csv"
+    lines = ["ts,kind,amount"] + [f"{r['ts']},{r['kind']},{'' if r['amount'] is None else r['amount']}" for r in _rows()]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    store = DataFrame(str(path), columnar=True).store
+    write_sidecar(sidecar_path(str(path)), store, extra_meta={"zone_maps": compute_zone_maps(store, block_rows=8)})
+
+    seen = []
+    original = Compare.select
+
+    def spy(self, store, positions):
+        positions = list(positions)
+        seen.extend(positions)
+        return original(self, store, positions)
+
+    monkeypatch.setattr(Compare, "select", spy)
+    df = DataFrame(str(path))
+    result = df.filter((col("ts") >= 30) & (col("kind") == "view"))
+
+    expected = df.filter(lambda row: row["ts"] >= 30 and row["kind"] == "view")
+    assert result.project(["ts"]) == expected.project(["ts"]) == [{"ts": 30}, {"ts": 33}, {"ts": 36}, {"ts": 39}]
+    # Blocks 0-2 (ts 0..23) are skipped by the zone map
+    assert min(seen) >= 24
+
+
+def test_lazy_filters_mix_predicates_and_lambdas():
+    store = ColumnStore.from_rows(_rows(), column_types={"ts": "int", "kind": "str", "amount": "float"})
+    store.meta = {"zone_maps": compute_zone_maps(store, block_rows=8)}
+    context = PlanContext()
+    lazy = DataFrame(store).lazy(context)
+
+    result = lazy.filter(lambda row: row["kind"] == "click").filter(col("ts") < 6).project(["ts"])
+
+    assert result == [{"ts": 1}, {"ts": 2}, {"ts": 4}, {"ts": 5}]
+    # Structurally equal predicates share a plan node
+    assert lazy.filter(col("ts") < 6).node is lazy.filter(col("ts") < 6).node
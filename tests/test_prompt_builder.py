@@ -0,0 +1,78 @@
+import re
+
+from services.prompt_builder import PROMPT_TEMPLATE, PromptBuilder, estimate_tokens, get_prompt_builder, name_words
+
+
+def wide_schema(tables=40, columns=30):
+    schema = {
+        "customers": {"customer_id": "int", "country": "str", "signupDate": "str"},
+        "orders": {"order_id": "int", "customer_id": "int", "total_amount": "float"},
+    }
+    for t in range(tables):
+        schema[f"metrics_{t}"] = {f"measure_{t}_{c}": "float" for c in range(columns)}
+    return schema
+
+
+RELATIONSHIPS = [
+    {"from_table": "orders", "from_column": "customer_id", "to_table": "customers", "to_column": "customer_id"},
+]
+
+
+def test_name_words_split_and_fold():
+    assert name_words("signupDate") == {"signup", "date"}
+    assert name_words("total_amount") == {"total", "amount"}
+    assert name_words("How many Customers?") == {"how", "many", "customer"}
+    assert name_words("categories") == {"category"}
+
+
+def test_small_schema_is_sent_whole():
+    schema = {"customers": {"customer_id": "int", "country": "str"}}
+    builder = PromptBuilder(schema, [])
+    prompt_schema, relationships, prompt = builder.build("how many customers?", budget=4000)
+    assert prompt_schema == schema
+    assert "customers: customer_id int, country str" in prompt
+    assert "No known relationships." in prompt
+    assert prompt.rstrip().endswith('"how many customers?"')
+
+
+def test_wide_schema_keeps_relevant_tables_within_budget():
+    schema = wide_schema()
+    builder = PromptBuilder(schema, RELATIONSHIPS)
+    budget = builder.static_tokens + 200
+    assert builder.full_tokens > budget
+
+    prompt_schema, relationships, prompt = builder.build("total amount of orders per country", budget)
+    assert estimate_tokens(prompt) <= budget + 5
+    # The matched table and the related one it can join with come first
+    assert list(prompt_schema)[:2] == ["customers", "orders"]
+    assert prompt_schema["orders"] == schema["orders"]
+    assert relationships == RELATIONSHIPS
+    assert "orders.customer_id -> customers.customer_id" in prompt
+
+
+def test_table_too_wide_is_cut_to_matching_columns():
+    schema = {"events": {f"field_{c}": "str" for c in range(200)}}
+    schema["events"]["revenue"] = "float"
+    builder = PromptBuilder(schema, [])
+    prompt_schema, _, _ = builder.build("sum of revenue in events", builder.static_tokens + 40)
+    columns = list(prompt_schema["events"])
+    assert "revenue" in columns
+    assert len(columns) < len(schema["events"])
+
+
+def test_builder_is_cached_per_schema_version():
+    schema = wide_schema(tables=2, columns=2)
+    assert get_prompt_builder(schema, RELATIONSHIPS) is get_prompt_builder(dict(schema), list(RELATIONSHIPS))
+    changed = dict(schema, extra={"x": "int"})
+    assert get_prompt_builder(changed, RELATIONSHIPS) is not get_prompt_builder(schema, RELATIONSHIPS)
+
+
+def test_examples_follow_the_rules():
+    examples = re.findall(r'"content": "(.*)" \}\}', PROMPT_TEMPLATE)
+    assert examples
+    for code in examples:
+        # Rule 2: every table output is sliced
+        for match in re.finditer(r"\.project\([^)]*\)", code):
+            assert code[match.end():].startswith("[:"), code
+    # Rule 4: typed literals, no casting inside filters
+    assert "int(row" not in PROMPT_TEMPLATE
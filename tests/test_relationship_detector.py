@@ -0,0 +1,65 @@
+from engine.columnar import ColumnStore
+from engine.stats import compute_stats, value_sketch
+from services.relationship_detector import containment, detect_relationships, name_score, resolve_ambiguous
+
+
+def table_stats(rows, types):
+    return compute_stats(ColumnStore.from_rows(rows, column_types=types))["columns"]
+
+
+def shop(customers=500, products=500):
+    return {
+        "customers": table_stats(
+            [{"customer_id": i, "name": f"c{i}"} for i in range(customers)],
+            {"customer_id": "int", "name": "str"},
+        ),
+        "products": table_stats(
+            [{"product_id": i, "title": f"p{i}"} for i in range(products)],
+            {"product_id": "int", "title": "str"},
+        ),
+        "orders": table_stats(
+            [{"order_id": j, "customer_id": (j * 7) % 300, "product_id": (j * 3) % 200, "rating": j % 5}
+             for j in range(2000)],
+            {"order_id": "int", "customer_id": "int", "product_id": "int", "rating": "int"},
+        ),
+    }
+
+
+def test_containment_from_sketches():
+    keys = value_sketch(range(10_000))
+    assert containment(value_sketch(range(0, 10_000, 3)), keys) == 1.0
+    outside = containment(value_sketch(range(20_000, 30_000)), keys)
+    assert outside is None or outside < 0.1
+
+
+def test_sketches_match_ints_and_their_text():
+    assert value_sketch([1, 2, 3]) == value_sketch(["1", " 2", "3"])
+
+
+def test_finds_foreign_keys_from_values():
+    relationships, _ = detect_relationships(shop())
+    found = {(r["from_table"], r["from_column"], r["to_table"], r["to_column"]) for r in relationships}
+    assert found == {
+        ("orders", "customer_id", "customers", "customer_id"),
+        ("orders", "product_id", "products", "product_id"),
+    }
+    assert all(r["containment"] >= 0.9 for r in relationships)
+
+
+def test_unnamed_overlap_is_ambiguous():
+    tables = shop()
+    tables["orders"]["buyer"] = tables["orders"].pop("customer_id")
+    relationships, ambiguous = detect_relationships(tables)
+
+    # buyer's values fit both id columns and its name matches neither
+    candidates = ambiguous[("orders", "buyer")]
+    assert {c["to_table"] for c in candidates} == {"customers", "products"}
+
+    chosen = resolve_ambiguous(relationships, {("orders", "buyer"): candidates[1]})
+    assert candidates[1] in chosen
+
+
+def test_name_score_ignores_generic_words():
+    assert name_score("customer_id", "customers", "id") == 1
+    assert name_score("customer_id", "products", "product_id") == 0
+    assert name_score("customer_id", "customers", "customer_id") == 2
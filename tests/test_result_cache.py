@@ -0,0 +1,41 @@
+from services.result_cache import ResultCache, normalize_expression, referenced_tables
+
+
+def test_normalized_expressions_share_a_key():
+    versions = {"orders": ("/u/orders.csv", 1, 2)}
+    a = ResultCache.key("orders.where('id', '==', 5).project(['id'])", 1, versions)
+    b = ResultCache.key('orders.where("id","==",5).project( ["id"] )', 1, versions)
+
+    assert a == b
+    assert a != ResultCache.key("orders.where('id', '==', 5).project(['id'])", 1, {"orders": ("/u/orders.csv", 1, 3)})
+    assert normalize_expression("(len(orders))") == normalize_expression("len(orders)")
+    assert referenced_tables("customers.join(orders, 'a', 'b')", ["orders", "customers", "items"]) == ["customers", "orders"]
+
+
+def test_key_exposes_the_table_versions():
+    versions = {"orders": ("/u/orders.csv", 1, 2), "items": None}
+    key = ResultCache.key("len(orders) + len(items)", 1, versions)
+
+    assert ResultCache.table_versions(key) == versions
+
+
+def test_results_are_invalidated_per_table():
+    cache = ResultCache(max_bytes=10_000)
+    k1 = ResultCache.key("len(orders)", 1, {"orders": ("/u/orders.csv", 1, 1)})
+    k2 = ResultCache.key("len(items)", 1, {"items": ("/u/items.csv", 1, 1)})
+    cache.put(k1, {"type": "count", "data": 3}, ["/u/orders.csv"])
+    cache.put(k2, {"type": "count", "data": 4}, ["/u/items.csv"])
+
+    cache.invalidate_table("/u/orders.csv")
+
+    assert cache.get(k1) is None
+    assert cache.get(k2) == {"type": "count", "data": 4}
+    assert cache.stats()["hits"] == 1
+
+
+def test_large_results_respect_the_budget():
+    cache = ResultCache(max_bytes=100)
+    key = ResultCache.key("orders.project(orders.columns)", 1, {})
+    cache.put(key, {"type": "table", "data": [{"id": i} for i in range(50)]}, [])
+
+    assert cache.get(key) is None
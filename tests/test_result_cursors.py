@@ -0,0 +1,105 @@
+import gzip
+import json
+import os
+import time
+
+from engine.dataframe import DataFrame
+from services.result_cursors import ResultCursors, column_names, gzip_body, iter_result, row_values
+
+
+def make_rows(n):
+    return [{"id": i, "name": f"n{i}"} for i in range(n)]
+
+
+def test_columnar_layout():
+    rows = [{"id": 1, "name": "a"}, {"id": 2, "score": 0.5}]
+    columns = column_names(rows)
+    assert columns == ["id", "name", "score"]
+    assert row_values(rows, columns) == [[1, "a", None], [2, None, 0.5]]
+
+
+def test_pages_span_page_files(tmp_path):
+    cursors = ResultCursors(str(tmp_path), ttl=60, page_rows=4)
+    cursor_id, count = cursors.create(7, ["id", "name"], iter(make_rows(10)))
+    assert count == 10
+    # Pages are gzip'd JSON and the metadata plain JSON: nothing is unpickled
+    with gzip.open(tmp_path / cursor_id / "page-2.json.gz", "rt") as f:
+        assert json.load(f) == [[8, "n8"], [9, "n9"]]
+    assert json.loads((tmp_path / cursor_id / "meta.json").read_text())["row_count"] == 10
+
+    first = cursors.page(cursor_id, 7)
+    assert first["data"] == [[i, f"n{i}"] for i in range(4)]
+    assert first["next_offset"] == 4 and first["row_count"] == 10
+
+    middle = cursors.page(cursor_id, 7, offset=3, limit=4)
+    assert [row[0] for row in middle["data"]] == [3, 4, 5, 6]
+
+    last = cursors.page(cursor_id, 7, offset=8)
+    assert [row[0] for row in last["data"]] == [8, 9]
+    assert last["next_offset"] is None
+    assert cursors.page(cursor_id, 7, offset=10)["data"] == []
+
+
+def test_cursor_is_filled_in_the_background(tmp_path):
+    cursors = ResultCursors(str(tmp_path), ttl=60, page_rows=4)
+    spawned = []
+    cursor_id, count = cursors.create(7, ["id", "name"], iter(make_rows(10)),
+                                      spawn=lambda func, *args: spawned.append((func, args)))
+    # Only the first page is written before create() returns
+    assert count is None
+    first = cursors.page(cursor_id, 7)
+    assert [row[0] for row in first["data"]] == [0, 1, 2, 3]
+    assert first["row_count"] is None and first["next_offset"] == 4
+    pending = cursors.page(cursor_id, 7, offset=4)
+    assert pending["data"] == [] and pending["next_offset"] == 4
+
+    func, args = spawned.pop()
+    func(*args)
+    last = cursors.page(cursor_id, 7, offset=8)
+    assert [row[0] for row in last["data"]] == [8, 9]
+    assert last["row_count"] == 10 and last["next_offset"] is None
+
+
+def test_failed_fill_keeps_written_rows(tmp_path):
+    def rows():
+        yield from make_rows(6)
+        raise ValueError("boom")
+
+    cursors = ResultCursors(str(tmp_path), ttl=60, page_rows=4)
+    cursor_id, _ = cursors.create(7, ["id", "name"], rows(), spawn=lambda func, *args: func(*args))
+    page = cursors.page(cursor_id, 7, offset=4)
+    assert page["data"] == [] and page["row_count"] == 4
+    assert page["next_offset"] is None and page["error"] == "boom"
+
+
+def test_cursors_are_private_and_expire(tmp_path):
+    cursors = ResultCursors(str(tmp_path), ttl=60, page_rows=4)
+    cursor_id, _ = cursors.create(7, ["id"], iter(make_rows(8)))
+    assert cursors.page(cursor_id, 8) is None
+    assert cursors.page("../etc", 7) is None
+    assert cursors.page("missing", 7) is None
+
+    old = time.time() - 120
+    os.utime(tmp_path / cursor_id, (old, old))
+    cursors.ttl = 30
+    cursors.purge()
+    assert not (tmp_path / cursor_id).exists()
+
+
+def test_cursor_streams_lazy_rows(tmp_path):
+    df = DataFrame(make_rows(9))
+    rows = df.project(["id"])
+    cursors = ResultCursors(str(tmp_path), ttl=60, page_rows=4)
+    cursor_id, count = cursors.create(1, ["id"], iter_result(rows))
+    assert count == 9
+    assert rows._rows is None  # Written without building the full list
+    assert cursors.page(cursor_id, 1, offset=4)["data"] == [[4], [5], [6], [7]]
+
+
+def test_gzip_is_negotiated():
+    body = b'{"data": [' + b'[1, "abc"], ' * 200 + b'[]]}'
+    compressed, encoding = gzip_body(body, "br, gzip;q=0.8")
+    assert encoding == "gzip" and gzip.decompress(compressed) == body
+    assert gzip_body(body, "identity") == (body, None)
+    assert gzip_body(body, "gzip;q=0, identity") == (body, None)
+    assert gzip_body(b"{}", "gzip") == (b"{}", None)
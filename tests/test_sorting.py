@@ -0,0 +1,84 @@
+import pytest
+
+import engine.dataframe as dataframe
+from engine.dataframe import DataFrame
+from engine.ingest import ingest_csv
+from engine.sorting import make_sort_key, sorted_positions, top_positions
+
+
+ROWS = [
+    {"id": 1, "city": "Oslo", "date": "2024-03-01", "amount": 20},
+    {"id": 2, "city": "Bern", "date": "2024-01-15", "amount": None},
+    {"id": 3, "city": "Oslo", "date": "2023-12-31", "amount": 35},
+    {"id": 4, "city": "Bern", "date": "2024-02-10", "amount": 20},
+]
+
+
+def ids(df):
+    return [row["id"] for row in df.data]
+
+
+def test_order_by_multiple_columns_and_directions():
+    df = DataFrame(ROWS)
+
+    assert ids(df.order_by("date")) == [3, 2, 4, 1]
+    assert ids(df.order_by(["city", "date"], [True, False])) == [4, 2, 1, 3]
+    # Nulls last in both directions; ties keep their original order
+    assert ids(df.order_by("amount")) == [1, 4, 3, 2]
+    assert ids(df.order_by("amount", False)) == [3, 1, 4, 2]
+
+
+def test_order_by_limit_matches_full_sort():
+    df = DataFrame(ROWS)
+
+    assert ids(df.order_by("amount", False, limit=2)) == [3, 1]
+    assert ids(df.order_by(["city", "id"], limit=3)) == ids(df.order_by(["city", "id"]))[:3]
+
+
+def test_external_sort_matches_in_memory(tmp_path):
+    values = [(i * 7919) % 1000 for i in range(5000)]
+    key = make_sort_key([False])
+    keyed = [(key((v,)), i) for i, v in enumerate(values)]
+
+    external = sorted_positions(iter(keyed), run_size=300, spill_dir=str(tmp_path))
+
+    assert list(external) == [i for _, i in sorted(keyed)]
+    assert top_positions(iter(keyed), 5) == list(external[:5])
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_wrappers_keep_their_results(tmp_path, columnar):
+    path = tmp_path / "scores.csv"
+    path.write_text("id,score\n1,5\n2,9\n3,\n4,9\n5,1\n")
+    df = DataFrame(str(path), columnar=columnar)
+
+    assert df.max_by("score") == [{"id": 2, "score": 9}]
+    assert df.min_by("score") == [{"id": 5, "score": 1}]
+    assert [r["id"] for r in df.top_k_by("score", 3)] == [2, 4, 1]
+    assert ids(df.order_by("score", False, limit=2)) == [2, 4]
+
+
+def test_file_order_by_streams_into_the_external_sort(tmp_path, monkeypatch):
+    spill = tmp_path / "spill"
+    spill.mkdir()
+    path = tmp_path / "big.csv"
+    path.write_text("id,score,tag\n" + "".join(f"{i},{(i * 37) % 11},t{i % 4}\n" for i in range(60)))
+    expected = ids(DataFrame(str(path), columnar=True).order_by(["score", "id"], [False, True]))
+
+    def no_loading(self, columns=None):
+        raise AssertionError("input loaded into memory")
+
+    monkeypatch.setattr(DataFrame, "_to_store", no_loading)
+    monkeypatch.setattr(dataframe, "SORT_ROWS_IN_MEMORY", 7)
+    ordered = DataFrame(str(path)).order_by(["score", "id"], [False, True], spill_dir=str(spill))
+
+    assert ids(ordered) == expected
+    assert ordered.store.mapping is not None  # Written to a sidecar, not built in memory
+    assert ordered.get_column_types() == {"id": "int", "score": "int", "tag": "str"}
+
+    # A mapped sidecar sorts its positions and writes the rows out the same way
+    ingest_csv(str(path))
+    mapped = DataFrame(str(path)).order_by(["score", "id"], [False, True], spill_dir=str(spill))
+    assert ids(mapped) == expected
+    assert list(spill.iterdir()) == []
@@ -0,0 +1,27 @@
+import json
+
+from services.sse import row_batches, sse_comment, sse_event
+
+
+def parse(message):
+    lines = message.rstrip("\n").split("\n")
+    fields = dict(line.split(": ", 1) for line in lines)
+    return fields["event"], json.loads(fields["data"])
+
+
+def test_event_is_one_json_data_line():
+    message = sse_event("rows", {"rows": [{"note": "a\nb"}]})
+    assert message.endswith("\n\n")
+    assert parse(message) == ("rows", {"rows": [{"note": "a\nb"}]})
+
+
+def test_comment_has_no_event():
+    assert sse_comment("keep-alive") == ": keep-alive\n\n"
+
+
+def test_row_batches():
+    rows = [{"i": i} for i in range(7)]
+    batches = list(row_batches(rows, 3))
+    assert [len(b) for b in batches] == [3, 3, 1]
+    assert [r for b in batches for r in b] == rows
+    assert list(row_batches([], 3)) == []
@@ -0,0 +1,86 @@
+import engine.stats as stats_module
+from engine.columnar import ColumnStore
+from engine.dataframe import DataFrame
+from engine.stats import compute_stats, compute_zone_maps, estimate_distinct, stamp_stats
+from engine.ingest import ingest_csv
+from engine.storage import sidecar_path, write_sidecar
+
+
+def test_compute_stats_per_kind():
+    store = ColumnStore.from_rows(
+        [{"amount": v, "city": c} for v, c in [(5, "Oslo"), (None, "Bern"), (15, "Oslo"), (10, None)]],
+        column_types={"amount": "int", "city": "str"},
+    )
+    result = compute_stats(store)
+
+    amount = result["columns"]["amount"]
+    assert result["row_count"] == 4
+    assert (amount["count"], amount["null_count"], amount["min"], amount["max"], amount["sum"]) == (3, 1, 5, 15, 30)
+    assert amount["mean"] == 10
+    assert sum(amount["histogram"]["counts"]) == 3
+    city = result["columns"]["city"]
+    assert len(city.pop("sketch")) == 2
+    assert city == {
+        "kind": "str", "count": 3, "null_count": 1, "min": "Bern", "max": "Oslo", "distinct": 2, "sorted": False,
+    }
+
+
+def test_distinct_estimate_for_large_columns(monkeypatch):
+    monkeypatch.setattr(stats_module, "EXACT_DISTINCT_LIMIT", 1000)
+    values = list(range(50000)) * 2
+
+    estimate = estimate_distinct(values)
+
+    assert abs(estimate - 50000) < 50000 * 0.15
+
+
+def test_metadata_answers_without_scanning(tmp_path, monkeypatch):
+    path = tmp_path / "orders.csv"
+    path.write_text("id,total\n1,10\n2,\n3,30\n4,30\n", encoding="utf-8")
+    store = DataFrame(str(path), columnar=True).store
+    stats = compute_stats(store)
+    write_sidecar(sidecar_path(str(path)), store, extra_meta={"stats": stats})
+
+    mapped = DataFrame(str(path))
+    assert mapped.stats == stats
+    assert mapped.describe()["total"]["max"] == 30
+    assert mapped.max_by("total") == [{"id": 3, "total": 30}]
+    assert mapped.min_by("total") == [{"id": 1, "total": 10}]
+
+    # File-backed frame with stats from the Table record: len() never parses
+    (tmp_path / "orders.csv.col").unlink()
+    df = DataFrame(str(path), stats=stamp_stats(stats, str(path)))
+    monkeypatch.setattr(df.parser, "parse", lambda *a, **k: (_ for _ in ()).throw(AssertionError))
+    assert len(df) == 4
+
+
+def test_stats_of_a_replaced_file_are_not_used(tmp_path):
+    path = tmp_path / "orders.csv"
+    path.write_text("id,total\n1,10\n2,20\n", encoding="utf-8")
+    _, old_stats = ingest_csv(str(path))
+
+    # The same file name uploaded again, with the old Table record's stats
+    path.write_text("id,total\n1,5\n2,99\n3,7\n", encoding="utf-8")
+    ingest_csv(str(path))
+    df = DataFrame(str(path), stats=old_stats)
+    assert len(df) == 3
+    assert df.max_by("total") == [{"id": 2, "total": 99}]
+
+    # Without a sidecar the stale stats are detected by their stamp
+    (tmp_path / "orders.csv.col").unlink()
+    df = DataFrame(str(path), stats=old_stats)
+    assert df.stats is None
+    assert len(df) == 3
+    assert df.min_by("total") == [{"id": 1, "total": 5}]
+
+
+def test_zone_maps_per_block():
+    store = ColumnStore.from_rows(
+        [{"ts": i, "tag": None if i < 4 else f"t{i}"} for i in range(10)],
+        column_types={"ts": "int", "tag": "str"},
+    )
+    zones = compute_zone_maps(store, block_rows=4)
+
+    assert zones["block_rows"] == 4
+    assert zones["columns"]["ts"] == [[0, 3], [4, 7], [8, 9]]
+    assert zones["columns"]["tag"] == [None, ["t4", "t7"], ["t8", "t9"]]
@@ -0,0 +1,127 @@
+import multiprocessing
+import os
+import pytest
+from engine.columnar import ColumnStore
+from engine.dataframe import DataFrame
+from engine.ingest import ensure_sidecar, ingest_csv
+import engine.storage as storage
+from engine.storage import (
+    MappedStrings, SidecarWriter, open_sidecar, read_meta, remove_sidecar, shared_count, sidecar_path,
+    stamp_path, touch_stamp, write_sidecar
+)
+
+
+def test_sidecar_round_trip(tmp_path):
+    rows = [
+        {"id": 1, "score": 1.5, "name": "Ann", "mixed": 7},
+        {"id": None, "score": 2.0, "name": None, "mixed": "x"},
+        {"id": 3, "score": None, "name": "Zoë", "mixed": None},
+    ]
+    store = ColumnStore.from_rows(
+        rows, column_types={"id": "int", "score": "float", "name": "str", "mixed": "int"}
+    )
+    path = str(tmp_path / "t.col")
+    write_sidecar(path, store)
+
+    mapped = open_sidecar(path)
+
+    assert len(mapped) == 3
+    assert list(mapped.iter_rows()) == rows
+    assert isinstance(mapped.column("id").values, memoryview)
+    assert isinstance(mapped.column("name").values, MappedStrings)
+    assert read_meta(path)["row_count"] == 3
+
+
+def test_sidecar_writer_streams_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "_WRITER_CHUNK", 8)
+    rows = [(i, i / 2, f"s{i}" if i % 3 else None, i if i < 12 else "late") for i in range(20)]
+    path = str(tmp_path / "w.col")
+    writer = SidecarWriter(path, ["id", "half", "name", "mixed"],
+                           {"id": "int", "half": "float", "name": "str", "mixed": "int"}, str(tmp_path))
+    for row in rows:
+        writer.append(row)
+    writer.close({"note": "x"})
+
+    mapped = open_sidecar(path)
+
+    # 'mixed' was written as ints for its first chunk, then turned to object
+    assert [mapped.column(col).kind for col in mapped.header] == ["int", "float", "str", "object"]
+    assert [tuple(row.values()) for row in mapped.iter_rows()] == rows
+    assert mapped.column("name").null_count == 7
+    assert read_meta(path)["note"] == "x"
+    assert sorted(os.listdir(tmp_path)) == ["w.col"]
+
+
+def test_dataframe_prefers_fresh_sidecar(tmp_path):
+    csv_path = tmp_path / "orders.csv"
+    csv_path.write_text("id,total\n1,10\n2,20\n", encoding="utf-8")
+    loaded = DataFrame(str(csv_path), columnar=True)
+    write_sidecar(sidecar_path(str(csv_path)), loaded.store)
+
+    df = DataFrame(str(csv_path))
+
+    assert df.source_type == "columnar"
+    assert df.parser is None
+    assert len(df) == 2
+    assert df.max_by("total") == [{"id": 2, "total": 20}]
+
+
+def test_stale_sidecar_is_ignored(tmp_path):
+    csv_path = tmp_path / "orders.csv"
+    csv_path.write_text("id\n1\n", encoding="utf-8")
+    write_sidecar(sidecar_path(str(csv_path)), DataFrame(str(csv_path), columnar=True).store)
+
+    csv_path.write_text("id\n1\n2\n", encoding="utf-8")
+    stamp = os.path.getmtime(sidecar_path(str(csv_path))) + 10
+    os.utime(csv_path, (stamp, stamp))
+
+    df = DataFrame(str(csv_path))
+
+    assert df.source_type == "file"
+    assert len(df) == 2
+
+
+def test_open_shared_reuses_one_mapping(tmp_path):
+    path = tmp_path / "events.csv"
+    path.write_text("id,kind\n1,a\n2,b\n", encoding="utf-8")
+    ingest_csv(str(path))
+
+    first = DataFrame(str(path))
+    second = DataFrame(str(path))
+
+    assert first.store is second.store
+    assert first.store.meta["stats"]["row_count"] == 2
+    mapped = shared_count()
+
+    remove_sidecar(str(path))
+    assert not os.path.exists(sidecar_path(str(path)))
+    # Frames that already mapped the sidecar keep reading it
+    assert list(first.store.iter_rows()) == [{"id": 1, "kind": "a"}, {"id": 2, "kind": "b"}]
+    del first, second
+    assert shared_count() == mapped - 1
+
+
+def test_ensure_sidecar_builds_once_across_processes(tmp_path):
+    path = tmp_path / "big.csv"
+    path.write_text("id\n" + "".join(f"{i}\n" for i in range(1000)), encoding="utf-8")
+
+    with multiprocessing.get_context("fork").Pool(4) as pool:
+        pool.map(ensure_sidecar, [str(path)] * 4)
+
+    sidecar = sidecar_path(str(path))
+    built = os.path.getmtime(sidecar)
+    ensure_sidecar(str(path))
+    assert os.path.getmtime(sidecar) == built
+    assert read_meta(sidecar)["row_count"] == 1000
+
+
+def test_change_stamp_moves_forward_and_is_removed(tmp_path):
+    csv_path = str(tmp_path / "orders.csv")
+    touch_stamp(csv_path)
+    first = os.stat(stamp_path(csv_path)).st_mtime_ns
+    touch_stamp(csv_path)
+
+    # Strictly later, even within one clock tick, so every worker sees a change
+    assert os.stat(stamp_path(csv_path)).st_mtime_ns > first
+    remove_sidecar(csv_path)
+    assert not os.path.exists(stamp_path(csv_path))
@@ -0,0 +1,57 @@
+from engine.tokenizer import BlockTokenizer
+
+
+def tokenize(data, block_size=None, **kwargs):
+    tok = BlockTokenizer(**kwargs)
+    rows, malformed = [], []
+    step = block_size or len(data) or 1
+    for start in range(0, len(data), step):
+        r, m = tok.feed(data[start:start + step])
+        rows.extend(r)
+        malformed.extend(m)
+    r, m = tok.close()
+    rows.extend(r)
+    malformed.extend(m)
+    return [list(row) for row in rows], malformed
+
+
+def test_quoted_separators_newlines_and_escapes():
+    data = b'id,text\n1,"a, b"\n2,"line1\nline2"\n3,"say ""hi"""\n'
+    rows, malformed = tokenize(data, width=2)
+
+    assert rows == [["id", "text"], ["1", "a, b"], ["2", "line1\nline2"], ['3', 'say "hi"']]
+    assert malformed == []
+
+
+def test_records_split_across_blocks():
+    data = b'id,text\n1,"a, b"\n2,"line1\nline2"\n3,plain\n4, spaced \n'
+    expected, _ = tokenize(data, width=2)
+
+    for block_size in (1, 2, 3, 7):
+        assert tokenize(data, block_size, width=2)[0] == expected
+    assert expected[-1] == ["4", "spaced"]
+
+
+def test_malformed_records_keep_line_numbers():
+    data = b'a,b\n1,2\n\n3,4,5\n"x\ny",6\n7\n'
+    rows, malformed = tokenize(data, width=2)
+
+    assert rows == [["a", "b"], ["1", "2"], ["x\ny", "6"]]
+    assert [(line, count) for line, count, _ in malformed] == [(4, 3), (7, 1)]
+
+
+def test_column_projection_and_missing_trailing_newline():
+    data = b'a,b,c\n1,2,3\n4,5,6'
+    rows, _ = tokenize(data, width=3, columns=[2, 0])
+
+    assert rows == [["c", "a"], ["3", "1"], ["6", "4"]]
+
+
+def test_as_columns_matches_rows():
+    data = b'a,b\n1,x\n2,"y,z"\n3, w\n'
+    tok = BlockTokenizer(width=2)
+    columns, _ = tok.feed(data, as_columns=True)
+    rest, _ = tok.close(as_columns=True)
+
+    assert columns == [["a", "1", "2", "3"], ["b", "x", "y,z", "w"]]
+    assert rest == [[], []]
@@ -0,0 +1,78 @@
+import json
+import threading
+import time
+
+import pytest
+
+from services.fake_llm import FakeModel
+from services.translation_cache import (
+    MemoryTranslationStore, SingleFlight, TranslationCache, translation_key,
+)
+
+SCHEMA = {"orders": {"id": "int", "total": "float"}}
+ANSWER = '{"isCode": true, "content": "len(orders)"}'
+
+
+def test_key_normalizes_question_and_tracks_schema():
+    key = translation_key("How many orders?", SCHEMA, [])
+
+    assert key == translation_key("  how many   ORDERS ", SCHEMA, [])
+    assert key != translation_key("How many orders?", {"orders": {"id": "str"}}, [])
+    assert key != translation_key("How many orders?", SCHEMA, [{"from_table": "orders"}])
+
+
+def test_cached_translation_expires_after_ttl():
+    now = [1000.0]
+    model = FakeModel({"How many": ANSWER})
+    cache = TranslationCache(MemoryTranslationStore(clock=lambda: now[0]), ttl=60)
+    key = translation_key("How many orders?", SCHEMA, [])
+
+    first = cache.translate(model, key, "How many orders?", "prompt: How many orders?", json.loads)
+    second = cache.translate(model, key, "How many orders?", "prompt: How many orders?", json.loads)
+    now[0] += 61
+    third = cache.translate(model, key, "How many orders?", "prompt: How many orders?", json.loads)
+
+    assert first == ({"isCode": True, "content": "len(orders)"}, False)
+    assert second[1] is True and third[1] is False
+    assert len(model.calls) == 2
+
+
+def test_invalid_output_is_not_cached():
+    model = FakeModel(default="not json")
+    cache = TranslationCache(MemoryTranslationStore(), ttl=60)
+
+    for _ in range(2):
+        with pytest.raises(json.JSONDecodeError):
+            cache.translate(model, "k", "q", "prompt", json.loads)
+    assert len(model.calls) == 2
+
+
+def test_concurrent_identical_requests_make_one_call():
+    class SlowModel(FakeModel):
+        def generate_content(self, prompt):
+            time.sleep(0.2)
+            return super().generate_content(prompt)
+
+    model = SlowModel(default=ANSWER)
+    cache = TranslationCache(MemoryTranslationStore(), ttl=60)
+    results = []
+
+    def ask():
+        results.append(cache.translate(model, "k", "q", "prompt", json.loads))
+
+    threads = [threading.Thread(target=ask) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(model.calls) == 1
+    assert [cached for _, cached in results].count(False) == 1
+    assert cache.hits == 4 and cache.misses == 1
+
+
+def test_single_flight_shares_errors():
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do("k", lambda: (_ for _ in ()).throw(ValueError("boom")))
+    assert flight.do("k", lambda: 42) == (42, False)